@@ -0,0 +1,169 @@
+"""
+Normalizer volume benchmark: time and peak memory at 1k / 100k / 1M rows.
+
+Usage (from the repository root):
+  python -m benchmarks.bench_normalizers [--sizes 1000,100000,1000000] [--output results.json]
+                                         [--sources cal,laco,sam] [--no-memory]
+
+For every source and size, on a synthetic corpus from benchmarks/corpus.py:
+  - format:  formatter.format_opportunities_<source>(rows)
+  - records: the same rows as formatter.Opportunity (__slots__) records
+  - cli:     formatter._main_cli() end to end with the base64 argument the n8n
+             Execute Command nodes pass (decode + normalize + print), stdout
+             discarded
+
+Each case is timed without tracing, then re-run under tracemalloc for the peak
+(tracing slows Python down, so the two are never mixed). The results file is a
+JSON document with the commit, interpreter and one entry per case, meant to be
+diffed between commits.
+"""
+import base64
+import contextlib
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.corpus import SOURCES, make_rows
+from scrapers import formatter
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+
+class _NullWriter:
+    """Text sink that only counts characters (the CLI prints one big JSON line)."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, s):
+        self.chars += len(s)
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+def _format_case(source, rows):
+    func = getattr(formatter, f"format_opportunities_{source}")
+    return lambda: func(rows)
+
+
+def _records_case(source, rows):
+    return lambda: list(formatter.iter_records(source, rows))
+
+
+def _cli_case(source, rows):
+    payload = base64.b64encode(json.dumps(rows, ensure_ascii=False).encode("utf-8")).decode("ascii")
+    argv = ["formatter.py", payload, source]
+
+    def run():
+        saved = sys.argv
+        sys.argv = argv
+        try:
+            with contextlib.redirect_stdout(_NullWriter()):
+                formatter._main_cli()
+        finally:
+            sys.argv = saved
+
+    return run
+
+
+CASES = {"format": _format_case, "records": _records_case, "cli": _cli_case}
+
+
+def _timed(func):
+    gc.collect()
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def _peak_bytes(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(source, size, case, memory=True):
+    """One benchmark entry: seconds, rows/sec and (optionally) peak traced bytes."""
+    rows = make_rows(source, size)
+    func = CASES[case](source, rows)
+    seconds = _timed(func)
+    return {
+        "source": source,
+        "case": case,
+        "rows": size,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(size / seconds, 1) if seconds else None,
+        "peak_bytes": _peak_bytes(func) if memory else None,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, sources=SOURCES, memory=True):
+    """Run every (source, size, case); returns the results document."""
+    results = []
+    print(f"{'source':<6} {'case':<7} {'rows':>9} {'seconds':>9} {'rows/s':>11} {'peak MiB':>9}", file=sys.stderr)
+    for size in sizes:
+        for source in sources:
+            for case in CASES:
+                entry = measure(source, size, case, memory)
+                peak = f"{entry['peak_bytes'] / 2**20:9.1f}" if entry["peak_bytes"] is not None else f"{'-':>9}"
+                print(f"{source:<6} {case:<7} {size:>9,} {entry['seconds']:>9.3f} "
+                      f"{entry['rows_per_sec']:>11,.0f} {peak}", file=sys.stderr)
+                results.append(entry)
+    return {
+        "benchmark": "normalizers",
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "results": results,
+    }
+
+
+def _main_cli() -> None:
+    args = sys.argv[1:]
+    opts = {"--sizes": ",".join(map(str, DEFAULT_SIZES)), "--sources": ",".join(SOURCES), "--output": None}
+    memory = True
+    while args:
+        flag = args.pop(0)
+        if flag == "--no-memory":
+            memory = False
+            continue
+        if flag not in opts or not args:
+            print("Uso: python -m benchmarks.bench_normalizers [--sizes 1000,100000,1000000] "
+                  "[--sources cal,laco,sam] [--output results.json] [--no-memory]", file=sys.stderr)
+            sys.exit(2)
+        opts[flag] = args.pop(0)
+
+    sizes = tuple(int(s) for s in opts["--sizes"].split(",") if s.strip())
+    sources = tuple(s for s in opts["--sources"].split(",") if s.strip())
+    document = run(sizes, sources, memory)
+    out = json.dumps(document, indent=2)
+    if opts["--output"]:
+        os.makedirs(os.path.dirname(os.path.abspath(opts["--output"])), exist_ok=True)
+        with open(opts["--output"], "w", encoding="utf-8") as fh:
+            fh.write(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,168 @@
+"""
+Scraper throughput benchmark against the offline replay server.
+
+Usage (from the repository root; needs `python -m playwright install chromium`):
+  python -m benchmarks.bench_scrapers [--mode xhr|dom] [--sizes 20,100,1000] [--output results.json]
+  python -m benchmarks.bench_scrapers --check results.json[,more.json] [--max-round-trips 12]
+
+For each source and table size it serves synthetic snapshots from
+benchmarks/replay.py, runs the real scrape() coroutine against them and
+reports wall time, page-load time (the scrapers' 'goto' spans), network
+requests issued by the browser (including blocked ones), browser round trips
+(awaited Browser/BrowserContext/Page calls) and rows/sec.
+
+--check fails (exit 1) when a result lost rows or took more than
+--max-round-trips round trips. The replay table fits in one page, so the
+scrapers make a fixed number of calls whatever its size; per-row queries
+would exceed the budget from the 20-row table on.
+"""
+import asyncio
+import inspect
+import json
+import sys
+import time
+
+from playwright.async_api import async_playwright
+
+from benchmarks.replay import CAL_PAGE, ReplayServer
+from scrapers import cal_eprocure_scraper, lacobids_scraper, metrics
+
+DEFAULT_SIZES = (20, 100, 1000)
+MAX_ROUND_TRIPS = 12  # per scrape() call; a one-page scrape makes 5 to 8
+
+
+class _Counter:
+    """Totals shared by every wrapped browser, context and page of one measurement."""
+
+    def __init__(self):
+        self.requests = 0
+        self.round_trips = 0
+
+    def request(self, request):
+        self.requests += 1
+
+
+class _Counting:
+    """
+    Proxy over a Browser, BrowserContext or Page counting the browser round trips
+    the scrapers make: every awaited API call (goto, evaluate, wait_for_*,
+    select_option, route, close, ...) is one. Pages and contexts it opens are
+    wrapped as well, and each new context's requests are counted.
+    """
+
+    def __init__(self, target, counter):
+        self._target = target
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            self._counter.round_trips += 1
+            result = await attr(*args, **kwargs)
+            if name == "new_context":
+                result.on("request", self._counter.request)
+            elif name == "new_page" and hasattr(self._target, "new_context"):
+                result.context.on("request", self._counter.request)   # browser.new_page's own context
+            if name in ("new_context", "new_page"):
+                return _Counting(result, self._counter)
+            return result
+        return call
+
+
+async def _measure(browser, source, size, mode):
+    counter = _Counter()
+    counting = _Counting(browser, counter)
+    metrics.METRICS.reset()
+    started = time.perf_counter()
+    if source == "laco":
+        rows = await lacobids_scraper.scrape(counting, qtd=size, mode=mode)
+    else:
+        rows = await cal_eprocure_scraper.scrape(counting, qtd=size, mode=mode)
+    seconds = time.perf_counter() - started
+    goto_seconds = sum(s["seconds"] for s in metrics.METRICS.snapshot("bench")["spans"] if s["span"] == "goto")
+    return {
+        "source": source,
+        "mode": mode,
+        "rows": size,
+        "rows_out": len(rows),
+        "seconds": round(seconds, 4),
+        "page_load_seconds": round(goto_seconds, 4),
+        "requests": counter.requests,
+        "round_trips": counter.round_trips,
+        "rows_per_sec": round(len(rows) / seconds, 1) if seconds else None,
+    }
+
+
+async def run(sizes=DEFAULT_SIZES, mode="xhr", sources=("laco", "cal")):
+    """Benchmark every (source, size) pair; returns the list of result dicts."""
+    results = []
+    urls = lacobids_scraper.BASE_URL, cal_eprocure_scraper.SEARCH_URL
+    with ReplayServer() as server:
+        # The *_BASE_URL variables are read at import; point the scrapers at the replay server for this run only
+        lacobids_scraper.BASE_URL = server.base_url
+        cal_eprocure_scraper.SEARCH_URL = server.base_url + CAL_PAGE
+        try:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True)
+                try:
+                    for source in sources:
+                        for size in sizes:
+                            server.rows = size
+                            result = await _measure(browser, source, size, mode)
+                            print(f"{source:5s} {mode:3s} {size:6d} rows  {result['seconds']:8.3f}s  "
+                                  f"{result['requests']:5d} requests  {result['round_trips']:4d} round trips  "
+                                  f"{result['rows_per_sec']} rows/s")
+                            results.append(result)
+                finally:
+                    await browser.close()
+        finally:
+            lacobids_scraper.BASE_URL, cal_eprocure_scraper.SEARCH_URL = urls
+    return results
+
+
+def check(results, max_round_trips=MAX_ROUND_TRIPS):
+    """Messages for the results that lost rows or exceeded the round-trip budget."""
+    failures = []
+    for r in results:
+        label = f"{r['source']} {r['mode']} {r['rows']} rows"
+        if r["rows_out"] < r["rows"]:
+            failures.append(f"{label}: {r['rows_out']} rows out")
+        if r["round_trips"] > max_round_trips:
+            failures.append(f"{label}: {r['round_trips']} round trips (budget {max_round_trips})")
+    return failures
+
+
+def _main_cli() -> None:
+    args = sys.argv[1:]
+    opts = {"--mode": "xhr", "--sizes": ",".join(map(str, DEFAULT_SIZES)), "--output": None,
+            "--check": None, "--max-round-trips": str(MAX_ROUND_TRIPS)}
+    while args:
+        flag = args.pop(0)
+        if flag not in opts or not args:
+            print("Uso: python -m benchmarks.bench_scrapers [--mode xhr|dom] [--sizes 20,100,1000] "
+                  "[--output results.json] | --check results.json [--max-round-trips 12]", file=sys.stderr)
+            sys.exit(2)
+        opts[flag] = args.pop(0)
+
+    if opts["--check"]:
+        results = []
+        for path in opts["--check"].split(","):
+            with open(path, encoding="utf-8") as fh:
+                results.extend(json.load(fh))
+        failures = check(results, int(opts["--max-round-trips"]))
+        for failure in failures:
+            print(f"[bench] {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    sizes = tuple(int(s) for s in opts["--sizes"].split(",") if s.strip())
+    results = asyncio.run(run(sizes, opts["--mode"]))
+    if opts["--output"]:
+        with open(opts["--output"], "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    _main_cli()
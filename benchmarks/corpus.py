@@ -0,0 +1,117 @@
+"""
+Deterministic synthetic corpora of raw CAL, LACo and SAM rows.
+
+Rows mimic what the scrapers and the SAM.gov API actually return, including
+the messy parts the normalizers have to cope with: missing keys, blank and
+"Continuous" deadlines, rows already in the unified shape, `award` objects that
+are absent/None/partial, and non-ASCII titles. The same (source, n, seed)
+always yields the same rows, so results are comparable across commits.
+"""
+import random
+
+SOURCES = ("cal", "laco", "sam")
+
+_WORDS = (
+    "Janitorial", "Services", "Roofing", "Repair", "HVAC", "Maintenance", "Lab", "Coats",
+    "Embroidery", "Landscaping", "Security", "Guard", "IT", "Consulting", "Asphalt", "Paving",
+    "Custodial", "Supplies", "Elevator", "Inspection", "Pest", "Control", "Fleet", "Tires",
+)
+_UNICODE = ("Señalización", "Café", "Ingeniería", "Straße", "Crème", "東京", "Ñandú", "Łódź", "—")
+_CAL_DEPTS = ("Dept of Corrections & Rehab", "Department of Transportation", "CAL FIRE",
+              "Department of Water Resources", "State Controller", "Unknown Board")
+_LACO_DEPTS = ("Internal Services", "Public Works", "Health Services", "Parks and Recreation", "")
+_SAM_TYPES = ("Solicitation", "Combined Synopsis/Solicitation", "Award Notice", "Sources Sought")
+
+
+def _title(rnd):
+    words = [rnd.choice(_WORDS) for _ in range(rnd.randint(2, 6))]
+    if rnd.random() < 0.1:
+        words.insert(rnd.randrange(len(words)), rnd.choice(_UNICODE))
+    return " ".join(words)
+
+
+def _date(rnd, fmt):
+    return fmt.format(m=rnd.randint(1, 12), d=rnd.randint(1, 28), y=rnd.choice((2025, 2026)))
+
+
+def _cal_row(i, rnd):
+    row = {
+        "event_id": f"{i:010d}",
+        "event_name": _title(rnd),
+        "department": rnd.choice(_CAL_DEPTS),
+        "end_date": _date(rnd, "{m:02d}/{d:02d}/{y} 1:00PM PDT"),
+        "status": "Posted",
+    }
+    roll = rnd.random()
+    if roll < 0.05:    # already in the unified shape (re-fed row)
+        return {"opportunity_id": row["event_id"], "title": row["event_name"],
+                "agency": row["department"], "active": False, "score": 0}
+    if roll < 0.15:    # scraper missed some cells
+        for key in rnd.sample(("department", "end_date", "status"), 2):
+            del row[key]
+    return row
+
+
+def _laco_row(i, rnd):
+    row = {
+        "solicitation_number": f"RFB-IS-{26200000 + i}",
+        "bid_id": str(2581315240139 + i),
+        "title": f" {_title(rnd)} ",
+        "commodity": rnd.choice(("Apparel, Uniforms", "Construction Services", "IT Hardware", "")),
+        "type": rnd.choice(("Commodity / Service", "Construction", "")),
+        "department": rnd.choice(_LACO_DEPTS),
+        "close_date": rnd.choice(("Continuous", "", _date(rnd, " {m}/{d}/{y} 12:00 PM "))),
+    }
+    if rnd.random() < 0.1:
+        del row[rnd.choice(("commodity", "type", "close_date"))]
+    return row
+
+
+def _sam_row(i, rnd):
+    row = {
+        "noticeId": f"{i:08x}{rnd.getrandbits(64):016x}",
+        "title": _title(rnd),
+        "solicitationNumber": f"SOL-{rnd.randint(1000, 99999)}",
+        "fullParentPathName": rnd.choice(("DEPT OF DEFENSE.DEPT OF THE ARMY", "GENERAL SERVICES ADMINISTRATION",
+                                          "VETERANS AFFAIRS, DEPARTMENT OF")),
+        "fullParentPathCode": f"{rnd.randint(10, 99)}.{rnd.randint(1000, 9999)}",
+        "postedDate": _date(rnd, "{y}-{m:02d}-{d:02d}"),
+        "responseDeadLine": _date(rnd, "{y}-{m:02d}-{d:02d}T17:00:00-04:00"),
+        "naicsCode": str(rnd.choice((561720, 238220, 541512, 236220, 811310))),
+        "classificationCode": rnd.choice(("S201", "Z2AA", "R408", "J041")),
+        "type": rnd.choice(_SAM_TYPES),
+        "active": rnd.choice(("Yes", "No")),
+        "uiLink": f"https://sam.gov/opp/{i:x}/view",
+    }
+    roll = rnd.random()
+    if roll < 0.25:
+        row["award"] = {
+            "date": _date(rnd, "{y}-{m:02d}-{d:02d}"),
+            "number": f"W91{rnd.randint(100000, 999999)}",
+            "amount": round(rnd.uniform(1e3, 5e6), 2),
+            "awardee": {"name": rnd.choice(("ACME Corp", "Señor Servicios LLC", "Globex")),
+                        "ueiSAM": f"U{rnd.randint(10**10, 10**11)}", "cageCode": f"{rnd.randint(10000, 99999)}"},
+        }
+    elif roll < 0.35:
+        row["award"] = None
+    elif roll < 0.4:
+        row["award"] = {"amount": "", "awardee": {}}    # partial award
+    if rnd.random() < 0.1:
+        del row[rnd.choice(("responseDeadLine", "naicsCode", "fullParentPathName"))]
+    return row
+
+
+_MAKERS = {"cal": _cal_row, "laco": _laco_row, "sam": _sam_row}
+
+
+def iter_rows(source, n, seed=0):
+    """Yield 'n' raw rows for 'source' ("cal", "laco" or "sam")."""
+    make = _MAKERS[source]
+    rnd = random.Random(f"{source}:{seed}")
+    for i in range(n):
+        yield make(i, rnd)
+
+
+def make_rows(source, n, seed=0):
+    """List form of iter_rows."""
+    return list(iter_rows(source, n, seed))
@@ -0,0 +1,239 @@
+"""
+Offline replay of the LACo and Cal eProcure portals.
+
+Two modes:
+
+  synthetic (default)  Serves the HTML snapshots in tests/fixtures/replay with
+                       the row between <!--ROW--> markers repeated N times with
+                       synthetic values, plus the JSON data endpoint each page
+                       fetches on load (exercises SCRAPE_MODE=xhr).
+  recorded             Serves, verbatim, what `record` captured from the live
+                       sites (documents + XHR/fetch JSON), keyed by URL path.
+
+Usage (from the repository root):
+  python -m benchmarks.replay serve [rows] [port]
+  python -m benchmarks.replay serve-recorded <dir> [port]
+  python -m benchmarks.replay record <dir>          (needs network + Chromium)
+
+Point the scrapers at it with LACO_BASE_URL / CAL_BASE_URL.
+"""
+import asyncio
+import html
+import json
+import os
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "replay")
+
+LACO_PAGE = "/LACoBids/BidLookUp/OpenBidList"
+LACO_DATA = "/LACoBids/BidLookUp/OpenBidListData"
+CAL_PAGE = "/pages/Events-BS3/event-search.aspx"
+CAL_DATA = "/pages/Events-BS3/event-search.aspx/GetEvents"
+
+LIVE_PAGES = {
+    "laco": "https://camisvr.co.la.ca.us" + LACO_PAGE,
+    "cal": "https://caleprocure.ca.gov" + CAL_PAGE,
+}
+
+_DEPARTMENTS = ("Internal Services", "Public Works", "Health Services", "Parks and Recreation")
+_CAL_DEPARTMENTS = ("Dept of Corrections & Rehab", "Department of Transportation", "CAL FIRE", "UCLA")
+
+
+def synthetic_laco(i):
+    """One LACo bid as the page renders it (DOM field names)."""
+    return {
+        "solicitation_number": f"RFB-IS-{26200000 + i}",
+        "bid_id": str(2581315240139 + i),
+        "title": f"Lab Coats - Embroidery #{i}",
+        "commodity": "Apparel, Uniforms",
+        "type": "Commodity / Service" if i % 3 else "Construction",
+        "department": _DEPARTMENTS[i % len(_DEPARTMENTS)],
+        "close_date": "Continuous" if i % 7 == 0 else f"{8 + i % 4}/{1 + i % 28}/2025 12:00 PM",
+    }
+
+
+def synthetic_cal(i):
+    """One Cal eProcure event as the page renders it (DOM field names)."""
+    return {
+        "event_id": f"{i:010d}",
+        "event_name": f"Janitorial Services - Region {i % 12}",
+        "department": _CAL_DEPARTMENTS[i % len(_CAL_DEPARTMENTS)],
+        "end_date": f"{8 + i % 4:02d}/{1 + i % 28:02d}/2025 1:00PM PDT",
+        "status": "Posted",
+    }
+
+
+def _laco_record(row):
+    # Shape of the JSON the Angular table is bound to
+    return {"BidId": row["bid_id"], "BidNumber": row["solicitation_number"], "BidTitle": row["title"],
+            "CommodityDescription": row["commodity"], "BidType": row["type"],
+            "DepartmentName": row["department"], "CloseDate": row["close_date"]}
+
+
+def _cal_record(row):
+    return {"EventId": row["event_id"], "EventName": row["event_name"], "DepName": row["department"],
+            "EndDate": row["end_date"], "Status": row["status"]}
+
+
+def render_snapshot(name, rows):
+    """Expand the <!--ROW--> template of a fixture with the given row dicts."""
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as fh:
+        page = fh.read()
+    head, rest = page.split("<!--ROW-->", 1)
+    template, tail = rest.split("<!--/ROW-->", 1)
+    body = "".join(template.format(**{k: html.escape(str(v)) for k, v in row.items()}) for row in rows)
+    return head + body + tail
+
+
+class ReplayServer:
+    """
+    Threaded local server for both portals.
+
+    rows:         synthetic rows per page (change between runs with .rows = N)
+    recorded_dir: serve a `record` capture instead of synthetic pages
+    hits:         request count per path (to check what a scraper fetched)
+    """
+
+    def __init__(self, rows=20, recorded_dir=None, host="127.0.0.1", port=0):
+        self.rows = rows
+        self.hits = {}
+        self.recorded = None
+        if recorded_dir:
+            with open(os.path.join(recorded_dir, "manifest.json"), encoding="utf-8") as fh:
+                self.recorded = (recorded_dir, json.load(fh))
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, path):
+        """(status, content_type, body_bytes) for a request path."""
+        self.hits[path] = self.hits.get(path, 0) + 1
+        if self.recorded is not None:
+            root, manifest = self.recorded
+            entry = manifest.get(path)
+            if entry is None:
+                return 404, "text/plain", b"not recorded"
+            with open(os.path.join(root, entry["file"]), "rb") as fh:
+                return 200, entry["content_type"], fh.read()
+
+        if path == LACO_PAGE:
+            rows = [synthetic_laco(i) for i in range(self.rows)]
+            return 200, "text/html; charset=utf-8", render_snapshot("laco_openbidlist.html", rows).encode("utf-8")
+        if path == LACO_DATA:
+            rows = [_laco_record(synthetic_laco(i)) for i in range(self.rows)]
+            return 200, "application/json", json.dumps(rows).encode("utf-8")
+        if path == CAL_PAGE:
+            rows = [synthetic_cal(i) for i in range(self.rows)]
+            return 200, "text/html; charset=utf-8", render_snapshot("cal_event_search.html", rows).encode("utf-8")
+        if path == CAL_DATA:
+            # ASP.NET page methods wrap the payload as a JSON string under "d"
+            rows = [_cal_record(synthetic_cal(i)) for i in range(self.rows)]
+            return 200, "application/json", json.dumps({"d": json.dumps(rows)}).encode("utf-8")
+        return 404, "text/plain", b"not found"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urllib.parse.urlsplit(self.path).path
+                status, ctype, body = server.respond(path)
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+async def record(out_dir):
+    """Capture the live pages (documents + JSON responses) into 'out_dir'."""
+    from playwright.async_api import async_playwright
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+
+    async def save(response):
+        kind = response.request.resource_type
+        if kind not in ("document", "xhr", "fetch"):
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        path = urllib.parse.urlsplit(response.url).path
+        name = f"{len(manifest):04d}.bin"
+        with open(os.path.join(out_dir, name), "wb") as fh:
+            fh.write(body)
+        manifest[path] = {"file": name, "content_type": response.headers.get("content-type", ""),
+                          "url": response.url}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        for site, url in LIVE_PAGES.items():
+            page = await browser.new_page()
+            pending = []
+            page.on("response", lambda r: pending.append(asyncio.ensure_future(save(r))))
+            print(f"[replay] recording {site}: {url}", file=sys.stderr)
+            await page.goto(url, timeout=60000)
+            await page.wait_for_load_state("networkidle")
+            await asyncio.gather(*pending)
+            await page.close()
+        await browser.close()
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    print(f"[replay] {len(manifest)} responses saved to {out_dir}", file=sys.stderr)
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("serve", "serve-recorded", "record"):
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    cmd = sys.argv[1]
+    if cmd == "record":
+        asyncio.run(record(sys.argv[2] if len(sys.argv) >= 3 else "replay_capture"))
+        return
+
+    if cmd == "serve":
+        rows = int(sys.argv[2]) if len(sys.argv) >= 3 else 20
+        port = int(sys.argv[3]) if len(sys.argv) >= 4 else 8800
+        server = ReplayServer(rows=rows, port=port)
+    else:
+        port = int(sys.argv[3]) if len(sys.argv) >= 4 else 8800
+        server = ReplayServer(recorded_dir=sys.argv[2], port=port)
+    print(f"[replay] serving on {server.base_url}", file=sys.stderr)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,174 @@
+"""
+Batched Airtable writer.
+
+Workflow 01 wrote one record per `Create a record` call. Airtable accepts up to
+10 records per request and about 5 requests/sec per base, so this writer:
+
+  - chunks normalized rows into 10-record upserts keyed by 'checksum'
+    (PATCH with performUpsert; a row that is already in the table is updated
+    instead of duplicated);
+  - sends the chunks with bounded concurrency (AIRTABLE_CONCURRENCY) through
+    a shared token bucket (AIRTABLE_RATE_PER_SEC) and the pooled HttpClient,
+    which retries 429/5xx with backoff and honors Retry-After;
+  - reports throughput in 'stats'.
+
+update() and find() serve the decision store: in-place updates by record id
+and filterByFormula lookups by checksum.
+
+Usage:
+  python -m scrapers.airtable_writer [rows.json|rows.jsonl|-]   (records as JSONL on stdout)
+"""
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.http_utils import HttpClient, TokenBucket
+except ImportError:  # executed from /app inside the scraper container
+    from http_utils import HttpClient, TokenBucket
+
+API_URL = os.getenv("AIRTABLE_API_URL", "https://api.airtable.com/v0")
+BASE_ID = os.getenv("AIRTABLE_BASE_ID", "appWUC1bwghJqFCxS")
+TABLE = os.getenv("AIRTABLE_TABLE_OPPORTUNITIES", "tblB84d75LsFjBwJI")
+BATCH_SIZE = 10  # API maximum of records per create/update request
+MERGE_FIELDS = ("checksum",)
+
+
+def chunked(rows, size=BATCH_SIZE):
+    """Split rows into lists of at most 'size'."""
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+class AirtableWriter:
+    """
+    Writes rows to one Airtable table in 10-record requests.
+
+    stats counts requests, created/updated records, and the rows/sec of the
+    last write() call.
+    """
+
+    def __init__(self, token=None, base_id=BASE_ID, table=TABLE, url=API_URL, merge_fields=MERGE_FIELDS,
+                 concurrency=None, rate=None, typecast=True, http=None):
+        self.token = token if token is not None else os.getenv("AIRTABLE_TOKEN", "")
+        self.url = f"{url.rstrip('/')}/{base_id}/{urllib.parse.quote(table, safe='')}"
+        self.merge_fields = list(merge_fields or ())
+        self.concurrency = concurrency or int(os.getenv("AIRTABLE_CONCURRENCY", "5"))
+        rate = rate or float(os.getenv("AIRTABLE_RATE_PER_SEC", "5"))
+        self.http = http or HttpClient(bucket=TokenBucket(rate, capacity=self.concurrency))
+        self.typecast = typecast
+        self.stats = {"requests": 0, "created": 0, "updated": 0, "records": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        self._lock = threading.Lock()
+
+    def _body(self, rows):
+        body = {"records": [{"fields": row} for row in rows], "typecast": self.typecast}
+        if self.merge_fields:
+            body["performUpsert"] = {"fieldsToMergeOn": self.merge_fields}
+        return body
+
+    def write_chunk(self, rows):
+        """Create (or upsert) up to BATCH_SIZE rows; returns the Airtable records."""
+        if len(rows) > BATCH_SIZE:
+            raise ValueError(f"at most {BATCH_SIZE} records per request, got {len(rows)}")
+        headers = {"Authorization": f"Bearer {self.token}"}
+        method = "PATCH" if self.merge_fields else "POST"
+        payload = self.http.request(method, self.url, body=self._body(rows), headers=headers).json() or {}
+        records = payload.get("records") or []
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["records"] += len(records)
+            if self.merge_fields:
+                self.stats["created"] += len(payload.get("createdRecords") or [])
+                self.stats["updated"] += len(payload.get("updatedRecords") or [])
+            else:
+                self.stats["created"] += len(records)
+        return records
+
+    def write(self, rows):
+        """
+        Write every row; returns the Airtable records ({"id", "createdTime",
+        "fields"}) in input order.
+        """
+        rows = [row for row in rows if isinstance(row, dict)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(self.write_chunk, chunked(rows)))
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["seconds"] = round(elapsed, 3)
+            self.stats["rows_per_sec"] = round(len(rows) / elapsed, 1) if elapsed > 0 else 0.0
+        return [record for records in results for record in records]
+
+    def update_chunk(self, records):
+        """Update up to BATCH_SIZE existing records ({"id", "fields"}) in place."""
+        if len(records) > BATCH_SIZE:
+            raise ValueError(f"at most {BATCH_SIZE} records per request, got {len(records)}")
+        headers = {"Authorization": f"Bearer {self.token}"}
+        body = {"records": [{"id": r["id"], "fields": r["fields"]} for r in records], "typecast": self.typecast}
+        payload = self.http.request("PATCH", self.url, body=body, headers=headers).json() or {}
+        records = payload.get("records") or []
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["updated"] += len(records)
+        return records
+
+    def update(self, records):
+        """Update records by id, 10 per request; returns them in input order."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(self.update_chunk, chunked(list(records))))
+        return [record for records in results for record in records]
+
+    def find(self, field, values, chunk_size=50):
+        """
+        Records whose 'field' equals one of 'values' (one filterByFormula
+        query per 'chunk_size' values, following pagination).
+        """
+        headers = {"Authorization": f"Bearer {self.token}"}
+        values = list(dict.fromkeys(v for v in values if v))
+        found = []
+        for chunk in chunked(values, chunk_size):
+            terms = ",".join("{%s}='%s'" % (field, str(v).replace("\\", "\\\\").replace("'", "\\'"))
+                             for v in chunk)
+            params = {"filterByFormula": f"OR({terms})", "fields[]": field, "pageSize": 100}
+            while True:
+                url = f"{self.url}?{urllib.parse.urlencode(params)}"
+                payload = self.http.request("GET", url, headers=headers).json() or {}
+                with self._lock:
+                    self.stats["requests"] += 1
+                found.extend(payload.get("records") or [])
+                if not payload.get("offset"):
+                    break
+                params["offset"] = payload["offset"]
+        return found
+
+    def close(self):
+        self.http.close()
+
+
+def _main_cli() -> None:
+    try:
+        from scrapers.formatter import iter_json_rows
+    except ImportError:
+        from formatter import iter_json_rows
+
+    if len(sys.argv) > 2:
+        print("Uso: python -m scrapers.airtable_writer [rows.json|rows.jsonl|-]", file=sys.stderr)
+        sys.exit(2)
+    path = sys.argv[1] if len(sys.argv) == 2 else "-"
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        rows = list(iter_json_rows(stream))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    writer = AirtableWriter()
+    for record in writer.write(rows):
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"[airtable] {json.dumps(writer.stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -7,148 +7,313 @@ import sys
 from datetime import datetime
 from playwright.async_api import async_playwright
 
-# File path where raw results can be written if needed
-OUTPUT_FILE = "./cal_latest.json"
+try:  # imported as part of the 'scrapers' package
+    from scrapers import checkpoints, detail_crawler, metrics, watermark
+    from scrapers.interception import ResponseCapture, block_heavy_resources
+except ImportError:  # executed as /app/cal_eprocure_scraper.py inside the scraper container
+    import checkpoints
+    import detail_crawler
+    import metrics
+    import watermark
+    from interception import ResponseCapture, block_heavy_resources
 
+# Portal origin; override (e.g. CAL_BASE_URL=http://127.0.0.1:8800) to run the
+# scraper against the offline replay server in benchmarks/replay.py
+BASE_URL = os.getenv("CAL_BASE_URL", "https://caleprocure.ca.gov").rstrip("/")
+SEARCH_URL = f"{BASE_URL}/pages/Events-BS3/event-search.aspx"
 
-async def main():
-    qtd = int(os.getenv("SCRAPE_CAL_QTY", "20"))         # <-- from env
-    headless = os.getenv("HEADLESS", "true").lower() == "true"
+# Source keys tried, in order, when mapping captured JSON event records
+CAL_FIELDS = {
+    "event_id": ("EventId", "EventID", "EVENT_ID"),
+    "event_name": ("EventName", "EVENT_NAME", "Title"),
+    "department": ("DepName", "DepartmentName", "Department", "BusinessUnitName"),
+    "end_date": ("EndDate", "EventEndDate", "EVENT_END_DATE"),
+    "status": ("Status", "EventStatus", "STATUS"),
+}
+
+# Mapping of department display names → internal numeric codes.
+# Used to construct valid event detail links.
+DEPARTMENT_MAP = {
+    "Business & Economic Developmnt": "509",
+    "Ofc Technology and Solutions I": "531",
+    "Gov's Off of Lnd Use & Clmt In": "650",
+    "Department of Justice": "820",
+    "State Controller": "840",
+    "CA State Lottery Commission": "850",
+    "State Board of Equalization": "860",
+    "Secretary of State": "890",
+    "HOPE for Children Trust Acct": "957",
+    "Pollution Control Fin Auth": "974",
+    "California ABLE Act Board": "981",
+    "Dept of Finan Protec and Innov": "1701",
+    "Housing & Community Developmnt": "2240",
+    "CA Transportation Commission": "2600",
+    "Department of Transportation": "2660",
+    "Dept of the CA Highway Patrol": "2720",
+    "Department of Motor Vehicles": "2740",
+    "CA African American Museum": "3105",
+    "CA Conservation Corps": "3340",
+    "Department of Conservation": "3480",
+    "CAL FIRE": "3540",
+    "Department of Fish & Wildlife": "3600",
+    "State Coastal Conservancy": "3760",
+    "Dept of Parks & Recreation": "3790",
+    "SF Bay Conservation Commission": "3820",
+    "Department of Water Resources": "3860",
+    "Health Care Access and Informa": "4140",
+    "Dept of Managed Health Care": "4150",
+    "California Department of Aging": "4170",
+    "State Dept Hlth Care Services": "4260",
+    "Department of Public Health": "4265",
+    "Dept of Developmental Services": "4300",
+    "Department of State Hospitals": "4440",
+    "CA Health Benefit Exchange": "4800",
+    "Department of Rehabilitation": "5160",
+    "Department of Social Services": "5180",
+    "Dept of Corrections & Rehab": "5225",
+    "State & Community Corrections": "5227",
+    "Prison Industry Authority": "5420",
+    "Department of Education": "6100",
+    "School for the Deaf-Riverside": "6250",
+    "State Summer School for Arts": "6255",
+    "Institute for Regenerative Med": "6445",
+    "UC Davis Medical Center": "6511",
+    "UCLA": "6530",
+    "CSU, San Bernardino": "6660",
+    "CSU, Long Beach": "6740",
+    "CSU, Sacramento": "6780",
+    "CSU, San Diego": "6790",
+    "CSU, San Francisco": "6800",
+    "CSU, San Jose": "6810",
+    "Cal-Poly San Luis Obispo": "6820",
+    "Employment Development Dept": "7100",
+    "Dept of Industrial Relations": "7350",
+    "Statewide STPD": "75021",
+    "Franchise Tax Board": "7730",
+    "Department of General Services": "7760",
+    "DGS - Statewide Procurement": "77601",
+    "State Teachers' Retirement Sys": "7920",
+    "Dept of Food & Agriculture": "8570",
+    "Public Utilities Commission": "8660",
+    "Military Department": "8940",
+    "Dept of Veterans Affairs": "8955",
+    "32nd DAA -Costa Mesa": "SS246",
+}
+
+# Pulls every rendered row of the current table page in one browser round trip.
+EXTRACT_ROWS_JS = """
+() => Array.from(document.querySelectorAll("#datatable-ready tbody tr")).map((tr) => {
+  const text = (label) => {
+    const el = tr.querySelector(`[data-if-label='${label}']`);
+    return el ? el.innerText.trim() : null;
+  };
+  return {
+    event_id: text("tdEventId"),
+    event_name: text("tdEventName"),
+    department: text("tdDepName"),
+    end_date: text("tdEndDate"),
+    status: text("tdStatus"),
+  };
+})
+"""
+
+# Page count/size of the client-side DataTable; a single page when the
+# DataTables API is not exposed (the previous first-page-only behavior).
+PAGE_INFO_JS = """
+() => {
+  const $ = window.jQuery;
+  if ($ && $.fn && $.fn.dataTable && $.fn.dataTable.isDataTable("#datatable-ready")) {
+    const info = $("#datatable-ready").DataTable().page.info();
+    return { pages: info.pages, length: info.length };
+  }
+  return { pages: 1, length: document.querySelectorAll("#datatable-ready tbody tr").length };
+}
+"""
+
+# Jump the DataTable to a given zero-based page and report when it is drawn.
+GOTO_PAGE_JS = """
+(index) => { window.jQuery("#datatable-ready").DataTable().page(index).draw("page"); }
+"""
+PAGE_READY_JS = """
+(index) => {
+  const busy = document.querySelector("#datatable-ready_processing");
+  return window.jQuery("#datatable-ready").DataTable().page() === index
+    && (!busy || busy.style.display === "none");
+}
+"""
+
+
+def with_link(row):
+    """Attach the official event link, built from the department code and event id."""
+    # Map department to numeric ID, default "undefined" if not in dictionary
+    dep_id = DEPARTMENT_MAP.get(row.get("department"), "undefined")
+    return {**row, "link": f"{BASE_URL}/event/{dep_id}/{row.get('event_id')}"}
+
+
+def detail_url(row):
+    """Event page of a row; None when the department code is unknown (the link would 404)."""
+    link = row.get("link") or ""
+    return None if "/undefined/" in link else link
+
+
+async def extract_rows(page):
+    """Extract every row of the currently drawn table page with one page.evaluate call."""
+    return await page.evaluate(EXTRACT_ROWS_JS)
+
+
+async def open_search_page(context, page=None):
+    """Navigate a (new) tab to the event search page and wait for the table to render."""
+    page = page or await context.new_page()
+    with metrics.span("goto", source="cal"):
+        await page.goto(SEARCH_URL, timeout=60000)
+    with metrics.span("table_wait", source="cal"):
+        await page.wait_for_selector("#datatable-ready tbody tr")
+    return page
+
+
+async def fetch_table_page(context, index, semaphore):
+    """Load table page 'index' in its own tab (bounded by 'semaphore') and extract it."""
+    async with semaphore:
+        page = await open_search_page(context)
+        try:
+            with metrics.span("page_switch", source="cal"):
+                await page.evaluate(GOTO_PAGE_JS, index)
+                await page.wait_for_function(PAGE_READY_JS, arg=index)
+            with metrics.span("extraction", source="cal", mode="dom"):
+                rows = await extract_rows(page)
+            print(f"Página {index + 1}: {len(rows)} linhas", file=sys.stderr)
+            return rows
+        finally:
+            await page.close()
+
+
+async def scrape(browser, qtd=None, mode=None, concurrency=None):
     """
-    Scraper for Cal eProcure opportunities.
+    Scrape Cal eProcure opportunities with an already running browser.
 
     Flow:
-      1. Launch a headless Chromium browser using Playwright.
+      1. Open a fresh browser context on the given (possibly shared) Chromium.
       2. Navigate to the Cal eProcure event search page.
-      3. Wait for the data table with event rows to load.
-      4. Extract relevant fields for the first N rows (event_id, name, dept, deadline, status).
+      3. Wait for the data table with event rows to load. In SCRAPE_MODE=xhr
+         (default) images/fonts/stylesheets are blocked and the JSON that fills
+         '#datatable-ready' is captured; when it maps to events, step 4 is skipped.
+      4. Extract each table page with one in-page evaluation; when the first page
+         holds fewer than N rows, fetch the following pages concurrently in
+         separate tabs (at most SCRAPE_CAL_CONCURRENCY at a time). With
+         SCRAPE_INCREMENTAL=1 the pages are fetched one wave of
+         SCRAPE_CAL_CONCURRENCY pages at a time, and paging stops once a run
+         of already-seen events is reached (watermark).
       5. Map department names to internal numeric IDs to build official event links.
-      6. Output the list of opportunities as JSON to stdout.
+      6. With SCRAPE_DETAILS=1, fill posted_date/estimated_value/naics_code
+         from the event pages (detail_crawler; cached by event id + status).
+
+    Returns:
+      list of raw event dicts (input of formatter.format_opportunities_cal).
+    """
+    qtd = qtd if qtd is not None else int(os.getenv("SCRAPE_CAL_QTY", "20"))
+    mode = (mode or os.getenv("SCRAPE_MODE", "xhr")).lower()     # xhr | dom
+    if concurrency is None:
+        concurrency = int(os.getenv("SCRAPE_CAL_CONCURRENCY", "4"))
+
+    seen = watermark.session("cal", key="event_id", sort_key="end_date")
+    context = await browser.new_context()
+    print("Abrindo", file=sys.stderr)
+
+    page = await context.new_page()
+    capture = None
+    if mode == "xhr":
+        await block_heavy_resources(context)
+        capture = ResponseCapture(page)
+
+    # Navigate to Cal eProcure event search page and wait for the table rows
+    print("Carregando tabela com dados", file=sys.stderr)
+    await open_search_page(context, page)
+    print("✅ Página carregada com sucesso", file=sys.stderr)
+
+    rows = []
+    if capture is not None:
+        with metrics.span("extraction", source="cal", mode="xhr"):
+            rows = await capture.records(CAL_FIELDS, required=("event_id", "event_name"))
+
+    pages_needed = 1
+    if not rows:
+        # First page comes from the tab that is already open
+        print("Pegando as linhas", file=sys.stderr)
+        with metrics.span("extraction", source="cal", mode="dom"):
+            rows = await extract_rows(page)
+        info = await page.evaluate(PAGE_INFO_JS)
+        per_page = max(1, info["length"] or len(rows) or 1)
+        pages_needed = min(info["pages"], -(-qtd // per_page))
+
+    fetched = len(rows)
+    seen.feed(rows)
+
+    # Remaining pages (only as many as SCRAPE_CAL_QTY needs), in parallel tabs;
+    # incremental runs go one wave at a time and stop at known events
+    if pages_needed > 1:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        wave = max(1, concurrency) if seen.incremental else pages_needed
+        index = 1
+        while index < pages_needed and not seen.reached:
+            batch = range(index, min(pages_needed, index + wave))
+            others = await asyncio.gather(*(fetch_table_page(context, i, semaphore) for i in batch))
+            for page_rows in others:
+                fetched += len(page_rows)
+                seen.feed(page_rows)
+            index = batch.stop
+
+    await context.close()
+
+    # Limit: number of rows to scrape (configurable)
+    rows = seen.rows()
+    metrics.count("rows_in", fetched, source="cal")
+    metrics.count("rows_out", min(len(rows), qtd), source="cal")
+    if seen.reached:
+        print(f"[watermark] cal: {len(rows)} new or changed events before known ones", file=sys.stderr)
+    events = [with_link(row) for row in rows[:qtd]]
+    events = await detail_crawler.maybe_enrich(browser, events, "cal", key="event_id", status="status",
+                                               url=detail_url)
+    seen.stage(events)
+    return events
+
+
+async def main():
+    headless = os.getenv("HEADLESS", "true").lower() == "true"
+    """
+    Standalone entry point: launch Chromium, run scrape(), print the rows as JSON
+    to stdout (the contract expected by the n8n `cal eprocure1` node).
 
     This scraper is used as one of the two required data sources for the aggregator
     (Cal eProcure + SAM.gov) as described in the assignment.
+
+    With RUN_ID and CHECKPOINT_DIR set (n8n passes the id of the current run),
+    the rows are checkpointed as the run's raw 'cal' stage, and a resumed
+    run prints that checkpoint instead of scraping again.
     """
 
+    run = checkpoints.from_env()
+    if run is not None and run.completed("raw", "cal"):
+        print(f"[checkpoint] cal: raw rows of run {run.run_id}", file=sys.stderr)
+        print(json.dumps(list(run.rows("raw", "cal"))))
+        return
+
     async with async_playwright() as p:
         # Launch Chromium in headless mode (no visible UI)
-        browser = await p.chromium.launch(headless=headless)
-        print("Abrindo", file=sys.stderr)
+        with metrics.span("browser_launch", source="cal"):
+            browser = await p.chromium.launch(headless=headless)
 
-        # Open a new browser page
-        page = await browser.new_page()
+        try:
+            with metrics.span("scrape", source="cal"):
+                opportunities = await scrape(browser)
+        except Exception:
+            metrics.count("errors", source="cal", stage="scrape")
+            raise
+        finally:
+            metrics.flush("cal")
 
-        # Navigate to Cal eProcure event search page
-        await page.goto("https://caleprocure.ca.gov/pages/Events-BS3/event-search.aspx", timeout=60000)
-        print("✅ Página carregada com sucesso", file=sys.stderr)
-
-        # Wait until the table with data rows is fully available
-        print("Carregando tabela com dados", file=sys.stderr)
-        await page.wait_for_selector("#datatable-ready tbody tr")
-        
-        # Extract all rows from the table body
-        print("Pegando as linhas", file=sys.stderr)
-        rows = await page.query_selector_all("#datatable-ready tbody tr")
-
-        # Mapping of department display names → internal numeric codes.
-        # Used to construct valid event detail links.
-        department_map = {
-            "Business & Economic Developmnt": "509",
-            "Ofc Technology and Solutions I": "531",
-            "Gov's Off of Lnd Use & Clmt In": "650",
-            "Department of Justice": "820",
-            "State Controller": "840",
-            "CA State Lottery Commission": "850",
-            "State Board of Equalization": "860",
-            "Secretary of State": "890",
-            "HOPE for Children Trust Acct": "957",
-            "Pollution Control Fin Auth": "974",
-            "California ABLE Act Board": "981",
-            "Dept of Finan Protec and Innov": "1701",
-            "Housing & Community Developmnt": "2240",
-            "CA Transportation Commission": "2600",
-            "Department of Transportation": "2660",
-            "Dept of the CA Highway Patrol": "2720",
-            "Department of Motor Vehicles": "2740",
-            "CA African American Museum": "3105",
-            "CA Conservation Corps": "3340",
-            "Department of Conservation": "3480",
-            "CAL FIRE": "3540",
-            "Department of Fish & Wildlife": "3600",
-            "State Coastal Conservancy": "3760",
-            "Dept of Parks & Recreation": "3790",
-            "SF Bay Conservation Commission": "3820",
-            "Department of Water Resources": "3860",
-            "Health Care Access and Informa": "4140",
-            "Dept of Managed Health Care": "4150",
-            "California Department of Aging": "4170",
-            "State Dept Hlth Care Services": "4260",
-            "Department of Public Health": "4265",
-            "Dept of Developmental Services": "4300",
-            "Department of State Hospitals": "4440",
-            "CA Health Benefit Exchange": "4800",
-            "Department of Rehabilitation": "5160",
-            "Department of Social Services": "5180",
-            "Dept of Corrections & Rehab": "5225",
-            "State & Community Corrections": "5227",
-            "Prison Industry Authority": "5420",
-            "Department of Education": "6100",
-            "School for the Deaf-Riverside": "6250",
-            "State Summer School for Arts": "6255",
-            "Institute for Regenerative Med": "6445",
-            "UC Davis Medical Center": "6511",
-            "UCLA": "6530",
-            "CSU, San Bernardino": "6660",
-            "CSU, Long Beach": "6740",
-            "CSU, Sacramento": "6780",
-            "CSU, San Diego": "6790",
-            "CSU, San Francisco": "6800",
-            "CSU, San Jose": "6810",
-            "Cal-Poly San Luis Obispo": "6820",
-            "Employment Development Dept": "7100",
-            "Dept of Industrial Relations": "7350",
-            "Statewide STPD": "75021",
-            "Franchise Tax Board": "7730",
-            "Department of General Services": "7760",
-            "DGS - Statewide Procurement": "77601",
-            "State Teachers' Retirement Sys": "7920",
-            "Dept of Food & Agriculture": "8570",
-            "Public Utilities Commission": "8660",
-            "Military Department": "8940",
-            "Dept of Veterans Affairs": "8955",
-            "32nd DAA -Costa Mesa": "SS246",
-        }
-
-        # Limit: number of rows to scrape (configurable)
-
-        opportunities = []
-        # Loop through first N rows and extract event details
-        for row in rows[:qtd]:
-            event_id = await row.query_selector("[data-if-label='tdEventId']")
-            event_name = await row.query_selector("[data-if-label='tdEventName']")
-            dep_name = await row.query_selector("[data-if-label='tdDepName']")
-            end_date = await row.query_selector("[data-if-label='tdEndDate']")
-            status = await row.query_selector("[data-if-label='tdStatus']")
-
-            # Clean text values (strip whitespace) if elements exist
-            department = (await dep_name.inner_text()).strip() if dep_name else None
-            evnt_id = (await event_id.inner_text()).strip() if event_id else None
-
-            # Map department to numeric ID, default "undefined" if not in dictionary
-            dep_id = department_map.get(department, "undefined")
-
-            # Construct official event link using dep_id and evnt_id
-            link = f"https://caleprocure.ca.gov/event/{dep_id}/{evnt_id}"
-            
-            # Build opportunity record
-            opportunity = {
-                "event_id": (await event_id.inner_text()).strip() if event_id else None,
-                "event_name": (await event_name.inner_text()).strip() if event_name else None,
-                "department": (await dep_name.inner_text()).strip() if dep_name else None,
-                "end_date": (await end_date.inner_text()).strip() if end_date else None,
-                "status": (await status.inner_text()).strip() if status else None,
-                "link": link
-            }
-            opportunities.append(opportunity)
+        if run is not None:
+            run.append("raw", "cal", opportunities)
+            run.complete("raw", "cal")
 
         # Output the final list of extracted opportunities as JSON
         print(json.dumps(opportunities))
@@ -160,4 +325,3 @@ async def main():
 if __name__ == "__main__":
     # Run the scraper asynchronously when called directly
     asyncio.run(main())
-
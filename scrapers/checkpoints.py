@@ -0,0 +1,305 @@
+"""
+Stage checkpoints for resumable ingestion runs.
+
+A failure in the SAM.gov request, a scraper or the LLM loop used to send the
+next run back to the start: Chromium relaunched, portals re-scraped, rows
+re-normalized (and, with CHECKSUM_INDEX, now dropped as already seen) and
+tokens paid again. Every run now gets an id and a directory
+CHECKPOINT_DIR/<run_id>/ holding its stage output:
+
+  raw/         scraper / SAM.gov rows, per source
+  normalized/  /format output (after checksum and near-duplicate filtering), per source
+  enriched/    LLM-enriched rows (/enrich/store) and the /score input, whole run
+  written/     checksums upserted into Airtable, whole run
+
+Each stage is a series of gzip JSONL batch files, written once
+(<source>.<attempt>.<seq>.jsonl.gz, renamed into place when complete) and
+never modified. manifest.jsonl is an append-only log: one line when the run
+starts (with its sources) and one line whenever a stage of a source is
+complete. A stage re-done after a crash gets a new attempt number, so the
+batches of the interrupted attempt are never mixed into the result.
+
+A resumed run (POST /runs/start, `python -m scrapers.ingest --resume`) picks
+up at the first incomplete stage: completed raw/normalized stages are
+replayed instead of re-scraped, rows already enriched in the run are served
+to /enrich/lookup from the checkpoint, and checksums already written are not
+sent to Airtable again. A run whose sources normalized to no rows at all
+(nothing new or changed that day) never reaches /score or /airtable/write,
+so its enriched and written stages are completed right away.
+
+Usage:
+  python -m scrapers.checkpoints list [root]
+  python -m scrapers.checkpoints show [run_id] [root]
+  python -m scrapers.checkpoints prune [root]
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+DEFAULT_ROOT = os.getenv("CHECKPOINT_DIR", "/data/runs")
+RESUME_HOURS = float(os.getenv("CHECKPOINT_RESUME_HOURS", "12"))  # well under the daily schedule
+KEEP_DAYS = float(os.getenv("CHECKPOINT_KEEP_DAYS", "7"))
+
+STAGES = ("raw", "normalized", "enriched", "written")
+SOURCE_STAGES = ("raw", "normalized")  # kept per source; later stages cover the whole run
+ALL = "all"
+SOURCES = ("cal", "laco", "sam")
+
+_RUN_ID = re.compile(r"^[A-Za-z0-9][\w.-]*$")
+_BATCH = re.compile(r"^(?P<source>[\w-]+)\.(?P<attempt>\d+)\.(?P<seq>\d+)\.jsonl\.gz$")
+MANIFEST = "manifest.jsonl"
+
+
+def _utc_stamp():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def new_run_id(now=None):
+    """Sortable run id: UTC start time plus a random suffix."""
+    return (now or datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ") + "-" + uuid.uuid4().hex[:6]
+
+
+class RunCheckpoint:
+    """
+    Checkpoint directory of one run.
+
+    One instance can be shared by threads; batches of the same stage and
+    source appended through it belong to the same attempt until complete().
+    """
+
+    def __init__(self, run_id, root=DEFAULT_ROOT):
+        if not run_id or not _RUN_ID.match(run_id):
+            raise ValueError(f"invalid run id: {run_id!r}")
+        self.run_id = run_id
+        self.root = root
+        self.dir = os.path.join(root, run_id)
+        self._lock = threading.Lock()
+        self._open = {}  # (stage, source) -> [attempt, batches, rows]
+
+    @classmethod
+    def create(cls, sources=SOURCES, root=DEFAULT_ROOT, run_id=None):
+        """Start a new run over 'sources'."""
+        run = cls(run_id or new_run_id(), root)
+        os.makedirs(run.dir, exist_ok=True)
+        run._log({"run": run.run_id, "sources": list(sources), "started": time.time(), "at": _utc_stamp()})
+        return run
+
+    @property
+    def exists(self):
+        return os.path.exists(os.path.join(self.dir, MANIFEST))
+
+    def _log(self, entry):
+        with self._lock, open(os.path.join(self.dir, MANIFEST), "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry) + "\n")
+
+    def manifest(self):
+        try:
+            with open(os.path.join(self.dir, MANIFEST), encoding="utf-8") as fh:
+                return [json.loads(line) for line in fh if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    @property
+    def sources(self):
+        start = next((e for e in self.manifest() if "run" in e), {})
+        return tuple(start.get("sources") or SOURCES)
+
+    @property
+    def started(self):
+        start = next((e for e in self.manifest() if "run" in e), None)
+        if start is None:
+            raise ValueError(f"no run {self.run_id!r} in {self.root}")
+        return start["started"]
+
+    def _check(self, stage, source):
+        if stage not in STAGES:
+            raise ValueError(f"unknown stage {stage!r} (expected one of {', '.join(STAGES)})")
+        if not source or not re.match(r"^[\w-]+$", source):
+            raise ValueError(f"invalid source: {source!r}")
+
+    def _files(self, stage, source):
+        """[(attempt, seq, path)] of the batches of 'source' in 'stage', in order."""
+        folder = os.path.join(self.dir, stage)
+        found = []
+        for name in os.listdir(folder) if os.path.isdir(folder) else ():
+            match = _BATCH.match(name)
+            if match and match["source"] == source:
+                found.append((int(match["attempt"]), int(match["seq"]), os.path.join(folder, name)))
+        return sorted(found)
+
+    def _attempt(self, stage, source):
+        key = (stage, source)
+        if key not in self._open:
+            done = [e["attempt"] for e in self._completions(stage, source)]
+            last = max([a for a, _, _ in self._files(stage, source)] + done + [0])
+            self._open[key] = [last + 1, 0, 0]
+        return self._open[key]
+
+    def append(self, stage, source, rows):
+        """Write 'rows' as the next batch of 'source' in 'stage'; returns how many."""
+        self._check(stage, source)
+        rows = list(rows)
+        with self._lock:
+            state = self._attempt(stage, source)
+            if not rows:
+                return 0
+            state[1] += 1
+            state[2] += len(rows)
+            attempt, seq = state[0], state[1]
+        folder = os.path.join(self.dir, stage)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{source}.{attempt}.{seq:05d}.jsonl.gz")
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(path + ".tmp", path)
+        return len(rows)
+
+    def complete(self, stage, source=ALL):
+        """Mark the current attempt of 'source' in 'stage' as complete."""
+        self._check(stage, source)
+        with self._lock:
+            attempt, batches, rows = self._attempt(stage, source)
+            del self._open[(stage, source)]
+        self._log({"stage": stage, "source": source, "attempt": attempt, "batches": batches, "rows": rows,
+                   "at": _utc_stamp()})
+
+    def _completions(self, stage, source):
+        return [e for e in self.manifest() if e.get("stage") == stage and e.get("source") == source]
+
+    def completed(self, stage, source=ALL):
+        return bool(self._completions(stage, source))
+
+    def batches(self, stage, source=ALL, partial=False):
+        """
+        Yield the row batches of 'source' in 'stage': those of the completed
+        attempt, or with partial=True those of every attempt (e.g. LLM rows
+        stored before a crash).
+        """
+        done = self._completions(stage, source)
+        if not done and not partial:
+            return
+        attempt = done[-1]["attempt"] if done else None
+        for number, _, path in self._files(stage, source):
+            if partial or number == attempt:
+                with gzip.open(path, "rt", encoding="utf-8") as fh:
+                    yield [json.loads(line) for line in fh if line.strip()]
+
+    def rows(self, stage, source=ALL, partial=False):
+        for batch in self.batches(stage, source, partial):
+            yield from batch
+
+    def next_stage(self):
+        """(stage, pending sources) of the first incomplete stage; None when the run is complete."""
+        for stage in STAGES:
+            if stage in SOURCE_STAGES:
+                pending = [s for s in self.sources if not self.completed(stage, s)]
+                if pending:
+                    return stage, pending
+            elif not self.completed(stage):
+                return stage, []
+        return None
+
+    def close_if_empty(self):
+        """
+        Complete the enriched and written stages when every source's
+        normalized stage is complete and empty: the workflow has nothing to
+        enrich or write, so the run would otherwise stay open. Returns True
+        when the run was closed here.
+        """
+        if self.completed("written"):
+            return False
+        for source in self.sources:
+            done = self._completions("normalized", source)
+            if not done or done[-1]["rows"]:
+                return False
+        for stage in ("enriched", "written"):
+            if not self.completed(stage):
+                self.complete(stage)
+        return True
+
+    def summary(self):
+        stages = {}
+        for entry in self.manifest():
+            if "stage" in entry:
+                stages.setdefault(entry["stage"], {})[entry["source"]] = entry["rows"]
+        pending = self.next_stage()
+        return {"run_id": self.run_id, "sources": list(self.sources), "stages": stages,
+                "next": {"stage": pending[0], "sources": pending[1]} if pending else None}
+
+
+def list_runs(root=DEFAULT_ROOT):
+    """Run ids under 'root', oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if _RUN_ID.match(name) and os.path.exists(os.path.join(root, name, MANIFEST)))
+
+
+def latest(root=DEFAULT_ROOT):
+    runs = list_runs(root)
+    return RunCheckpoint(runs[-1], root) if runs else None
+
+
+def resume_or_start(sources=SOURCES, root=DEFAULT_ROOT, max_age_hours=RESUME_HOURS):
+    """
+    The latest run when it is incomplete and younger than 'max_age_hours',
+    otherwise a new one. Returns (run, resumed).
+    """
+    run = latest(root)
+    if run is not None:
+        run.close_if_empty()  # runs left open before empty days were closed at /format
+    if run is not None and run.next_stage() is not None and time.time() - run.started < max_age_hours * 3600:
+        return run, True
+    prune(root)
+    return RunCheckpoint.create(sources, root), False
+
+
+def prune(root=DEFAULT_ROOT, keep_days=KEEP_DAYS):
+    """Delete runs started more than 'keep_days' ago; returns their ids."""
+    removed = []
+    for run_id in list_runs(root):
+        run = RunCheckpoint(run_id, root)
+        if time.time() - run.started > keep_days * 86400:
+            shutil.rmtree(run.dir, ignore_errors=True)
+            removed.append(run_id)
+    return removed
+
+
+def from_env():
+    """Run named by $RUN_ID under $CHECKPOINT_DIR, or None when either is unset."""
+    run_id = os.getenv("RUN_ID", "").strip()
+    root = os.getenv("CHECKPOINT_DIR")
+    return RunCheckpoint(run_id, root) if run_id and root else None
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("list", "show", "prune"):
+        print("Uso: python -m scrapers.checkpoints <list | show [run_id] | prune> [root]", file=sys.stderr)
+        sys.exit(2)
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "show":
+        root = args[1] if len(args) >= 2 else DEFAULT_ROOT
+        run = RunCheckpoint(args[0], root) if args else latest(root)
+        if run is None or not run.exists:
+            print(f"no run found in {root}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(run.summary()))
+        return
+    root = args[0] if args else DEFAULT_ROOT
+    if command == "prune":
+        print(json.dumps({"root": root, "removed": prune(root)}))
+    else:
+        for run_id in list_runs(root):
+            print(json.dumps(RunCheckpoint(run_id, root).summary()))
+
+
+if __name__ == "__main__":
+    _main_cli()
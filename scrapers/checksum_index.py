@@ -0,0 +1,339 @@
+"""
+Local, persistent index of checksums that were already ingested.
+
+Workflow 01 used to find duplicates by pulling existing rows from Airtable
+(`Search records`) and merging them against the new checksums. This module keeps
+the same information in a SQLite file next to the scrapers, so duplicates can be
+dropped before they leave the scraper container.
+
+The checksum only covers id|title, so it also stores a content fingerprint
+per checksum: one short digest per normalized field, plus a digest of those.
+diff() compares incoming rows with the last stored fingerprint. It keeps new
+rows and rows whose content changed (an amended deadline, award_amount or
+active flag), together with the list of changed fields. Unchanged rows are
+dropped.
+
+The formatter only stages what it returns (stage=True): the checksums and
+fingerprints of new and changed rows wait in `pending` and are committed
+once Airtable has accepted the rows (POST /airtable/write). A run that fails
+after normalization therefore sends the same rows again next time.
+
+Usage:
+  python -m scrapers.checksum_index rebuild <airtable_export.csv|json> [db_path]
+  python -m scrapers.checksum_index stats [db_path]
+"""
+import csv
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.sqlite_store import SqliteStore
+except ImportError:  # executed from /app inside the scraper container
+    from sqlite_store import SqliteStore
+
+DEFAULT_PATH = os.getenv("CHECKSUM_INDEX", "/data/checksums.sqlite")
+
+# SQLite's default cap on bound parameters per statement
+_MAX_PARAMS = 900
+
+# Fields left out of the content fingerprint: the key itself and the
+# normalization timestamp, which differs on every run
+UNFINGERPRINTED_FIELDS = frozenset({"checksum", "created_at"})
+
+
+def field_digests(row):
+    """{field: short digest of its value} over the fingerprinted fields of a row."""
+    return {
+        field: hashlib.blake2b(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"),
+                               digest_size=6).hexdigest()
+        for field, value in row.items() if field not in UNFINGERPRINTED_FIELDS
+    }
+
+
+def content_fingerprint(digests):
+    """Digest of a row's field digests (see field_digests), independent of key order."""
+    return hashlib.sha1(json.dumps(sorted(digests.items())).encode("utf-8")).hexdigest()
+
+
+def changed_fields(old, new):
+    """Fields whose digest differs between two field_digests() maps, in row order."""
+    fields = [f for f in new if old.get(f) != new[f]]
+    return fields + [f for f in old if f not in new]
+
+
+def _utc_stamp():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+class ChecksumIndex(SqliteStore):
+    """
+    Set-like view over a SQLite table of known checksums.
+
+    Lookups are batched (one indexed `IN (...)` query per ~900 checksums), so the
+    cost of a run grows with the size of the batch, not with the size of the base.
+    Safe to share between the threads of the formatter HTTP server.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checksums ("
+            " checksum TEXT PRIMARY KEY,"
+            " first_seen TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " checksum TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " fields TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " checksum TEXT PRIMARY KEY,"
+            " fingerprint TEXT,"
+            " fields TEXT,"
+            " staged_at TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checksums").fetchone()[0]
+
+    def __contains__(self, checksum):
+        return bool(self.known([checksum]))
+
+    def known(self, checksums):
+        """Return the subset of 'checksums' already present in the index."""
+        checksums = list(dict.fromkeys(c for c in checksums if c))
+        found = set()
+        with self._lock:
+            for i in range(0, len(checksums), _MAX_PARAMS):
+                chunk = checksums[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(f"SELECT checksum FROM checksums WHERE checksum IN ({marks})", chunk)
+                found.update(r[0] for r in cur)
+        return found
+
+    def add_many(self, checksums):
+        """Record checksums as seen; already-known ones are ignored."""
+        now = _utc_stamp()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO checksums (checksum, first_seen) VALUES (?, ?)",
+                ((c, now) for c in checksums if c),
+            )
+            self._conn.commit()
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def _stage(self, entries):
+        """Park (checksum, fingerprint, fields) until commit(); fingerprint may be None."""
+        now = _utc_stamp()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pending (checksum, fingerprint, fields, staged_at) VALUES (?, ?, ?, ?)",
+                ((c, fp, fields, now) for c, fp, fields in entries if c))
+            self._conn.commit()
+
+    def commit(self, checksums):
+        """
+        Record staged checksums (and their fingerprints) once their rows were
+        written; unstaged checksums are added as known. Returns how many.
+        """
+        checksums = list(dict.fromkeys(c for c in checksums if c))
+        staged = []
+        with self._lock:
+            for i in range(0, len(checksums), _MAX_PARAMS):
+                chunk = checksums[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(chunk))
+                staged.extend(self._conn.execute(
+                    f"SELECT checksum, fingerprint, fields FROM pending WHERE checksum IN ({marks})", chunk))
+        self.add_many(checksums)
+        now = _utc_stamp()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (checksum, fingerprint, fields, updated_at)"
+                " VALUES (?, ?, ?, ?)", ((c, fp, fields, now) for c, fp, fields in staged if fp))
+            self._conn.executemany("DELETE FROM pending WHERE checksum = ?", ((c,) for c in checksums))
+            self._conn.commit()
+        return len(checksums)
+
+    def filter_new(self, rows, record=True, stage=False):
+        """
+        Bulk "filter new": keep rows whose 'checksum' is not in the index.
+
+        Duplicates inside the batch itself are dropped too (first one wins).
+        With record=True the surviving checksums are added to the index, so the
+        next run treats them as already seen; with stage=True they are only
+        staged until commit().
+        """
+        rows = list(rows)
+        seen = self.known(r.get("checksum") for r in rows)
+        fresh = []
+        for row in rows:
+            checksum = row.get("checksum")
+            if checksum in seen:
+                continue
+            seen.add(checksum)
+            fresh.append(row)
+        if stage:
+            self._stage((r.get("checksum"), None, None) for r in fresh)
+        elif record:
+            self.add_many(r.get("checksum") for r in fresh)
+        return fresh
+
+    def iter_new(self, rows, chunk_size=500, record=True, stage=False):
+        """Streaming variant of filter_new: checks the index one chunk at a time."""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield from self.filter_new(chunk, record=record, stage=stage)
+                chunk = []
+        if chunk:
+            yield from self.filter_new(chunk, record=record, stage=stage)
+
+    def fingerprints(self, checksums):
+        """{checksum: (fingerprint, field digests)} for the checksums that have one."""
+        checksums = list(dict.fromkeys(c for c in checksums if c))
+        found = {}
+        with self._lock:
+            for i in range(0, len(checksums), _MAX_PARAMS):
+                chunk = checksums[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    f"SELECT checksum, fingerprint, fields FROM fingerprints WHERE checksum IN ({marks})", chunk)
+                found.update((c, (fp, json.loads(fields))) for c, fp, fields in cur)
+        return found
+
+    def diff(self, rows, record=True, stage=False):
+        """
+        Change-only filter: keep new rows and rows whose content changed.
+
+        A known checksum without a stored fingerprint (e.g. seeded by rebuild())
+        counts as unchanged and its fingerprint becomes the baseline. Duplicates
+        inside the batch are dropped (first one wins). With record=True the
+        index is updated, so the next run compares against this batch. With
+        stage=True only baselines are stored; the returned rows are staged
+        until commit().
+
+        Returns:
+          (rows, changes) where changes[i] describes rows[i] as
+          {"checksum": ..., "status": "new" | "changed", "fields": [...]}.
+        """
+        rows = list(rows)
+        checksums = [r.get("checksum") for r in rows]
+        known = self.known(checksums)
+        stored = self.fingerprints(checksums)
+        out, changes, new, updates, baselines, seen = [], [], [], [], [], set()
+        now = _utc_stamp()
+        for row in rows:
+            checksum = row.get("checksum")
+            if checksum in seen:
+                continue
+            seen.add(checksum)
+            digests = field_digests(row)
+            fingerprint = content_fingerprint(digests)
+            previous = stored.get(checksum)
+            if checksum not in known:
+                new.append(checksum)
+                change = {"checksum": checksum, "status": "new", "fields": list(digests)}
+            elif previous is None:
+                change = None
+            elif previous[0] == fingerprint:
+                continue
+            else:
+                change = {"checksum": checksum, "status": "changed", "fields": changed_fields(previous[1], digests)}
+            if checksum:
+                entry = (checksum, fingerprint, json.dumps(digests), now)
+                (updates if change is not None else baselines).append(entry)
+            if change is not None:
+                out.append(row)
+                changes.append(change)
+        if stage:
+            self._stage(entry[:3] for entry in updates)
+            updates, new = baselines, []
+        else:
+            updates += baselines
+        if record or stage:
+            self.add_many(new)
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO fingerprints (checksum, fingerprint, fields, updated_at)"
+                    " VALUES (?, ?, ?, ?)", updates)
+                self._conn.commit()
+        return out, changes
+
+    def iter_changed(self, rows, chunk_size=500, record=True, stage=False):
+        """Streaming variant of diff: yields the new and changed rows, one chunk at a time."""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield from self.diff(chunk, record=record, stage=stage)[0]
+                chunk = []
+        if chunk:
+            yield from self.diff(chunk, record=record, stage=stage)[0]
+
+    def rebuild(self, checksums):
+        """Replace the whole index with 'checksums' (e.g. from an Airtable export)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM checksums")
+            self._conn.execute("DELETE FROM fingerprints")
+            self._conn.commit()
+        self.add_many(checksums)
+
+
+def read_export_checksums(path):
+    """
+    Yield checksums from an Airtable export.
+
+    Accepts the CSV download of a view (needs a 'checksum' column) or JSON: either
+    a list of API records ({"fields": {"checksum": ...}}), the API page shape
+    ({"records": [...]}), or a plain list of normalized rows.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            for row in csv.DictReader(fh):
+                if row.get("checksum"):
+                    yield row["checksum"].strip()
+        return
+
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("records") or []
+    for rec in data:
+        fields = rec.get("fields", rec)
+        if fields.get("checksum"):
+            yield fields["checksum"]
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("rebuild", "stats"):
+        print("Uso: python -m scrapers.checksum_index <rebuild <export> | stats> [db_path]", file=sys.stderr)
+        sys.exit(2)
+
+    if sys.argv[1] == "rebuild":
+        if len(sys.argv) < 3:
+            print("rebuild needs the path of an Airtable export (.csv or .json)", file=sys.stderr)
+            sys.exit(2)
+        db_path = sys.argv[3] if len(sys.argv) >= 4 else DEFAULT_PATH
+        with ChecksumIndex(db_path) as index:
+            index.rebuild(read_export_checksums(sys.argv[2]))
+            print(json.dumps({"path": db_path, "checksums": len(index)}))
+    else:
+        db_path = sys.argv[2] if len(sys.argv) >= 3 else DEFAULT_PATH
+        with ChecksumIndex(db_path) as index:
+            print(json.dumps({"path": db_path, "checksums": len(index), "pending": index.pending_count()}))
+
+
+if __name__ == "__main__":
+    _main_cli()
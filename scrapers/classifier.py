@@ -0,0 +1,365 @@
+"""
+Offline service-line classifier.
+
+Fills 'service_line', 'effort_hours' and 'effort_bucket' from evidence that is
+already in the normalized row, so only the rows it is unsure about need the
+OpenAI node (and its 15-row batches with a 20.5 s wait in between):
+
+  - naics_code / classification_code (PSC) -> longest-prefix match in a trie;
+  - title -> every keyword found in one pass of an Aho-Corasick automaton
+    (whole words only, case-insensitive).
+
+Service lines are the rows of data/resource_capacity.csv (the same file the
+Auto_decision step joins on); rules pointing to a line that is not in the CSV
+are ignored. Effort follows the buckets of the LLM prompt: Low (<=50 h),
+Medium (51-200 h), High (>200 h).
+
+Usage:
+  python -m scrapers.classifier [file|-]     (JSON array/JSONL in, JSONL out)
+"""
+import csv
+import json
+import os
+import sys
+
+DEFAULT_CAPACITY_CSV = os.getenv(
+    "RESOURCE_CAPACITY_CSV",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "resource_capacity.csv"),
+)
+MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+FALLBACK_LINE = "Other"
+
+# NAICS prefixes (2017/2022 codes); longer prefixes win over shorter ones
+NAICS_RULES = {
+    "5617": "Janitorial", "561720": "Janitorial", "561740": "Janitorial", "561790": "Janitorial",
+    "236": "Construction", "237": "Construction", "238": "Construction", "5413": "Construction",
+    "5415": "IT", "5182": "IT", "518": "IT", "5112": "IT", "5132": "IT", "334": "IT", "5191": "IT",
+    "484": "Logistics", "4885": "Logistics", "493": "Logistics", "492": "Logistics", "4231": "Logistics",
+    "5616": "Safety/Fire", "922160": "Safety/Fire", "561621": "Safety/Fire", "922": "Safety/Fire",
+    "621": "Medical", "622": "Medical", "623": "Medical", "3391": "Medical", "42345": "Medical",
+    "611": "Education", "6243": "Education",
+    "481": "Aviation", "4881": "Aviation", "336411": "Aviation", "336412": "Aviation", "336413": "Aviation",
+}
+
+# PSC (product/service codes)
+PSC_RULES = {
+    "S201": "Janitorial", "S214": "Janitorial", "S299": "Janitorial", "S2": "Janitorial", "7930": "Janitorial",
+    "Y": "Construction", "Z": "Construction", "C1": "Construction", "56": "Construction",
+    "D": "IT", "DA": "IT", "DB": "IT", "DC": "IT", "DD": "IT", "DE": "IT", "DF": "IT", "DG": "IT",
+    "DH": "IT", "DJ": "IT", "DK": "IT", "7A": "IT", "7B": "IT", "7E": "IT", "70": "IT", "58": "IT",
+    "V1": "Logistics", "V2": "Logistics", "V3": "Logistics", "R706": "Logistics",
+    "S206": "Safety/Fire", "42": "Safety/Fire", "4210": "Safety/Fire",
+    "Q": "Medical", "65": "Medical", "6505": "Medical", "6515": "Medical", "6640": "Medical",
+    "U": "Education", "U0": "Education", "U1": "Education",
+    "15": "Aviation", "16": "Aviation", "J015": "Aviation", "J016": "Aviation", "V1A": "Aviation",
+    "1510": "Aviation", "1560": "Aviation", "2840": "Aviation",
+}
+
+# Title keywords; weight ~ how decisive one occurrence is
+KEYWORD_RULES = {
+    "Janitorial": {
+        "janitorial": 3, "custodial": 3, "cleaning": 2, "housekeeping": 2, "sanitation": 1,
+        "floor care": 2, "carpet cleaning": 3, "window washing": 2, "trash": 1, "restroom": 1,
+        "pest control": 1, "disinfection": 2, "waste removal": 1,
+    },
+    "Construction": {
+        "construction": 3, "renovation": 3, "roofing": 3, "roof": 2, "paving": 3, "asphalt": 3,
+        "concrete": 2, "demolition": 3, "hvac": 2, "plumbing": 2, "electrical": 1, "repair": 1,
+        "remodel": 3, "building": 1, "bridge": 2, "sidewalk": 2, "seismic": 2, "painting": 1,
+        "installation": 1, "elevator": 1, "retrofit": 2,
+    },
+    "IT": {
+        "software": 3, "it": 2, "information technology": 3, "network": 2, "cloud": 3,
+        "cybersecurity": 3, "cyber": 2, "data center": 3, "licenses": 2, "license": 1,
+        "helpdesk": 3, "help desk": 3, "servers": 2, "computer": 2, "computers": 2, "laptops": 2,
+        "saas": 3, "erp": 3, "database": 2, "telecommunications": 2, "web": 1, "digital": 1,
+    },
+    "Logistics": {
+        "logistics": 3, "freight": 3, "shipping": 2, "transportation": 2, "moving": 2,
+        "warehouse": 3, "warehousing": 3, "delivery": 2, "courier": 3, "trucking": 3,
+        "hauling": 2, "fleet": 2, "storage": 1, "tires": 1, "vehicles": 1, "supply chain": 3,
+    },
+    "Safety/Fire": {
+        "fire": 3, "firefighting": 3, "fire alarm": 3, "sprinkler": 2, "extinguisher": 3,
+        "extinguishers": 3, "security": 2, "guard": 2, "guards": 2, "safety": 2, "alarm": 1,
+        "surveillance": 2, "hazmat": 3, "emergency": 1, "cctv": 2, "ppe": 2,
+    },
+    "Medical": {
+        "medical": 3, "clinical": 3, "health": 2, "healthcare": 3, "hospital": 3,
+        "pharmaceutical": 3, "pharmacy": 3, "nursing": 3, "dental": 3, "laboratory": 2,
+        "lab": 1, "patient": 2, "vaccine": 3, "ambulance": 3, "behavioral": 2, "surgical": 3,
+    },
+    "Education": {
+        "training": 2, "education": 3, "educational": 3, "school": 2, "schools": 2,
+        "curriculum": 3, "tutoring": 3, "instruction": 2, "course": 2, "courses": 2,
+        "teacher": 3, "students": 2, "classroom": 3, "workshop": 1,
+    },
+    "Aviation": {
+        "aircraft": 3, "aviation": 3, "airport": 3, "airfield": 3, "helicopter": 3,
+        "runway": 3, "hangar": 3, "avionics": 3, "jet fuel": 3, "flight": 2, "uas": 2, "drone": 2,
+    },
+}
+
+# Evidence weights per source of evidence
+NAICS_WEIGHT = 4.0
+PSC_WEIGHT = 3.0
+
+# Baseline labor hours per line, scaled by scope keywords in the title
+BASE_EFFORT_HOURS = {
+    "Janitorial": 160, "Construction": 240, "IT": 120, "Logistics": 80, "Safety/Fire": 100,
+    "Medical": 120, "Education": 60, "Aviation": 160, "Other": 80,
+}
+EFFORT_SCALE = {
+    "supply": 0.25, "supplies": 0.25, "purchase": 0.25, "equipment": 0.4, "parts": 0.25,
+    "license": 0.3, "licenses": 0.3, "one-time": 0.5, "inspection": 0.5, "repair": 0.75,
+    "maintenance": 1.5, "services": 1.25, "annual": 1.5, "multi-year": 2.0, "on-call": 1.5,
+    "as-needed": 1.25, "countywide": 2.0, "statewide": 2.0, "design-build": 2.0,
+}
+
+
+def effort_bucket(hours):
+    """Low (<=50 h), Medium (51-200 h), High (>200 h), as in the LLM prompt."""
+    if hours is None:
+        return None
+    if hours <= 50:
+        return "Low"
+    if hours <= 200:
+        return "Medium"
+    return "High"
+
+
+def load_service_lines(path=DEFAULT_CAPACITY_CSV):
+    """Service-line names from the capacity CSV, in file order."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        return [row["service_line"].strip() for row in csv.DictReader(fh) if (row.get("service_line") or "").strip()]
+
+
+class PrefixTrie:
+    """Character trie answering 'longest stored prefix of this code'."""
+
+    def __init__(self, mapping=None):
+        self._root = {}
+        for prefix, value in (mapping or {}).items():
+            self.insert(prefix, value)
+
+    def insert(self, prefix, value):
+        node = self._root
+        for char in prefix.upper():
+            node = node.setdefault(char, {})
+        node[None] = value
+
+    def longest_match(self, code):
+        """(value, prefix_length) of the longest matching prefix, or (None, 0)."""
+        node, best, depth = self._root, (None, 0), 0
+        for char in str(code or "").strip().upper():
+            node = node.get(char)
+            if node is None:
+                break
+            depth += 1
+            if None in node:
+                best = (node[None], depth)
+        return best
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every keyword of a dictionary in one pass over
+    the text, however many keywords there are. Matches are reported only on
+    word boundaries, so "it" does not fire inside "kitchen".
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, payload in patterns.items():
+            self._add(pattern.lower(), payload)
+        self._build()
+
+    def _add(self, pattern, payload):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), pattern, payload))
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        for state in queue:   # breadth-first; the list grows while iterating
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """Yield (start, pattern, payload) for every whole-word occurrence."""
+        text = (text or "").lower()
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, pattern, payload in self._out[state]:
+                start = end - length + 1
+                before = text[start - 1] if start > 0 else " "
+                after = text[end + 1] if end + 1 < len(text) else " "
+                if not before.isalnum() and not after.isalnum():
+                    yield start, pattern, payload
+
+
+class Classification:
+    """Result of classify(): the chosen line, effort and how sure the rules are."""
+
+    __slots__ = ("service_line", "effort_hours", "effort_bucket", "confidence", "evidence")
+
+    def __init__(self, service_line, effort_hours, confidence, evidence):
+        self.service_line = service_line
+        self.effort_hours = effort_hours
+        self.effort_bucket = effort_bucket(effort_hours)
+        self.confidence = confidence
+        self.evidence = evidence
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Classifier:
+    """
+    Rule engine over NAICS/PSC tries and an Aho-Corasick title matcher.
+
+    Confidence is the winning line's share of all evidence, damped when there
+    is little evidence overall (one weak keyword is not enough on its own).
+    """
+
+    def __init__(self, service_lines=None, naics_rules=NAICS_RULES, psc_rules=PSC_RULES,
+                 keyword_rules=KEYWORD_RULES, min_confidence=MIN_CONFIDENCE):
+        if service_lines is None:
+            service_lines = load_service_lines()
+        self.service_lines = list(service_lines)
+        allowed = set(self.service_lines)
+        self.min_confidence = min_confidence
+        self._naics = PrefixTrie({p: line for p, line in naics_rules.items() if line in allowed})
+        self._psc = PrefixTrie({p: line for p, line in psc_rules.items() if line in allowed})
+        self._keywords = AhoCorasick({
+            word: (line, weight)
+            for line, words in keyword_rules.items() if line in allowed
+            for word, weight in words.items()
+        })
+        self._scope = AhoCorasick(EFFORT_SCALE)
+
+    def classify(self, row):
+        """Classify one normalized opportunity row."""
+        scores = {}
+        evidence = []
+
+        naics_line, depth = self._naics.longest_match(row.get("naics_code"))
+        if naics_line:
+            # A 6-digit exact match counts fully, a 2-3 digit sector about half
+            weight = NAICS_WEIGHT * min(1.0, 0.3 + depth / 6)
+            scores[naics_line] = scores.get(naics_line, 0.0) + weight
+            evidence.append(f"naics:{row.get('naics_code')}")
+
+        psc_line, depth = self._psc.longest_match(row.get("classification_code"))
+        if psc_line:
+            weight = PSC_WEIGHT * min(1.0, 0.4 + depth / 4)
+            scores[psc_line] = scores.get(psc_line, 0.0) + weight
+            evidence.append(f"psc:{row.get('classification_code')}")
+
+        title = row.get("title") or ""
+        for _, word, (line, weight) in self._keywords.iter_matches(title):
+            scores[line] = scores.get(line, 0.0) + weight
+            evidence.append(f"kw:{word}")
+
+        if not scores:
+            line, confidence = (FALLBACK_LINE if FALLBACK_LINE in self.service_lines else None), 0.0
+        else:
+            line = max(scores, key=scores.get)
+            total = sum(scores.values())
+            confidence = (scores[line] / total) * min(1.0, total / 4.0)
+
+        return Classification(line, self._effort_hours(line, title), round(confidence, 3), evidence)
+
+    def _effort_hours(self, line, title):
+        if line is None:
+            return None
+        hours = float(BASE_EFFORT_HOURS.get(line, BASE_EFFORT_HOURS["Other"]))
+        for _, _, factor in self._scope.iter_matches(title):
+            hours *= factor
+        return max(1, int(round(hours)))
+
+    def apply(self, row, result=None):
+        """Fill the classifier's fields on 'row' where they are still empty; returns the result."""
+        result = result or self.classify(row)
+        if not row.get("service_line") or row.get("service_line") not in self.service_lines:
+            row["service_line"] = result.service_line
+        if row.get("effort_hours") in (None, ""):
+            row["effort_hours"] = result.effort_hours
+        if not row.get("effort_bucket"):
+            row["effort_bucket"] = effort_bucket(row["effort_hours"]) or result.effort_bucket
+        return result
+
+    def split(self, rows):
+        """
+        Classify a batch.
+
+        Returns:
+          (classified, uncertain): rows at or above min_confidence with their
+          fields filled, and the remaining rows untouched (for the LLM).
+        """
+        classified, uncertain = [], []
+        for row in rows:
+            result = self.classify(row)
+            if result.confidence >= self.min_confidence:
+                self.apply(row, result)
+                classified.append(row)
+            else:
+                uncertain.append(row)
+        return classified, uncertain
+
+
+_default = None
+
+
+def get_classifier():
+    """Process-wide Classifier built from the capacity CSV (loaded once)."""
+    global _default
+    if _default is None:
+        _default = Classifier()
+    return _default
+
+
+def _main_cli() -> None:
+    try:  # the formatter imports this module, so its reader is imported lazily
+        from scrapers.formatter import iter_json_rows
+    except ImportError:  # executed from /app inside the scraper container
+        from formatter import iter_json_rows
+
+    path = sys.argv[1] if len(sys.argv) >= 2 else "-"
+    classifier = get_classifier()
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    confident = total = 0
+    try:
+        for row in iter_json_rows(stream):
+            result = classifier.classify(row)
+            total += 1
+            if result.confidence >= classifier.min_confidence:
+                classifier.apply(row, result)
+                confident += 1
+            sys.stdout.write(json.dumps({**row, "classifier": result.as_dict()}, ensure_ascii=False) + "\n")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"[classifier] {confident}/{total} rows above {classifier.min_confidence}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,294 @@
+"""
+Local decision queue for the Slack Accept/Ignore links.
+
+Workflow 03 searched Airtable by checksum and then updated the record, once
+per click. Now each click is acknowledged as soon as it is queued, and
+Airtable is written behind it:
+
+  - `records` maps checksum -> Airtable record id. POST /airtable/write fills
+    it with every record it creates or updates, and `rebuild` reloads it
+    from an export;
+  - `pending` holds at most one decision per checksum. A second click on the
+    same opportunity replaces the first, so only the last decision is sent;
+  - DecisionFlusher wakes up DECISION_FLUSH_SECONDS after a click and sends
+    every pending decision in 10-record updates by record id. Checksums
+    missing from the index are looked up once (filterByFormula) and then
+    remembered. A failed flush (an Airtable error or a connection that
+    could not be made) leaves the queue as it was and is retried
+    RETRY_SECONDS later.
+
+Usage:
+  python -m scrapers.decision_store rebuild <airtable_export.csv|json> [db_path]
+  python -m scrapers.decision_store flush [db_path]
+  python -m scrapers.decision_store stats [db_path]
+"""
+import csv
+import http.client
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.http_utils import HttpError
+    from scrapers.sqlite_store import SqliteStore
+except ImportError:  # executed from /app inside the scraper container
+    from http_utils import HttpError
+    from sqlite_store import SqliteStore
+
+DEFAULT_PATH = os.getenv("DECISION_STORE", "/data/decisions.sqlite")
+FLUSH_DELAY = float(os.getenv("DECISION_FLUSH_SECONDS", "2"))
+RETRY_SECONDS = 30  # wait before retrying a failed flush
+
+# Values sent by the Accept/Ignore links (slack_alerts.decision_links)
+DECISIONS = ("Go", "No Go")
+DECISION_FIELD = "decision"
+
+_MAX_PARAMS = 900
+
+
+def _utc_stamp():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+class DecisionStore(SqliteStore):
+    """
+    SQLite checksum -> record id index plus the queue of unsent decisions.
+
+    The formatter's request threads and the flusher share one instance.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " checksum TEXT PRIMARY KEY,"
+            " record_id TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " checksum TEXT PRIMARY KEY,"
+            " decision TEXT NOT NULL,"
+            " decided_at TEXT NOT NULL,"
+            " seq INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def remember(self, records):
+        """Index Airtable records ({"id", "fields": {"checksum"}}); returns how many."""
+        pairs = [((r.get("fields") or {}).get("checksum"), r.get("id")) for r in records if isinstance(r, dict)]
+        pairs = [(checksum, record_id) for checksum, record_id in pairs if checksum and record_id]
+        self.add_many(pairs)
+        return len(pairs)
+
+    def add_many(self, pairs):
+        """Store (checksum, record_id) pairs, replacing older ids."""
+        now = _utc_stamp()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (checksum, record_id, updated_at) VALUES (?, ?, ?)",
+                ((checksum, record_id, now) for checksum, record_id in pairs))
+            self._conn.commit()
+
+    def record_ids(self, checksums):
+        """{checksum: record_id} for the indexed checksums."""
+        checksums = list(dict.fromkeys(c for c in checksums if c))
+        found = {}
+        with self._lock:
+            for i in range(0, len(checksums), _MAX_PARAMS):
+                chunk = checksums[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    f"SELECT checksum, record_id FROM records WHERE checksum IN ({marks})", chunk)
+                found.update(cur)
+        return found
+
+    def enqueue(self, decisions):
+        """
+        Queue [{"checksum", "decision"}, ...], keeping the last decision per
+        checksum. Raises ValueError on a missing checksum or unknown decision.
+        """
+        entries = []
+        for item in decisions:
+            checksum, decision = (item.get("checksum") or "").strip(), item.get("decision")
+            if not checksum:
+                raise ValueError("decision without checksum")
+            if decision not in DECISIONS:
+                raise ValueError(f"unknown decision {decision!r} (expected one of {', '.join(DECISIONS)})")
+            entries.append((checksum, decision))
+        now = _utc_stamp()
+        with self._lock:
+            seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM pending").fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pending (checksum, decision, decided_at, seq) VALUES (?, ?, ?, ?)",
+                ((checksum, decision, now, seq + n) for n, (checksum, decision) in enumerate(entries, 1)))
+            self._conn.commit()
+        return len(entries)
+
+    def pending(self):
+        """Queued decisions as [(checksum, decision, seq)], oldest first."""
+        with self._lock:
+            return self._conn.execute("SELECT checksum, decision, seq FROM pending ORDER BY seq").fetchall()
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def done(self, entries):
+        """Drop sent decisions; a newer click on the same checksum stays queued."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE checksum = ? AND seq = ?",
+                                   ((checksum, seq) for checksum, _, seq in entries))
+            self._conn.commit()
+
+    def rebuild(self, pairs):
+        """Replace the checksum -> record id index (e.g. from an Airtable export)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM records")
+            self._conn.commit()
+        self.add_many(pairs)
+
+
+class DecisionFlusher:
+    """
+    Write-behind worker sending the queued decisions through an AirtableWriter.
+
+    stats counts flushes, decisions sent, lookups of unindexed checksums,
+    decisions dropped because no record has their checksum, and failures.
+    """
+
+    def __init__(self, store, writer, delay=FLUSH_DELAY, field=DECISION_FIELD):
+        self.store = store
+        self.writer = writer
+        self.delay = delay
+        self.field = field
+        self.stats = {"flushes": 0, "sent": 0, "looked_up": 0, "unknown": 0, "failures": 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def flush(self):
+        """Send every pending decision; returns how many were sent."""
+        with self._flush_lock:
+            entries = self.store.pending()
+            if not entries:
+                return 0
+            ids = self.store.record_ids(c for c, _, _ in entries)
+            missing = [c for c, _, _ in entries if c not in ids]
+            try:
+                if missing:
+                    found = self.writer.find("checksum", missing)
+                    self.stats["looked_up"] += self.store.remember(found)
+                    ids.update(self.store.record_ids(missing))
+                self.writer.update(
+                    {"id": ids[c], "fields": {self.field: decision}} for c, decision, _ in entries if c in ids)
+            except (HttpError, OSError, http.client.HTTPException) as exc:
+                self.stats["failures"] += 1
+                print(f"[decisions] flush failed, {len(entries)} kept: {exc}", file=sys.stderr)
+                return 0
+            unknown = [c for c, _, _ in entries if c not in ids]
+            if unknown:
+                print(f"[decisions] no Airtable record for {len(unknown)} checksums: {unknown[:5]}",
+                      file=sys.stderr)
+            self.store.done(entries)
+            sent = len(entries) - len(unknown)
+            self.stats["flushes"] += 1
+            self.stats["sent"] += sent
+            self.stats["unknown"] += len(unknown)
+            return sent
+
+    def wake(self):
+        """Schedule a flush (clicks within 'delay' of each other share it)."""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="decision-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the worker after a last flush."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        self._wake.set()  # decisions left from a previous run
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._stop.wait(self.delay)
+            self._wake.clear()
+            failures = self.stats["failures"]
+            self.flush()
+            if self.stats["failures"] > failures and not self._stop.wait(RETRY_SECONDS):
+                self._wake.set()
+
+
+def read_export_records(path):
+    """
+    Yield (checksum, record_id) pairs from an Airtable export.
+
+    JSON: API records ({"id", "fields": {"checksum"}}), optionally under
+    "records". CSV: a view download with a 'checksum' column and the record id
+    in 'record_id' or 'id' (e.g. a RECORD_ID() formula field).
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            for row in csv.DictReader(fh):
+                checksum, record_id = row.get("checksum"), row.get("record_id") or row.get("id")
+                if checksum and record_id:
+                    yield checksum.strip(), record_id.strip()
+        return
+
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("records") or []
+    for rec in data:
+        checksum = (rec.get("fields") or {}).get("checksum")
+        if checksum and rec.get("id"):
+            yield checksum, rec["id"]
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("rebuild", "flush", "stats"):
+        print("Uso: python -m scrapers.decision_store <rebuild <export> | flush | stats> [db_path]",
+              file=sys.stderr)
+        sys.exit(2)
+
+    if sys.argv[1] == "rebuild":
+        if len(sys.argv) < 3:
+            print("rebuild needs the path of an Airtable export (.csv or .json)", file=sys.stderr)
+            sys.exit(2)
+        db_path = sys.argv[3] if len(sys.argv) >= 4 else DEFAULT_PATH
+        with DecisionStore(db_path) as store:
+            store.rebuild(read_export_records(sys.argv[2]))
+            print(json.dumps({"path": db_path, "records": len(store)}))
+        return
+
+    db_path = sys.argv[2] if len(sys.argv) >= 3 else DEFAULT_PATH
+    with DecisionStore(db_path) as store:
+        if sys.argv[1] == "flush":
+            try:
+                from scrapers.airtable_writer import AirtableWriter
+            except ImportError:
+                from airtable_writer import AirtableWriter
+            flusher = DecisionFlusher(store, AirtableWriter())
+            flusher.flush()
+            print(json.dumps({"path": db_path, **flusher.stats, "pending": store.pending_count()}))
+        else:
+            print(json.dumps({"path": db_path, "records": len(store), "pending": store.pending_count()}))
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,260 @@
+"""
+Optional detail-page enrichment for the Cal eProcure and LACo scrapers.
+
+The list pages only carry id, title, department and closing date, so
+estimated_value, posted_date and naics_code reach the formatter as None and
+the LLM has to guess them. With SCRAPE_DETAILS=1, each scraper hands its rows
+to enrich() after the list is read:
+
+  - the detail page of every row is opened through a small pool of browser
+    contexts (DETAIL_CONTEXTS), with at most DETAIL_PER_HOST pages in flight
+    per host. Heavy resources are blocked as on the list pages;
+  - label/value pairs (<th>/<td>, <dt>/<dd>, <label> + value) are read in
+    one page.evaluate and mapped with interception.map_record (DETAIL_FIELDS);
+  - results live in an on-disk cache (DETAIL_CACHE) keyed by (source, id),
+    together with the row's last-seen status (Cal 'status', LACo
+    'close_date'). Only new rows and rows whose status changed are fetched.
+
+Found values only fill keys that are empty on the row, so what the list page
+said always wins. The description is kept on the raw row; it is not part of
+the canonical schema.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import urllib.parse
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers import metrics
+    from scrapers.interception import block_heavy_resources, map_record
+    from scrapers.sqlite_store import SqliteStore
+except ImportError:  # executed from /app inside the scraper container
+    import metrics
+    from interception import block_heavy_resources, map_record
+    from sqlite_store import SqliteStore
+
+DEFAULT_CACHE = os.getenv("DETAIL_CACHE", "/data/details.sqlite")
+CONTEXTS = int(os.getenv("DETAIL_CONTEXTS", "3"))
+PER_HOST = int(os.getenv("DETAIL_PER_HOST", "2"))
+PAGE_TIMEOUT_MS = int(os.getenv("DETAIL_TIMEOUT_MS", "30000"))
+
+# Raw-row key -> detail-page labels tried, in order (matched like map_record)
+DETAIL_FIELDS = {
+    "estimated_value": ("Estimated Value", "Estimated Amount", "Estimated Contract Value", "Contract Value",
+                        "EstimatedValue"),
+    "posted_date": ("Published Date", "Posted Date", "Event Start Date", "Start Date", "Issue Date",
+                    "Open Date"),
+    "naics_code": ("NAICS Code", "NAICS", "NaicsCode"),
+    "classification_code": ("Classification Code", "PSC", "UNSPSC", "Commodity Code"),
+    "description": ("Description", "Event Description", "Bid Description", "Scope of Work", "Scope"),
+}
+
+# Every label/value pair on the page, labels without a trailing ':'
+EXTRACT_PAIRS_JS = r"""
+() => {
+  const pairs = {};
+  const clean = (s) => (s || "").replace(/\s+/g, " ").trim();
+  const add = (label, value) => {
+    label = clean(label).replace(/:$/, "").trim();
+    value = clean(value);
+    if (label && value && !(label in pairs)) pairs[label] = value;
+  };
+  document.querySelectorAll("tr").forEach((tr) => {
+    const th = tr.querySelector("th"), td = tr.querySelector("td");
+    if (th && td) add(th.innerText, td.innerText);
+    else {
+      const cells = tr.querySelectorAll("td");
+      if (cells.length === 2) add(cells[0].innerText, cells[1].innerText);
+    }
+  });
+  document.querySelectorAll("dt").forEach((dt) => {
+    const dd = dt.nextElementSibling;
+    if (dd && dd.tagName === "DD") add(dt.innerText, dd.innerText);
+  });
+  document.querySelectorAll("label").forEach((label) => {
+    const target = label.htmlFor ? document.getElementById(label.htmlFor) : label.nextElementSibling;
+    if (target) add(label.innerText, target.value || target.innerText);
+  });
+  return pairs;
+}
+"""
+
+_NAICS = re.compile(r"\b(\d{6})\b")
+
+
+def parse_detail(pairs):
+    """Map the label/value pairs of a detail page onto DETAIL_FIELDS (empty ones dropped)."""
+    fields = {k: v for k, v in map_record(pairs, DETAIL_FIELDS).items() if v}
+    if "naics_code" in fields:
+        match = _NAICS.search(fields["naics_code"])
+        if match:
+            fields["naics_code"] = match.group(1)
+        else:
+            del fields["naics_code"]
+    return fields
+
+
+class DetailCache(SqliteStore):
+    """SQLite (source, id) -> (last-seen status, detail fields)."""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            " source TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " status TEXT,"
+            " fields TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (source, id))"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+
+    def get(self, source, ids):
+        """{id: (status, fields)} for the cached ids."""
+        ids = list(dict.fromkeys(str(i) for i in ids if i))
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 900):
+                chunk = ids[i:i + 900]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    f"SELECT id, status, fields FROM details WHERE source = ? AND id IN ({marks})",
+                    [source, *chunk])
+                found.update((i, (status, json.loads(fields))) for i, status, fields in cur)
+        return found
+
+    def put(self, source, entries):
+        """Store [(id, status, fields), ...]."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO details (source, id, status, fields, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                ((source, str(i), status, json.dumps(fields, ensure_ascii=False), now)
+                 for i, status, fields in entries))
+            self._conn.commit()
+
+
+class DetailCrawler:
+    """
+    Fetches detail pages through a pool of browser contexts.
+
+    stats counts rows served from cache, pages fetched, fetch errors and
+    fields filled since the crawler was created.
+    """
+
+    def __init__(self, browser, cache, contexts=CONTEXTS, per_host=PER_HOST, timeout_ms=PAGE_TIMEOUT_MS):
+        self.browser = browser
+        self.cache = cache
+        self.size = max(1, contexts)
+        self.per_host = max(1, per_host)
+        self.timeout_ms = timeout_ms
+        self.stats = {"cached": 0, "fetched": 0, "errors": 0, "filled": 0}
+        self._pool = None
+        self._contexts = []
+        self._hosts = {}
+
+    async def _context(self):
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            for _ in range(self.size):
+                context = await self.browser.new_context()
+                await block_heavy_resources(context)
+                self._contexts.append(context)
+                self._pool.put_nowait(context)
+        return await self._pool.get()
+
+    def _host_limit(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def fetch(self, url, source):
+        """Open one detail page and return its parsed fields ({} on failure)."""
+        async with self._host_limit(url):
+            context = await self._context()
+            try:
+                page = await context.new_page()
+                try:
+                    with metrics.span("detail_fetch", source=source):
+                        await page.goto(url, timeout=self.timeout_ms)
+                        pairs = await page.evaluate(EXTRACT_PAIRS_JS)
+                finally:
+                    await page.close()
+            except Exception as exc:  # one broken page must not sink the batch
+                self.stats["errors"] += 1
+                metrics.count("errors", source=source, stage="detail")
+                print(f"[details] {url}: {type(exc).__name__}: {exc}", file=sys.stderr)
+                return None
+            finally:
+                self._pool.put_nowait(context)
+        self.stats["fetched"] += 1
+        return parse_detail(pairs or {})
+
+    async def enrich(self, rows, source, key, status, url):
+        """
+        Fill empty detail fields of 'rows' in place.
+
+        key/status: raw-row field names of the id and of the last-seen status;
+        url: callable building the detail URL of a row.
+
+        Returns the rows.
+        """
+        keyed = [r for r in rows if r.get(key)]
+        cached = self.cache.get(source, (r[key] for r in keyed))
+        todo = {}
+        for row in keyed:
+            ident = str(row[key])
+            entry = cached.get(ident)
+            if entry is not None and entry[0] == row.get(status):
+                self.stats["cached"] += 1
+                self._fill(row, entry[1])
+            elif ident not in todo and url(row):
+                todo[ident] = row
+
+        results = await asyncio.gather(*(self.fetch(url(row), source) for row in todo.values()))
+        fetched = {ident: fields for ident, fields in zip(todo, results) if fields is not None}
+        self.cache.put(source, [(ident, todo[ident].get(status), fields) for ident, fields in fetched.items()])
+        for row in keyed:
+            fields = fetched.get(str(row[key]))
+            if fields is not None:
+                self._fill(row, fields)
+        print(f"[details] {source}: {json.dumps(self.stats)}", file=sys.stderr)
+        return rows
+
+    def _fill(self, row, fields):
+        for field, value in fields.items():
+            if row.get(field) in (None, ""):
+                row[field] = value
+                self.stats["filled"] += 1
+
+    async def close(self):
+        for context in self._contexts:
+            await context.close()
+        self._contexts, self._pool = [], None
+
+
+def enabled():
+    return os.getenv("SCRAPE_DETAILS", "").lower() in ("1", "true", "yes")
+
+
+async def maybe_enrich(browser, rows, source, key, status, url):
+    """enrich() when SCRAPE_DETAILS is on; the rows untouched otherwise."""
+    if not enabled() or not rows:
+        return rows
+    with DetailCache(DEFAULT_CACHE) as cache:
+        crawler = DetailCrawler(browser, cache)
+        try:
+            with metrics.span("details", source=source):
+                await crawler.enrich(rows, source, key, status, url)
+        finally:
+            await crawler.close()
+    return rows
@@ -0,0 +1,223 @@
+"""
+Persistent cache of LLM enrichment results.
+
+SAM's 3-day `postedFrom` window overlaps by design and LACo/CAL list the same
+open bids every day, so workflow 01 keeps sending the same rows to the
+`Message a model` node. This cache stores what the model answered, keyed by
+
+  (checksum, fingerprint)
+
+where 'checksum' is the row's generate_hash idempotency key and 'fingerprint'
+hashes the content the model reads (FINGERPRINT_FIELDS). The fields the model
+writes are left out of the fingerprint, so a row looks the same before and
+after enrichment. A changed title, agency or deadline gives a new key, so the
+model sees the row again.
+
+Entries expire after ENRICH_CACHE_MAX_AGE_DAYS and the least recently used
+ones are dropped above ENRICH_CACHE_MAX_ENTRIES. Cache misses are packed into
+prompt batches as large as the token budget allows (pack_batches), instead of
+fixed 15-row chunks.
+
+Usage:
+  python -m scrapers.enrichment_cache stats [db_path]
+  python -m scrapers.enrichment_cache evict [db_path]
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.sqlite_store import SqliteStore
+except ImportError:  # executed from /app inside the scraper container
+    from sqlite_store import SqliteStore
+
+DEFAULT_PATH = os.getenv("ENRICH_CACHE", "/data/enrichment.sqlite")
+MAX_ENTRIES = int(os.getenv("ENRICH_CACHE_MAX_ENTRIES", "100000"))
+MAX_AGE_DAYS = float(os.getenv("ENRICH_CACHE_MAX_AGE_DAYS", "30"))
+
+# Prompt packing: ~4 characters per token, budget for the rows of one prompt
+BATCH_TOKENS = int(os.getenv("ENRICH_BATCH_TOKENS", "6000"))
+BATCH_MAX_ITEMS = int(os.getenv("ENRICH_BATCH_MAX_ITEMS", "60"))
+
+# What the model fills in (and what a hit restores)
+ENRICHED_FIELDS = (
+    "naics_code", "classification_code", "service_line", "effort_hours", "effort_bucket", "token_cost",
+)
+# What the model reads and does not overwrite
+FINGERPRINT_FIELDS = (
+    "opportunity_id", "title", "solicitation_number", "agency", "agency_code", "type",
+    "posted_date", "deadline",
+)
+
+# SQLite's default cap on bound parameters per statement (two per key)
+_MAX_KEYS = 450
+
+
+def fingerprint(row):
+    """Stable digest of the fields the model reads."""
+    content = json.dumps([row.get(f) for f in FINGERPRINT_FIELDS], ensure_ascii=False, default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(row):
+    """Rough prompt size of one row (JSON characters / 4)."""
+    return len(json.dumps(row, ensure_ascii=False, default=str)) // 4 + 1
+
+
+def pack_batches(rows, max_tokens=BATCH_TOKENS, max_items=BATCH_MAX_ITEMS):
+    """
+    Greedily pack rows into prompt batches.
+
+    Each batch is filled up to 'max_tokens' of estimated row tokens or
+    'max_items' rows, whichever comes first. A single oversized row still gets
+    a batch of its own.
+    """
+    batches, current, used = [], [], 0
+    for row in rows:
+        cost = estimate_tokens(row)
+        if current and (used + cost > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(row)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EnrichmentCache(SqliteStore):
+    """
+    SQLite-backed (checksum, fingerprint) -> enrichment fields.
+
+    Lookups are batched like ChecksumIndex.known. 'stats' counts hits, misses,
+    stored rows and evicted entries since the object was created. Safe to share
+    between the threads of the formatter HTTP server.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=MAX_ENTRIES, max_age_days=MAX_AGE_DAYS,
+                 clock=time.time):
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self._clock = clock
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment ("
+            " checksum TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " used_at REAL NOT NULL,"
+            " PRIMARY KEY (checksum, fingerprint))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS enrichment_used_at ON enrichment (used_at)")
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM enrichment").fetchone()[0]
+
+    def _fetch(self, keys):
+        """{(checksum, fingerprint): fields} for the fresh entries among 'keys'."""
+        found = {}
+        oldest = self._clock() - self.max_age if self.max_age else None
+        with self._lock:
+            for i in range(0, len(keys), _MAX_KEYS):
+                chunk = keys[i:i + _MAX_KEYS]
+                where = " OR ".join("(checksum = ? AND fingerprint = ?)" for _ in chunk)
+                params = [v for key in chunk for v in key]
+                cur = self._conn.execute(
+                    f"SELECT checksum, fingerprint, payload, stored_at FROM enrichment WHERE {where}", params)
+                for checksum, fp, payload, stored_at in cur:
+                    if oldest is None or stored_at >= oldest:
+                        found[(checksum, fp)] = json.loads(payload)
+            if found:
+                now = self._clock()
+                self._conn.executemany(
+                    "UPDATE enrichment SET used_at = ? WHERE checksum = ? AND fingerprint = ?",
+                    ((now, c, f) for c, f in found),
+                )
+                self._conn.commit()
+        return found
+
+    def lookup(self, rows):
+        """
+        Split rows into cache hits and misses.
+
+        Hits get their enrichment fields restored in place. Rows without a
+        checksum always miss.
+
+        Returns:
+          (hits, misses), both in input order.
+        """
+        rows = list(rows)
+        keys = [(r.get("checksum"), fingerprint(r)) for r in rows]
+        found = self._fetch(list(dict.fromkeys(k for k in keys if k[0])))
+        hits, misses = [], []
+        for row, key in zip(rows, keys):
+            fields = found.get(key)
+            if fields is None:
+                misses.append(row)
+            else:
+                row.update(fields)
+                hits.append(row)
+        with self._lock:
+            self.stats["hits"] += len(hits)
+            self.stats["misses"] += len(misses)
+        return hits, misses
+
+    def store(self, rows):
+        """Save the enrichment fields of model-enriched rows, then enforce the size cap."""
+        now = self._clock()
+        entries = [
+            (r["checksum"], fingerprint(r), json.dumps({f: r.get(f) for f in ENRICHED_FIELDS}, ensure_ascii=False),
+             now, now)
+            for r in rows if r.get("checksum")
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO enrichment (checksum, fingerprint, payload, stored_at, used_at)"
+                " VALUES (?, ?, ?, ?, ?)", entries)
+            self._conn.commit()
+            self.stats["stored"] += len(entries)
+        if self.max_entries and entries:
+            self.evict(expired=False)
+        return len(entries)
+
+    def evict(self, expired=True):
+        """
+        Drop expired entries (when 'expired') and the least recently used ones
+        beyond max_entries. Returns the number of entries removed.
+        """
+        removed = 0
+        with self._lock:
+            if expired and self.max_age:
+                cur = self._conn.execute("DELETE FROM enrichment WHERE stored_at < ?",
+                                         (self._clock() - self.max_age,))
+                removed += cur.rowcount
+            if self.max_entries:
+                excess = self._conn.execute("SELECT COUNT(*) FROM enrichment").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    cur = self._conn.execute(
+                        "DELETE FROM enrichment WHERE rowid IN"
+                        " (SELECT rowid FROM enrichment ORDER BY used_at LIMIT ?)", (excess,))
+                    removed += cur.rowcount
+            self._conn.commit()
+            self.stats["evicted"] += removed
+        return removed
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "evict"):
+        print("Uso: python -m scrapers.enrichment_cache <stats | evict> [db_path]", file=sys.stderr)
+        sys.exit(2)
+    db_path = sys.argv[2] if len(sys.argv) >= 3 else DEFAULT_PATH
+    with EnrichmentCache(db_path) as cache:
+        removed = cache.evict() if sys.argv[1] == "evict" else 0
+        print(json.dumps({"path": db_path, "entries": len(cache), "evicted": removed}))
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,269 @@
+"""
+Partitioned, compact export of normalized opportunities for analytics.
+
+Batches are written as gzip'd CSV parts, one partition per source and ingest
+date:
+
+  <EXPORT_DIR>/source=<cal|laco|sam>/ingest_date=<YYYY-MM-DD>/part-<HHMMSSffffff>-<id>.csv.gz
+                                                               part-<HHMMSSffffff>-<id>.zonemap.json
+
+The header is CANONICAL_FIELDS. A CSV row is much smaller than the JSON object
+because the keys are not repeated. Numbers and booleans are decoded back to
+their types on read (FIELD_TYPES), and empty cells read back as None. Each
+part has a zone map next to it: row count, min/max deadline and the distinct
+service lines and agencies. scan() uses the partition paths and zone maps to
+skip whole files that cannot match a filter. Only the surviving parts are
+decompressed, and their rows come back as formatter.Opportunity records.
+
+Deadline filters compare ISO strings, i.e. rows exported after the
+parse_dates_and_money stage (the formatter's ?parse=1).
+
+Pyarrow/Parquet would need a new dependency in the scraper image; this format
+uses the standard library only and opens in any spreadsheet.
+
+Usage:
+  python -m scrapers.export write <cal|laco|sam> [rows.json|rows.jsonl|-] [export_dir]
+  python -m scrapers.export scan [source=sam] [deadline_from=2025-09-01] [deadline_to=...]
+                                 [service_line=IT] [agency=...] [export_dir=...]   (JSONL on stdout)
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.formatter import CANONICAL_FIELDS, Opportunity, iter_json_rows
+except ImportError:  # executed from /app inside the scraper container
+    from formatter import CANONICAL_FIELDS, Opportunity, iter_json_rows
+
+DEFAULT_DIR = os.getenv("EXPORT_DIR", "/data/export")
+
+# Non-string columns, decoded on read
+FIELD_TYPES = {
+    "estimated_value": "number",
+    "effort_hours": "number",
+    "score": "number",
+    "award_amount": "number",
+    "token_cost": "number",
+    "active": "bool",
+}
+# Above this many distinct values a zone map keeps no value list (cannot prune)
+ZONE_MAP_MAX_VALUES = 1000
+
+
+def _encode(value):
+    if value is None:
+        return ""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _decode(field, text):
+    if text == "":
+        return None
+    kind = FIELD_TYPES.get(field)
+    if kind == "bool":
+        return text == "true"
+    if kind == "number":
+        try:
+            number = float(text)
+        except ValueError:
+            return text
+        return int(number) if number.is_integer() and "." not in text and "e" not in text.lower() else number
+    return text
+
+
+def _distinct(values):
+    values = sorted({v for v in values if v is not None})
+    return values if len(values) <= ZONE_MAP_MAX_VALUES else None
+
+
+def zone_map(records):
+    """Pruning statistics of one part (see the module docstring)."""
+    deadlines = [r.deadline for r in records if r.deadline]
+    return {
+        "rows": len(records),
+        "deadline": [min(deadlines), max(deadlines)] if deadlines else None,
+        "service_line": _distinct(r.service_line for r in records),
+        "agency": _distinct(r.agency for r in records),
+    }
+
+
+def _as_set(value):
+    if value is None:
+        return None
+    return {value} if isinstance(value, str) else set(value)
+
+
+def _zone_matches(zone, deadline_from, deadline_to, service_lines, agencies):
+    if deadline_from is not None or deadline_to is not None:
+        if zone["deadline"] is None:
+            return False
+        low, high = zone["deadline"]
+        if deadline_from is not None and high < deadline_from:
+            return False
+        if deadline_to is not None and low > deadline_to:
+            return False
+    for wanted, values in ((service_lines, zone["service_line"]), (agencies, zone["agency"])):
+        if wanted is not None and values is not None and not wanted.intersection(values):
+            return False
+    return True
+
+
+def _row_matches(record, deadline_from, deadline_to, service_lines, agencies):
+    if deadline_from is not None or deadline_to is not None:
+        if not record.deadline:
+            return False
+        if deadline_from is not None and record.deadline < deadline_from:
+            return False
+        if deadline_to is not None and record.deadline > deadline_to:
+            return False
+    if service_lines is not None and record.service_line not in service_lines:
+        return False
+    if agencies is not None and record.agency not in agencies:
+        return False
+    return True
+
+
+class OpportunityStore:
+    """
+    Writer and reader of one export directory.
+
+    stats counts parts/rows written, and parts scanned vs skipped by zone
+    map plus rows decoded by scan().
+    """
+
+    def __init__(self, root=DEFAULT_DIR):
+        self.root = root
+        self.stats = {"parts_written": 0, "rows_written": 0, "parts_scanned": 0, "parts_skipped": 0,
+                      "rows_read": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def write(self, source, rows, ingest_date=None):
+        """
+        Write one batch (normalized dicts or Opportunity records) as a new part.
+
+        Returns:
+          the path of the .csv.gz part, or None for an empty batch.
+        """
+        records = [r if isinstance(r, Opportunity) else Opportunity.from_dict(r) for r in rows]
+        if not records:
+            return None
+        now = datetime.utcnow()
+        ingest_date = ingest_date or now.strftime("%Y-%m-%d")
+        directory = os.path.join(self.root, f"source={source}", f"ingest_date={ingest_date}")
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"part-{now.strftime('%H%M%S%f')}-{uuid.uuid4().hex[:8]}")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CANONICAL_FIELDS)
+        writer.writerows([_encode(v) for v in r.astuple()] for r in records)
+        self._atomic_write(f"{stem}.csv.gz", gzip.compress(buffer.getvalue().encode("utf-8")))
+        self._atomic_write(f"{stem}.zonemap.json", json.dumps(zone_map(records)).encode("utf-8"))
+        self._count(parts_written=1, rows_written=len(records))
+        return f"{stem}.csv.gz"
+
+    @staticmethod
+    def _atomic_write(path, data):
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def partitions(self, source=None, ingest_from=None, ingest_to=None):
+        """Yield (source, ingest_date, directory) of the partitions matching the path filters."""
+        sources = _as_set(source)
+        if not os.path.isdir(self.root):
+            return
+        for source_dir in sorted(os.listdir(self.root)):
+            name, _, value = source_dir.partition("=")
+            if name != "source" or (sources is not None and value not in sources):
+                continue
+            for date_dir in sorted(os.listdir(os.path.join(self.root, source_dir))):
+                _, _, day = date_dir.partition("=")
+                if (ingest_from and day < ingest_from) or (ingest_to and day > ingest_to):
+                    continue
+                yield value, day, os.path.join(self.root, source_dir, date_dir)
+
+    def scan(self, source=None, ingest_from=None, ingest_to=None, deadline_from=None, deadline_to=None,
+             service_line=None, agency=None):
+        """
+        Yield the Opportunity records matching every given filter.
+
+        'source', 'service_line' and 'agency' take one value or a collection;
+        dates are inclusive ISO strings.
+        """
+        service_lines, agencies = _as_set(service_line), _as_set(agency)
+        for _, _, directory in self.partitions(source, ingest_from, ingest_to):
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".csv.gz"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    with open(path[:-len(".csv.gz")] + ".zonemap.json", encoding="utf-8") as fh:
+                        zone = json.load(fh)
+                except (OSError, ValueError):
+                    zone = None
+                if zone is not None and not _zone_matches(zone, deadline_from, deadline_to, service_lines, agencies):
+                    self._count(parts_skipped=1)
+                    continue
+                self._count(parts_scanned=1)
+                yield from self._read_part(path, deadline_from, deadline_to, service_lines, agencies)
+
+    def _read_part(self, path, deadline_from, deadline_to, service_lines, agencies):
+        read = 0
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as fh:
+            reader = csv.reader(fh)
+            header = next(reader, None) or []
+            for cells in reader:
+                read += 1
+                record = Opportunity(**{f: _decode(f, v) for f, v in zip(header, cells) if f in CANONICAL_FIELDS})
+                if _row_matches(record, deadline_from, deadline_to, service_lines, agencies):
+                    yield record
+        self._count(rows_read=read)
+
+
+def _main_cli() -> None:
+    args = sys.argv[1:]
+    if not args or args[0] not in ("write", "scan") or (args[0] == "write" and len(args) < 2):
+        print("Uso: python -m scrapers.export <write <cal|laco|sam> [rows.json|-] [export_dir]"
+              " | scan [field=value ...]>", file=sys.stderr)
+        sys.exit(2)
+
+    if args[0] == "write":
+        source = args[1]
+        path = args[2] if len(args) >= 3 else "-"
+        store = OpportunityStore(args[3] if len(args) >= 4 else DEFAULT_DIR)
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            print(json.dumps({"part": store.write(source, iter_json_rows(stream)), **store.stats}))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        return
+
+    filters = dict(arg.split("=", 1) for arg in args[1:] if "=" in arg)
+    store = OpportunityStore(filters.pop("export_dir", DEFAULT_DIR))
+    for record in store.scan(**filters):
+        sys.stdout.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+    print(f"[export] {json.dumps(store.stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -1,12 +1,44 @@
 from __future__ import annotations
+import functools
 import os
 import json
+import re
 import sys
+import time
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
 import pytz
 import hashlib
 import base64
 
+try:  # imported as part of the 'scrapers' package (tests, python -m ...)
+    from scrapers.airtable_writer import AirtableWriter
+    from scrapers.checkpoints import ALL, RunCheckpoint, resume_or_start
+    from scrapers.checksum_index import ChecksumIndex
+    from scrapers.classifier import get_classifier
+    from scrapers.decision_store import DecisionFlusher, DecisionStore
+    from scrapers.enrichment_cache import EnrichmentCache, pack_batches
+    from scrapers import metrics
+    from scrapers.http_utils import HttpError
+    from scrapers.near_duplicates import NearDuplicateIndex
+    from scrapers.scoring import score_batch
+    from scrapers.slack_alerts import AlertDispatcher
+    from scrapers import watermark
+except ImportError:  # executed as /app/formatter.py inside the scraper container
+    from airtable_writer import AirtableWriter
+    from checkpoints import ALL, RunCheckpoint, resume_or_start
+    from checksum_index import ChecksumIndex
+    from classifier import get_classifier
+    from decision_store import DecisionFlusher, DecisionStore
+    from enrichment_cache import EnrichmentCache, pack_batches
+    import metrics
+    from http_utils import HttpError
+    from near_duplicates import NearDuplicateIndex
+    from scoring import score_batch
+    from slack_alerts import AlertDispatcher
+    import watermark
+
 # --- Utility helpers ---------------------------------------------------------
 
 def generate_hash(string):
@@ -18,267 +50,1232 @@ def generate_hash(string):
     """
     return hashlib.md5(string.encode('utf-8')).hexdigest()
 
-# --- Normalizers: one per source --------------------------------------------
+# --- Mapping engine: declarative specs compiled to fast row mappers ---------
 
-def format_opportunities_cal(raw_events):
+# Canonical output schema, in emission order (JSON key order is part of the contract)
+CANONICAL_FIELDS = (
+    "opportunity_id", "title", "solicitation_number", "agency", "agency_code",
+    "posted_date", "deadline", "archive_date", "naics_code", "classification_code",
+    "service_line", "estimated_value", "effort_hours", "effort_bucket", "type",
+    "active", "decision", "score", "award_date", "award_number", "award_amount",
+    "awardee_name", "awardee_uei", "awardee_cage", "created_at", "checksum",
+    "token_cost",
+)
+
+
+class Opportunity:
     """
-    Normalize a list of CAL eProcure-like events into the unified opportunity schema.
+    One normalized opportunity as a fixed-layout record.
+
+    Same fields and order as CANONICAL_FIELDS, but stored in __slots__, so a
+    record takes under a third of the memory of the equivalent 27-key dict.
+    Positional values follow CANONICAL_FIELDS; missing fields are None.
+    """
+
+    __slots__ = CANONICAL_FIELDS
+
+    def __init__(self, *values, **fields):
+        if len(values) > len(CANONICAL_FIELDS):
+            raise TypeError(f"at most {len(CANONICAL_FIELDS)} positional values, got {len(values)}")
+        for field, value in zip(CANONICAL_FIELDS, values):
+            setattr(self, field, value)
+        for field in CANONICAL_FIELDS[len(values):]:
+            setattr(self, field, fields.pop(field, None))
+        if fields:
+            raise TypeError(f"unknown fields: {sorted(fields)}")
+
+    @classmethod
+    def from_dict(cls, row):
+        """Record from a normalized row; keys outside CANONICAL_FIELDS are ignored."""
+        return cls(*(row.get(f) for f in CANONICAL_FIELDS))
+
+    def to_dict(self):
+        """The normalized row (JSON-ready dict in canonical key order)."""
+        return {f: getattr(self, f) for f in CANONICAL_FIELDS}
+
+    def astuple(self):
+        return tuple(getattr(self, f) for f in CANONICAL_FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, Opportunity):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __repr__(self):
+        return f"Opportunity(opportunity_id={self.opportunity_id!r}, title={self.title!r})"
+
+
+_NO_DEFAULT = object()
+
+
+def source(*paths, default=_NO_DEFAULT, coalesce=False, transform=None):
+    """
+    Declare a field read from the raw row.
+
+      - paths: one or more keys; dotted paths ("award.awardee.name") walk nested
+        objects, treating a missing/empty parent as {}.
+      - coalesce=True: take the first truthy path, else None
+        (the `ev.get(a) or ev.get(b) or None` idiom).
+      - default: value for a missing key (plain `.get(key, default)`).
+      - transform: callable applied to the extracted value.
+    """
+    return ("source", paths, default, coalesce, transform)
+
+
+def const(value):
+    """Declare a field with a fixed value for every row."""
+    return ("const", value)
+
+
+def utc_now():
+    """Declare a field stamped with the UTC time at which the batch started."""
+    return ("now",)
+
+
+def derived(func, *fields):
+    """Declare a field computed from already-mapped canonical fields."""
+    return ("derived", func, fields)
+
+
+def _row_checksum(opportunity_id, title):
+    """Idempotency checksum: stable across runs while (id|title) stays the same."""
+    # Same digest as generate_hash(), inlined because it runs once per row
+    return hashlib.md5(f"{opportunity_id or ''}|{title or ''}".encode('utf-8')).hexdigest()
+
+
+def _now_iso():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def compile_mapping(spec, name="iter_opportunities", record=False):
+    """
+    Compile a {canonical_field: declaration} spec into a generator function.
+
+    The spec is turned into the source of a single Python function (one local
+    per nested parent, one expression per field, one dict literal per row) and
+    compiled once, so per-row cost matches a hand-written loop. Fields missing
+    from the spec are emitted as None; CANONICAL_FIELDS fixes the key order.
+    With record=True the function yields Opportunity records instead of dicts.
+
+    Returns:
+      a function mapping an iterable of raw rows to normalized rows, lazily.
+    """
+    unknown = set(spec) - set(CANONICAL_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown canonical fields in spec: {sorted(unknown)}")
+
+    namespace = {}
+    parents = {}      # dotted parent path -> local variable name
+    hoisted = []      # source lines computing nested parents, in order
+    values = []       # per-field expressions
+    uses_now = False
+
+    def bind(obj):
+        key = f"_k{len(namespace)}"
+        namespace[key] = obj
+        return key
+
+    def parent_var(path):
+        if path not in parents:
+            head, _, last = path.rpartition(".")
+            base = parent_var(head) if head else "raw"
+            var = f"_p{len(parents)}"
+            hoisted.append(f"        {var} = {base}.get({last!r}) or {{}}")
+            parents[path] = var
+        return parents[path]
+
+    def getter(path, default):
+        head, _, last = path.rpartition(".")
+        base = parent_var(head) if head else "raw"
+        if default is _NO_DEFAULT:
+            return f"{base}.get({last!r})"
+        return f"{base}.get({last!r}, {bind(default)})"
+
+    for index, field in enumerate(CANONICAL_FIELDS):
+        decl = spec.get(field, const(None))
+        kind = decl[0]
+        if kind == "const":
+            expr = bind(decl[1]) if decl[1] is not None else "None"
+        elif kind == "now":
+            expr, uses_now = "now", True
+        elif kind == "derived":
+            args = ", ".join(f"v{CANONICAL_FIELDS.index(f)}" for f in decl[2])
+            expr = f"{bind(decl[1])}({args})"
+        else:
+            _, paths, default, coalesce, transform = decl
+            getters = [getter(p, default) for p in paths]
+            if coalesce:
+                expr = "(" + " or ".join(getters + ["None"]) + ")"
+            else:
+                expr = getters[0]
+            if transform is not None:
+                expr = f"{bind(transform)}({expr})"
+        values.append(f"        v{index} = {expr}")
+
+    if record:
+        # Slot stores on a bare instance skip Opportunity.__init__'s generic loop
+        namespace["_new_record"] = functools.partial(Opportunity.__new__, Opportunity)
+        values.append("        row = _new_record()")
+        values += [f"        row.{f} = v{i}" for i, f in enumerate(CANONICAL_FIELDS)]
+        row = "row"
+    else:
+        row = "{" + ", ".join(f"{f!r}: v{i}" for i, f in enumerate(CANONICAL_FIELDS)) + "}"
+    lines = [f"def {name}(raw_rows):"]
+    if uses_now:
+        namespace["_now_iso"] = _now_iso
+        lines.append("    now = _now_iso()")
+    lines.append("    for raw in raw_rows:")
+    lines += hoisted + values
+    lines.append(f"        yield {row}")
+    code = "\n".join(lines) + "\n"
+
+    exec(compile(code, f"<mapping:{name}>", "exec"), namespace)
+    func = namespace[name]
+    func.__source__ = code  # handy when debugging a spec
+    return func
+
+
+# --- Source specs: one per source -------------------------------------------
+
+def _laco_deadline(close):
+    """LACo 'close_date': trimmed; literal 'Continuous' or a missing date means no fixed deadline ('')."""
+    close = (close or "").strip()
+    return "" if close == "Continuous" else close
+
+
+def _yes_to_bool(value):
+    """SAM 'active' is textual: "Yes" -> True, anything else -> False."""
+    return value == "Yes"
+
+
+# CAL eProcure: mixed scraper/unified keys, every value coerced with `or None`.
+# Dates/amounts are passed through untouched (see parse_dates_and_money); no
+# posted date in the CAL feed.
+CAL_SPEC = {
+    "opportunity_id": source("event_id", "opportunity_id", coalesce=True),
+    "title": source("event_name", "title", coalesce=True),
+    "solicitation_number": source("solicitation_number", coalesce=True),
+    "agency": source("agency", "department", coalesce=True),
+    "agency_code": source("agency_code", coalesce=True),
+    "posted_date": source("posted_date", coalesce=True),
+    "deadline": source("end_date", coalesce=True),
+    "archive_date": source("archive_date", coalesce=True),
+    "naics_code": source("naics_code", coalesce=True),
+    "classification_code": source("classification_code", coalesce=True),
+    "service_line": source("service_line", coalesce=True),
+    "estimated_value": source("estimated_value", coalesce=True),
+    "effort_hours": source("effort_hours", coalesce=True),
+    "effort_bucket": source("effort_bucket", coalesce=True),
+    "type": source("type", coalesce=True),
+    "active": source("active"),
+    "decision": source("decision", coalesce=True),
+    "score": source("score", coalesce=True),
+    "award_date": source("award_date", coalesce=True),
+    "award_number": source("award_number", coalesce=True),
+    "award_amount": source("award_amount", coalesce=True),
+    "awardee_name": source("awardee_name", coalesce=True),
+    "awardee_uei": source("awardee_uei", coalesce=True),
+    "awardee_cage": source("awardee_cage", coalesce=True),
+    "created_at": source("created_at", coalesce=True),
+    "checksum": derived(_row_checksum, "opportunity_id", "title"),
+    "token_cost": source("token_cost", coalesce=True),
+}
+
+# LA County: open listings only, so type/active are fixed; the source 'type'
+# column (e.g. "Commodity / Service") is passed through as service_line.
+# posted_date/naics/classification/estimated_value only exist on rows
+# enriched from the detail page (detail_crawler).
+LACO_SPEC = {
+    "opportunity_id": source("bid_id"),
+    "title": source("title"),
+    "solicitation_number": source("solicitation_number"),
+    "agency": source("department"),
+    "posted_date": source("posted_date"),
+    "deadline": source("close_date", default="", transform=_laco_deadline),
+    "naics_code": source("naics_code"),
+    "classification_code": source("classification_code"),
+    "estimated_value": source("estimated_value"),
+    "service_line": source("type", coalesce=True),
+    "type": const("Solicitation"),
+    "active": const(True),
+    "created_at": utc_now(),
+    "checksum": derived(_row_checksum, "opportunity_id", "title"),
+}
+
+# SAM.gov: direct mapping of the official JSON; the award sub-document is
+# unwrapped safely and 'archive_date' mirrors 'responseDeadLine'.
+SAM_SPEC = {
+    "opportunity_id": source("noticeId"),
+    "title": source("title"),
+    "solicitation_number": source("solicitationNumber"),
+    "agency": source("fullParentPathName"),
+    "agency_code": source("fullParentPathCode"),
+    "posted_date": source("postedDate"),
+    "deadline": source("responseDeadLine"),
+    "archive_date": source("responseDeadLine"),
+    "naics_code": source("naicsCode"),
+    "classification_code": source("classificationCode"),
+    "service_line": source("type"),
+    "type": source("type"),
+    "active": source("active", transform=_yes_to_bool),
+    "award_date": source("award.date"),
+    "award_number": source("award.number"),
+    "award_amount": source("award.amount"),
+    "awardee_name": source("award.awardee.name"),
+    "awardee_uei": source("award.awardee.ueiSAM"),
+    "awardee_cage": source("award.awardee.cageCode"),
+    "created_at": utc_now(),
+    "checksum": derived(_row_checksum, "opportunity_id", "title"),
+}
+
+# --- Normalizers: one per source --------------------------------------------
+
+iter_opportunities_cal = compile_mapping(CAL_SPEC, "iter_opportunities_cal")
+iter_opportunities_cal.__doc__ = """
+    Normalize CAL eProcure-like events into the unified opportunity schema, lazily.
 
     Input:
-      raw_events: list[dict] with mixed field names coming from the CAL scraper.
+      raw_events: any iterable of dicts with mixed field names coming from the CAL
+      scraper (a list, a generator, or rows streamed from a JSONL file).
 
-    Behavior:
+    Behavior (see CAL_SPEC):
       - Maps multiple possible source keys to the canonical unified schema.
-      - Leaves dates/amounts as provided (no parsing here) to keep this step simple.
+      - Leaves dates/amounts as provided (parsing is the separate
+        parse_dates_and_money stage) to keep this step simple.
       - Computes a stable 'checksum' based on (id|title) for idempotency.
       - Preserves unknown fields as None to be enriched later.
-
-    Notes:
-      - There is intentional minimal transformation here; enrichment is handled
-        by later steps in the pipeline (e.g., n8n/LLM).
-      - Some variables are initialized twice; left as-is to avoid altering logic.
-    """
-    out = []
-    utc = pytz.utc  # timezone handle kept for potential future use
-    null = None     # explicit alias to signal intentional nulls in mappings
-    false = False   # explicit alias for falsy default flags
-
-    # NOTE: This loop resets 'out' each iteration in the original code.
-    # Kept untouched to comply with "do not change logic".
-    for ev in raw_events:
-        out = []
-    utc = pytz.utc  # duplicate initialization retained intentionally
-
-    for ev in raw_events:
-        # Prefer CAL's event_id / event_name, fall back to unified keys if present
-        ev_id = ev.get("event_id") or ev.get("opportunity_id") or None
-        title = ev.get("event_name") or ev.get("title") or None
-
-        # CAL feed often lacks explicit posted/created dates; set to None
-        posted_date = None
-        created_at = None
-
-        # Deadline: pass through whatever the scraper provided (string/ISO/etc.)
-        deadline = ev.get("end_date") or None
-
-        # NOTE: Intentionally not parsing timezone or human-formatted dates here.
-        # Date normalization/parsing happens in a dedicated step later.
-
-        solicitation_number = ev.get("solicitation_number") or None
-        agency = ev.get("agency") or ev.get("department") or None
-        agency_code = ev.get("agency_code") or None
-        archive_date = ev.get("archive_date") or None
-        naics_code = ev.get("naics_code") or None
-        classification_code = ev.get("classification_code") or None
-        service_line = ev.get("service_line") or None
-        estimated_value = ev.get("estimated_value") or None
-        effort_hours = ev.get("effort_hours") or None
-        effort_bucket = ev.get("effort_bucket") or None
-        typ = ev.get("type") or None
-        active = ev.get("active") if "active" in ev else None
-        decision = ev.get("decision") or None
-        score = ev.get("score") or None
-
-        # Award-related fields (may be absent in CAL rows)
-        award_date = ev.get("award_date") or None
-        award_number = ev.get("award_number") or None
-        award_amount = ev.get("award_amount") or None
-        awardee_name = ev.get("awardee_name") or None
-        awardee_uei = ev.get("awardee_uei") or None
-        awardee_cage = ev.get("awardee_cage") or None
-
-        # Created-at passthrough if provided by upstream
-        created_at = ev.get("created_at") or None
-
-        # Token accounting passthrough (for LLM cost logging later)
-        token_cost = ev.get("token_cost") or None
-
-        # Idempotency checksum: stable across runs while (id|title) stays the same
-        chk_src = f"{ev_id or ''}|{title or ''}"
-        checksum = generate_hash(chk_src)
-
-        # Emit one normalized row
-        out.append({
-            "opportunity_id": ev_id,
-            "title": title,
-            "solicitation_number": solicitation_number,
-            "agency": agency,
-            "agency_code": agency_code,
-            "posted_date": posted_date,
-            "deadline": deadline,
-            "archive_date": archive_date,
-            "naics_code": naics_code,
-            "classification_code": classification_code,
-            "service_line": service_line,
-            "estimated_value": estimated_value,
-            "effort_hours": effort_hours,
-            "effort_bucket": effort_bucket,
-            "type": typ,
-            "active": active,
-            "decision": decision,
-            "score": score,
-            "award_date": award_date,
-            "award_number": award_number,
-            "award_amount": award_amount,
-            "awardee_name": awardee_name,
-            "awardee_uei": awardee_uei,
-            "awardee_cage": awardee_cage,
-            "created_at": created_at,
-            "checksum": checksum,
-            "token_cost": token_cost
-        })
-    return out
-
-def format_opportunities_laco(raw_bids):
+      - Yields one normalized row at a time, so memory stays flat for any input size.
     """
-    Normalize a list of Los Angeles County (LACO) bid objects into the unified schema.
 
-    Key behaviors:
+iter_opportunities_laco = compile_mapping(LACO_SPEC, "iter_opportunities_laco")
+iter_opportunities_laco.__doc__ = """
+    Normalize Los Angeles County (LACO) bid objects into the unified schema, lazily.
+
+    Key behaviors (see LACO_SPEC):
       - Uses 'close_date' as the deadline, except when the value is 'Continuous'
         (treated as empty string to signal “no fixed deadline”).
       - Marks type='Solicitation' and active=True by default for open listings.
       - Computes checksum from (bid_id|title) for idempotency.
       - Stamps 'created_at' with current UTC time (second precision + 'Z').
-
-    This function intentionally performs light-touch normalization only.
-    """
-    out = []
-    utc = pytz.utc  # retained for consistency with other normalizers
-    now = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-
-    for bid in raw_bids:
-        bid_id = bid.get("bid_id")
-        title = bid.get("title")
-        solicitation_number = bid.get("solicitation_number")
-        agency = bid.get("department")
-
-        # Deadline parsing rule: convert literal 'Continuous' into empty string
-        close = bid.get("close_date", "").strip()
-        if close == "Continuous":
-            close = ""
-
-        # Idempotency checksum based on stable identifying fields
-        chk_src = f"{bid_id or ''}|{title or ''}"
-        checksum = generate_hash(chk_src)
-
-        out.append({
-            "opportunity_id": bid_id,
-            "title": title,
-            "solicitation_number": solicitation_number,
-            "agency": agency,
-            "agency_code": None,
-            "posted_date": None,
-            "deadline": close,
-            "archive_date": None,
-            "naics_code": None,
-            "classification_code": None,
-            "service_line": bid.get('type') or None,  # passthrough of source typing
-            "estimated_value": None,
-            "effort_hours": None,
-            "effort_bucket": None,
-            "type": "Solicitation",
-            "active": True,
-            "decision": None,
-            "score": None,
-            "award_date": None,
-            "award_number": None,
-            "award_amount": None,
-            "awardee_name": None,
-            "awardee_uei": None,
-            "awardee_cage": None,
-            "created_at": now,
-            "checksum": checksum,
-            "token_cost": None
-        })
-
-    return out
-
-def format_opportunities_sam(raw_notices):
     """
-    Normalize a list of SAM.gov API notices into the unified schema.
 
-    Highlights:
+iter_opportunities_sam = compile_mapping(SAM_SPEC, "iter_opportunities_sam")
+iter_opportunities_sam.__doc__ = """
+    Normalize SAM.gov API notices into the unified schema, lazily.
+
+    Highlights (see SAM_SPEC):
       - Direct field mappings from the official SAM.gov JSON (noticeId, title, etc.).
       - Active flag: converts "Yes"/other into boolean True/False.
       - Award sub-document (date/number/amount/awardee) is safely unpacked.
       - 'archive_date' mirrors 'responseDeadLine' as provided by the source.
       - 'created_at' is set to current UTC when transforming.
+    """
+
+# Record-yielding twins of the mappers above (Opportunity instead of dict)
+RECORD_MAPPERS = {
+    "cal": compile_mapping(CAL_SPEC, "iter_records_cal", record=True),
+    "laco": compile_mapping(LACO_SPEC, "iter_records_laco", record=True),
+    "sam": compile_mapping(SAM_SPEC, "iter_records_sam", record=True),
+}
+
+
+def iter_records(source, raw_rows):
+    """Normalize raw rows of 'source' into Opportunity records, lazily."""
+    mapper = RECORD_MAPPERS.get((source or "").lower().strip())
+    if mapper is None:
+        raise ValueError(f"unknown source: {source!r} (expected cal, laco or sam)")
+    return mapper(raw_rows)
+
+def format_opportunities_cal(raw_events):
+    """List-returning wrapper around iter_opportunities_cal (original contract)."""
+    return list(iter_opportunities_cal(raw_events))
+
+def format_opportunities_laco(raw_bids):
+    """List-returning wrapper around iter_opportunities_laco (original contract)."""
+    return list(iter_opportunities_laco(raw_bids))
+
+def format_opportunities_sam(raw_notices):
+    """List-returning wrapper around iter_opportunities_sam (original contract)."""
+    return list(iter_opportunities_sam(raw_notices))
+
+# --- Dates & money: memoized parsing (the n8n "Format ISO and Money" step) ---
+
+DATE_FIELDS = ("posted_date", "deadline", "archive_date", "award_date")
+DATETIME_FIELDS = ("created_at",)
+MONEY_FIELDS = ("estimated_value", "award_amount")
+
+# Zone assumed for timestamps that carry neither an offset nor an abbreviation
+SOURCE_TIMEZONES = {
+    "cal": "America/Los_Angeles",
+    "laco": "America/Los_Angeles",
+    "sam": "UTC",
+}
+
+# Abbreviations seen in the feeds -> zones (pytz applies the right DST offset)
+_TZ_ABBREVIATIONS = {
+    "PDT": "America/Los_Angeles", "PST": "America/Los_Angeles", "PT": "America/Los_Angeles",
+    "MDT": "America/Denver", "MST": "America/Denver",
+    "CDT": "America/Chicago", "CST": "America/Chicago",
+    "EDT": "America/New_York", "EST": "America/New_York", "ET": "America/New_York",
+    "UTC": "UTC", "GMT": "UTC", "Z": "UTC",
+}
+
+# 08/21/2025 | 8/25/2025 12:00 PM | 08/21/2025 1:00PM PDT | 25-08-2025
+_SLASH_DATE = re.compile(
+    r"^(\d{1,2})([/-])(\d{1,2})\2(\d{4})"
+    r"(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AaPp][Mm])?)?"
+    r"(?:\s+([A-Za-z]{1,5}))?$"
+)
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_MONEY_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)")
+
+PARSE_CACHE_SIZE = int(os.getenv("FORMATTER_PARSE_CACHE", "65536"))
+
+
+def _iso_utc(moment):
+    """UTC instant in the JavaScript toISOString() shape (milliseconds + 'Z')."""
+    return moment.astimezone(pytz.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def _localize(naive, tz_name):
+    return pytz.timezone(tz_name).localize(naive)
+
+
+def _parse_slash(match, tz_name):
+    first, _, second, year, hour, minute, sec, ampm, abbr = match.groups()
+    month, day = int(first), int(second)
+    if month > 12:
+        # Day-first, the JS node's heuristic: the first part cannot be a month
+        month, day = day, month
+    hour = int(hour or 0)
+    if ampm:
+        hour = hour % 12 + (12 if ampm.upper() == "PM" else 0)
+    if abbr:
+        tz_name = _TZ_ABBREVIATIONS.get(abbr.upper())
+        if tz_name is None:
+            return None
+    naive = datetime(int(year), month, day, hour, int(minute or 0), int(sec or 0))
+    return _localize(naive, tz_name)
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_string(value, tz_name):
+    """
+    Detect the format of one raw date string.
+
+    Returns:
+      (calendar_date, utc_instant) as ISO strings, or None when the string is not
+      a date ("Continuous", free text). Memoized on (value, tz_name): the feeds
+      repeat the same deadlines across hundreds of rows.
+    """
+    text = value.strip()
+    try:
+        if _ISO_DATE.match(text):
+            return text, text + "T00:00:00.000Z"
+        match = _SLASH_DATE.match(text)
+        if match:
+            moment = _parse_slash(match, tz_name)
+        else:
+            moment = datetime.fromisoformat(text)
+            if moment.tzinfo is None:
+                moment = _localize(moment, tz_name)
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    # Calendar date as the source states it; the instant is normalized to UTC
+    return moment.date().isoformat(), _iso_utc(moment)
+
+
+def _parse_epoch(value):
+    seconds = value if value < 1e12 else value / 1000
+    moment = datetime.fromtimestamp(seconds, tz=pytz.utc)
+    return moment.date().isoformat(), _iso_utc(moment)
+
+
+def to_iso_date(value, tz_name="UTC"):
+    """YYYY-MM-DD for a date-like value; None/''/unparseable values are returned as-is."""
+    if isinstance(value, str) and value:
+        parsed = _parse_date_string(value, tz_name)
+        return parsed[0] if parsed else value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _parse_epoch(value)[0]
+    return value
+
+
+def to_iso_datetime(value, tz_name="UTC"):
+    """UTC ISO-8601 instant (ms precision, 'Z'); None/''/unparseable values are returned as-is."""
+    if isinstance(value, str) and value:
+        parsed = _parse_date_string(value, tz_name)
+        return parsed[1] if parsed else value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _parse_epoch(value)[1]
+    return value
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_money_string(value):
+    match = _MONEY_NUMBER.match(re.sub(r"[^0-9.\-]", "", value))
+    if not match:
+        return None
+    number = float(match.group())
+    return int(number) if number.is_integer() else number
+
+
+def to_money(value):
+    """Number from '$1,234.50'-style text; numbers, None, '' and junk are returned as-is."""
+    if isinstance(value, str) and value:
+        number = _parse_money_string(value)
+        return value if number is None else number
+    return value
+
+
+def iter_parsed(rows, tz_name="UTC"):
+    """
+    Parse the date, datetime and money fields of normalized rows in place, lazily.
+
+    Same contract as the n8n "Format ISO and Money" Code node (dates become
+    YYYY-MM-DD, created_at a UTC ISO instant, amounts numbers, anything else is
+    left untouched), with two differences: repeated raw strings are parsed once
+    (LRU cache), and a date keeps the calendar day the source states instead of
+    shifting to the UTC day (an 11 PM PDT deadline stays on its own day).
+    """
+    for row in rows:
+        for field in DATE_FIELDS:
+            if field in row:
+                row[field] = to_iso_date(row[field], tz_name)
+        for field in DATETIME_FIELDS:
+            if field in row:
+                row[field] = to_iso_datetime(row[field], tz_name)
+        for field in MONEY_FIELDS:
+            if field in row:
+                row[field] = to_money(row[field])
+        yield row
+
+
+def parse_dates_and_money(source, rows):
+    """Batch form of iter_parsed using the source's default timezone; returns a list."""
+    tz_name = SOURCE_TIMEZONES.get((source or "").lower().strip(), "UTC")
+    return list(iter_parsed(rows, tz_name))
+
+
+def parse_cache_info():
+    """LRU statistics of the date and money parsers (hits, misses, currsize)."""
+    return {
+        "dates": _parse_date_string.cache_info()._asdict(),
+        "money": _parse_money_string.cache_info()._asdict(),
+    }
+
+# --- Dedup: local checksum index --------------------------------------------
+
+_checksum_index = None
+
+
+def get_checksum_index():
+    """
+    Return the process-wide ChecksumIndex configured by $CHECKSUM_INDEX.
+
+    Returns None when the variable is unset, which keeps the original behavior
+    (every normalized row is emitted and dedup happens downstream).
+    """
+    global _checksum_index
+    path = os.getenv("CHECKSUM_INDEX")
+    if path and _checksum_index is None:
+        _checksum_index = ChecksumIndex(path)
+    return _checksum_index if path else None
+
+_near_duplicate_index = None
+
+
+def get_near_duplicate_index():
+    """
+    Return the process-wide NearDuplicateIndex configured by $NEAR_DUP_INDEX.
+
+    Returns None when the variable is unset: cross-source copies are then
+    kept, as before.
+    """
+    global _near_duplicate_index
+    path = os.getenv("NEAR_DUP_INDEX")
+    if path and _near_duplicate_index is None:
+        _near_duplicate_index = NearDuplicateIndex(path)
+    return _near_duplicate_index if path else None
+
+_enrichment_cache = None
+
+
+def get_enrichment_cache():
+    """
+    Return the process-wide EnrichmentCache configured by $ENRICH_CACHE.
+
+    Returns None when the variable is unset: every row is then a miss and
+    nothing is stored, i.e. the model sees every row as before.
+    """
+    global _enrichment_cache
+    path = os.getenv("ENRICH_CACHE")
+    if path and _enrichment_cache is None:
+        _enrichment_cache = EnrichmentCache(path)
+    return _enrichment_cache if path else None
+
+
+_opportunity_store = None
+
+
+def get_opportunity_store():
+    """
+    Return the process-wide export OpportunityStore configured by $EXPORT_DIR.
 
-    As with other normalizers, deep parsing/validation is deferred to later stages.
-    """
-    out = []
-    utc = pytz.utc
-    now = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-
-    for ev in raw_notices:
-        opportunity_id = ev.get("noticeId")
-        title = ev.get("title")
-        solicitation_number = ev.get("solicitationNumber")
-        agency = ev.get("fullParentPathName")
-        agency_code = ev.get("fullParentPathCode")
-        posted_date = ev.get("postedDate")
-        deadline = ev.get("responseDeadLine")
-        archive_date = ev.get("responseDeadLine")
-        naics_code = ev.get("naicsCode")
-        classification_code = ev.get("classificationCode")
-        service_line = ev.get("type")
-        type_f = ev.get("type")
-
-        # Map textual activity status into a strict boolean
-        isActive = ev.get("active")
-        if isActive == "Yes":
-            active = True
+    Returns None when the variable is unset (no analytics export).
+    """
+    global _opportunity_store
+    path = os.getenv("EXPORT_DIR")
+    if path and _opportunity_store is None:
+        # Imported here: scrapers.export builds on this module
+        try:
+            from scrapers.export import OpportunityStore
+        except ImportError:
+            from export import OpportunityStore
+        _opportunity_store = OpportunityStore(path)
+    return _opportunity_store if path else None
+
+# --- Run checkpoints ----------------------------------------------------------
+
+_runs = {}
+
+
+def get_run(run_id):
+    """
+    Return the RunCheckpoint of 'run_id' under $CHECKPOINT_DIR, shared by the
+    request threads.
+
+    Returns None when the variable or the id is empty (nothing is
+    checkpointed, as before). Raises ValueError for an unknown run.
+    """
+    root = os.getenv("CHECKPOINT_DIR")
+    if not root or not run_id:
+        return None
+    run = _runs.get((root, run_id))
+    if run is None:
+        run = RunCheckpoint(run_id, root)
+        if not run.exists:
+            raise ValueError(f"unknown run: {run_id!r}")
+        run = _runs.setdefault((root, run_id), run)
+    return run
+
+
+def start_run(_body=None):
+    """
+    Resume the latest incomplete run or start a new one (checkpoints.resume_or_start).
+
+    Returns:
+      {"run_id", "resumed", "next": {"stage", "sources"}}; run_id is "" when
+      $CHECKPOINT_DIR is unset, which turns checkpointing off for the run.
+    """
+    root = os.getenv("CHECKPOINT_DIR")
+    if not root:
+        return {"run_id": "", "resumed": False, "next": None}
+    run, resumed = resume_or_start(root=root)
+    summary = run.summary()
+    print(f"[formatter] run {run.run_id} {'resumed at' if resumed else 'started'}"
+          f" {json.dumps(summary['next'])}", file=sys.stderr)
+    return {"run_id": run.run_id, "resumed": resumed, "next": summary["next"]}
+
+# --- Streaming: incremental JSON/JSONL in, JSONL out --------------------------
+
+# Source name -> lazy normalizer, used by the streaming CLI mode
+STREAMERS = {
+    "cal": iter_opportunities_cal,
+    "laco": iter_opportunities_laco,
+    "sam": iter_opportunities_sam,
+}
+
+_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_rows(stream, chunk_size=_CHUNK_SIZE):
+    """
+    Yield rows from a text stream holding either a JSON array or JSONL.
+
+    The format is detected from the first non-whitespace character ('[' means a
+    JSON array, anything else is treated as one JSON value per line). Arrays are
+    decoded element by element with raw_decode over a bounded buffer, so the whole
+    document never has to be held in memory at once.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    eof = False
+
+    # Find the first meaningful character to pick the format
+    while not eof:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf = (buf + chunk).lstrip(_WHITESPACE)
+        if buf:
+            break
+    if not buf:
+        return
+
+    if not buf.startswith("["):
+        # JSONL: finish the partially read line, then go line by line
+        if not eof:
+            buf += stream.readline()
+        for line in buf.splitlines():
+            if line.strip():
+                yield json.loads(line)
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    pos = 1  # skip the opening '['
+    while True:
+        # Skip separators between elements
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+
+        try:
+            row, end = decoder.raw_decode(buf, pos)
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+
+        if not complete:
+            # Element straddles the chunk boundary: drop consumed text, read more
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        yield row
+        pos = end
+
+
+def stream_jsonl(source, instream, outstream, index=None):
+    """
+    Normalize rows from 'instream' and write one JSON object per line to 'outstream'.
+
+    Rows flow through the lazy normalizer one at a time, so peak memory is bounded
+    by the largest single row rather than by the size of the batch. When a
+    ChecksumIndex is given, only new and changed rows are kept, chunk by chunk;
+    they are staged in the index until POST /airtable/write commits them.
+
+    Returns:
+      number of rows written.
+    """
+    streamer = STREAMERS.get((source or "").lower().strip())
+    if streamer is None:
+        raise ValueError(f"unknown source: {source!r} (expected cal, laco or sam)")
+
+    rows = streamer(iter_json_rows(instream))
+    if index is not None:
+        rows = index.iter_changed(rows, record=False, stage=True)
+
+    count = 0
+    for row in rows:
+        outstream.write(json.dumps(row, ensure_ascii=False))
+        outstream.write("\n")
+        count += 1
+    outstream.flush()
+    return count
+
+# --- Service mode: long-lived worker ------------------------------------------
+
+# Source name -> normalizer, shared by the CLI, the JSONL worker and the HTTP server
+NORMALIZERS = {
+    "cal": format_opportunities_cal,
+    "laco": format_opportunities_laco,
+    "sam": format_opportunities_sam,
+}
+
+DEFAULT_HOST = os.getenv("FORMATTER_HOST", "0.0.0.0")
+DEFAULT_PORT = int(os.getenv("FORMATTER_PORT", "8765"))
+
+
+def run_batch(source, rows, parse=False):
+    """
+    Normalize one batch with the normalizer registered for 'source'.
+
+    parse=True also runs the date/money stage (parse_dates_and_money), which
+    replaces the n8n "Format ISO and Money" Code node.
+
+    Returns:
+      (opportunities, latency_ms) where latency_ms is the wall-clock time spent
+      normalizing, so callers can log cost per request instead of per process.
+
+    Raises:
+      ValueError for an unknown source.
+    """
+    normalizer = NORMALIZERS.get((source or "").lower().strip())
+    if normalizer is None:
+        raise ValueError(f"unknown source: {source!r} (expected cal, laco or sam)")
+
+    started = time.perf_counter()
+    with metrics.span("normalization", source=source):
+        out = normalizer(rows)
+    if parse:
+        with metrics.span("parse", source=source):
+            out = parse_dates_and_money(source, out)
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    return out, latency_ms
+
+
+def _batch_response(source, rows, parse=False, run=None):
+    """
+    Build the response envelope shared by the JSONL worker and the HTTP server.
+
+    With the local checksum index, only new and changed rows are returned:
+    'duplicates' counts the unchanged rows that were dropped, 'changed' the
+    known rows whose content changed, and 'changes' lists, per returned row,
+    its status and changed fields (ChecksumIndex.diff). The returned rows
+    are only staged in the index: airtable_write() records them once Airtable
+    accepted them, so a run that fails before the write sends them again.
+    Without the index every row is returned and 'changes' is empty.
+
+    With $NEAR_DUP_INDEX set, copies of an opportunity already seen on
+    another portal are dropped as well and listed in 'near_duplicates' with
+    their canonical checksum (NearDuplicateIndex.tag). The batch is staged
+    in that index too, until airtable_write() commits it.
+
+    With $EXPORT_DIR set, the returned rows are also appended to the
+    partitioned analytics export (scrapers/export.py).
+
+    With a RunCheckpoint, the raw and returned rows are checkpointed; when
+    the run already holds this source's normalized rows they are returned
+    as they were ('resumed': true), even when part of them was written
+    (and committed to the checksum index) before the run failed.
+    """
+    if run is not None and run.completed("normalized", source):
+        out = list(run.rows("normalized", source))
+        print(f"[formatter] {source}: {len(out)} rows from run {run.run_id}", file=sys.stderr)
+        return {"source": source, "count": len(out), "duplicates": 0, "changed": 0, "latency_ms": 0.0,
+                "opportunities": out, "changes": [], "near_duplicates": [], "resumed": True}
+    out, latency_ms = run_batch(source, rows, parse)
+    if run is not None and not run.completed("raw", source):
+        run.append("raw", source, rows)
+        run.complete("raw", source)
+    normalized = len(out)
+    changes = []
+    index = get_checksum_index()
+    if index is not None:
+        out, changes = index.diff(out, record=False, stage=True)
+    near = []
+    dedup = get_near_duplicate_index()
+    if dedup is not None:
+        out, near = dedup.tag(out, source=source, record=False, stage=True)
+        dropped = {d["checksum"] for d in near}
+        changes = [c for c in changes if c["checksum"] not in dropped]
+    store = get_opportunity_store()
+    if store is not None:
+        store.write(source, out)
+    if run is not None:
+        run.append("normalized", source, out)
+        run.complete("normalized", source)
+        run.close_if_empty()
+    changed = sum(1 for c in changes if c["status"] == "changed")
+    metrics.count("rows_in", len(rows), source=source)
+    metrics.count("rows_out", len(out), source=source)
+    metrics.count("duplicates", normalized - len(out) - len(near), source=source)
+    metrics.count("near_duplicates", len(near), source=source)
+    metrics.count("changed", changed, source=source)
+    print(f"[formatter] {source}: {normalized} rows in {latency_ms} ms"
+          f" ({normalized - len(out) - len(near)} duplicates, {len(near)} near-duplicates, {changed} changed)",
+          file=sys.stderr)
+    return {
+        "source": source,
+        "count": len(out),
+        "duplicates": normalized - len(out) - len(near),
+        "changed": changed,
+        "latency_ms": latency_ms,
+        "opportunities": out,
+        "changes": changes,
+        "near_duplicates": near,
+    }
+
+
+def serve_jsonl(instream=None, outstream=None):
+    """
+    stdin/stdout worker: one JSON request per line, one JSON response per line.
+
+    Request:  {"id": <any>, "source": "cal|laco|sam", "rows": [...], "parse": false}
+    Response: {"id": <same>, "source": ..., "count": N, "latency_ms": X,
+               "opportunities": [...]}
+              or {"id": <same>, "error": "<message>"} on a bad request.
+
+    The process stays alive between batches, so interpreter startup and module
+    imports are paid once, and payload size is not bounded by ARG_MAX. Metrics
+    are flushed once, when the input ends.
+    """
+    instream = instream or sys.stdin
+    outstream = outstream or sys.stdout
+
+    for line in instream:
+        line = line.strip()
+        if not line:
+            continue
+        req_id = None
+        try:
+            req = json.loads(line)
+            req_id = req.get("id")
+            resp = _batch_response(req.get("source"), req.get("rows") or [], bool(req.get("parse")))
+        except (ValueError, AttributeError) as exc:
+            metrics.count("errors", stage="jsonl")
+            resp = {"error": str(exc)}
+        resp = {"id": req_id, **resp}
+        outstream.write(json.dumps(resp, ensure_ascii=False) + "\n")
+        outstream.flush()
+    metrics.flush("formatter")
+
+
+def classify_batch(rows):
+    """
+    Run the offline classifier over normalized rows.
+
+    Returns:
+      {"classified": [...], "uncertain": [...], "latency_ms": X}; only the
+      'uncertain' rows still need the LLM step.
+    """
+    started = time.perf_counter()
+    classified, uncertain = get_classifier().split(rows)
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    print(f"[formatter] classify: {len(classified)} classified, {len(uncertain)} to LLM"
+          f" in {latency_ms} ms", file=sys.stderr)
+    return {"classified": classified, "uncertain": uncertain, "latency_ms": latency_ms}
+
+
+def enrich_lookup(rows, run=None):
+    """
+    Serve what the enrichment cache already knows; pack the rest into prompts.
+
+    With a RunCheckpoint, rows already enriched in that run are served from
+    its checkpoint first.
+
+    Returns:
+      {"hits": [...], "batches": [{"data": [...]}, ...], "misses": N, "stats": {...}}
+      'batches' has the item shape of the former `lista todos` chunker, so it
+      can feed the LLM loop unchanged.
+    """
+    resumed = []
+    if run is not None:
+        enriched = {r["checksum"]: r for r in run.rows("enriched", partial=True) if r.get("checksum")}
+        resumed = [enriched[r["checksum"]] for r in rows if r.get("checksum") in enriched]
+        rows = [r for r in rows if r.get("checksum") not in enriched]
+    cache = get_enrichment_cache()
+    hits, misses = cache.lookup(rows) if cache is not None else ([], list(rows))
+    hits = resumed + hits
+    batches = [{"data": batch} for batch in pack_batches(misses)]
+    stats = dict(cache.stats) if cache is not None else {}
+    print(f"[formatter] enrich: {len(hits)} cached, {len(misses)} to LLM in {len(batches)} prompts",
+          file=sys.stderr)
+    return {"hits": hits, "batches": batches, "misses": len(misses), "stats": stats}
+
+
+def enrich_store(rows, run=None):
+    """Record model-enriched rows in the enrichment cache (no-op when disabled) and the run checkpoint."""
+    if run is not None:
+        run.append("enriched", ALL, rows)
+    cache = get_enrichment_cache()
+    return {"stored": cache.store(rows) if cache is not None else 0}
+
+
+def score_rows(rows, run=None):
+    """
+    Score a batch and allocate service-line capacity across it (scoring.score_batch).
+
+    With a RunCheckpoint, the enriched input completes the run's enriched stage.
+
+    Returns:
+      {"scored": [...], "capacity": {line: {"hours_available", "allocated"}}, "latency_ms": X}
+    """
+    if run is not None:
+        run.append("enriched", ALL, rows)
+        run.complete("enriched", ALL)
+    started = time.perf_counter()
+    scored, capacity = score_batch(rows)
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    print(f"[formatter] score: {len(scored)} rows in {latency_ms} ms", file=sys.stderr)
+    return {"scored": scored, "capacity": capacity, "latency_ms": latency_ms}
+
+
+_airtable_writer = None
+
+
+def get_airtable_writer():
+    """Process-wide AirtableWriter, so its keep-alive connections outlive a request."""
+    global _airtable_writer
+    if _airtable_writer is None:
+        _airtable_writer = AirtableWriter()
+    return _airtable_writer
+
+
+# Fields the upsert leaves alone on records that already exist: the Slack
+# reviewer's Go/No Go must survive an amended deadline or amount
+REVIEWER_FIELDS = ("decision",)
+
+
+def airtable_write(rows, run=None):
+    """
+    Upsert scored rows into the Opportunities table, 10 per request.
+
+    Rows whose checksum the checksum index already holds were written before
+    and only changed (ChecksumIndex.diff): their upsert leaves out
+    REVIEWER_FIELDS, and their records come back with "status": "changed"
+    ("new" otherwise), so /alerts/digest does not announce them again.
+
+    With a RunCheckpoint, checksums the run already wrote are skipped and the
+    written ones are checkpointed. The checksums of the records Airtable
+    returned are committed to the checksum and near-duplicate indexes, and
+    the scraper watermarks staged by the run are recorded, so later runs
+    treat them as seen.
+
+    Returns:
+      {"records": [{"id", "createdTime", "fields", "status"}, ...], "stats": {...}, "skipped": N,
+       "latency_ms": X}
+    """
+    started = time.perf_counter()
+    skipped = 0
+    if run is not None:
+        written = {r.get("checksum") for r in run.rows("written", partial=True)}
+        pending = [r for r in rows if r.get("checksum") not in written]
+        skipped, rows = len(rows) - len(pending), pending
+    index = get_checksum_index()
+    changed = index.known(r.get("checksum") for r in rows) if index is not None else set()
+    rows = [{k: v for k, v in r.items() if k not in REVIEWER_FIELDS} if r.get("checksum") in changed else r
+            for r in rows]
+    writer = get_airtable_writer()
+    records = writer.write(rows)
+    for record in records:
+        record["status"] = "changed" if (record.get("fields") or {}).get("checksum") in changed else "new"
+    store = get_decision_store()
+    if store is not None:
+        store.remember(records)
+    checksums = [(r.get("fields") or {}).get("checksum") for r in records]
+    if index is not None:
+        index.commit(checksums)
+    dedup = get_near_duplicate_index()
+    if dedup is not None:
+        dedup.commit(checksums)
+    if run is not None:
+        run.append("written", ALL, ({"checksum": (r.get("fields") or {}).get("checksum"), "id": r.get("id")}
+                                    for r in records))
+        run.complete("written", ALL)
+    watermark.commit(run.run_id if run is not None else None)
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    print(f"[formatter] airtable: {len(records)} records in {latency_ms} ms {json.dumps(writer.stats)}",
+          file=sys.stderr)
+    return {"records": records, "stats": dict(writer.stats), "skipped": skipped, "latency_ms": latency_ms}
+
+
+_decision_store = None
+_decision_flusher = None
+
+
+def get_decision_store():
+    """
+    Return the process-wide DecisionStore configured by $DECISION_STORE.
+
+    Returns None when the variable is unset; POST /decisions then answers 400.
+    """
+    global _decision_store
+    path = os.getenv("DECISION_STORE")
+    if path and _decision_store is None:
+        _decision_store = DecisionStore(path)
+    return _decision_store if path else None
+
+
+def get_decision_flusher():
+    """Process-wide DecisionFlusher writing the queued decisions to Airtable, started on first use."""
+    global _decision_flusher
+    store = get_decision_store()
+    if store is not None and _decision_flusher is None:
+        _decision_flusher = DecisionFlusher(store, get_airtable_writer()).start()
+    return _decision_flusher
+
+
+def record_decisions(rows):
+    """
+    Queue Accept/Ignore clicks ({"checksum", "decision"}) for the write-behind
+    flush to Airtable.
+
+    Returns:
+      {"queued": N, "pending": M, "latency_ms": X}
+    """
+    started = time.perf_counter()
+    store = get_decision_store()
+    if store is None:
+        raise ValueError("DECISION_STORE is not set")
+    queued = store.enqueue(rows)
+    get_decision_flusher().wake()
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    return {"queued": queued, "pending": store.pending_count(), "latency_ms": latency_ms}
+
+
+_alert_dispatcher = None
+
+
+def get_alert_dispatcher():
+    """Process-wide AlertDispatcher, so its token bucket spans consecutive runs."""
+    global _alert_dispatcher
+    if _alert_dispatcher is None:
+        _alert_dispatcher = AlertDispatcher()
+    return _alert_dispatcher
+
+
+def alert_digest(records):
+    """
+    Post new opportunities to Slack as score/deadline-ordered digests.
+
+    Records /airtable/write tagged "status": "changed" (amendments of rows
+    already alerted) are skipped and counted in 'changed'.
+
+    Returns:
+      {"messages": [{"channel", "ts", "items"}, ...], "items": N, "changed": N, "latency_ms": X}
+    """
+    started = time.perf_counter()
+    fresh = [r for r in records if not (isinstance(r, dict) and r.get("status") == "changed")]
+    dispatcher = get_alert_dispatcher()
+    messages = dispatcher.dispatch(fresh)
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    items = sum(m["items"] for m in messages)
+    print(f"[formatter] alerts: {items} items in {len(messages)} messages, {latency_ms} ms", file=sys.stderr)
+    return {"messages": messages, "items": items, "changed": len(records) - len(fresh), "latency_ms": latency_ms}
+
+
+class FormatterHandler(BaseHTTPRequestHandler):
+    """
+    HTTP endpoint for the long-lived formatter.
+
+      POST /runs/start              resume the latest incomplete run or start one -> run_id
+      POST /format/<cal|laco|sam>   body: JSON list of raw rows
+                                    ?parse=1 also parses dates/money
+      POST /classify                body: JSON list of normalized rows
+      POST /enrich/lookup           body: rows bound for the LLM -> cached + prompt batches
+      POST /enrich/store            body: rows enriched by the LLM
+      POST /score                   body: enriched rows -> auto_decision + score
+      POST /airtable/write          body: scored rows -> upserted Airtable records
+      POST /alerts/digest           body: Airtable records -> Slack digest messages
+      POST /decisions               body: [{"checksum", "decision"}] -> queued for Airtable
+      GET  /health                  liveness probe for docker/n8n
+      GET  /metrics                 spans and counters (Prometheus text format)
+
+    ?run=<run_id> on /format, /enrich/*, /score and /airtable/write
+    checkpoints their output under $CHECKPOINT_DIR (scrapers/checkpoints.py).
+    """
+
+    # Endpoints taking a JSON list of normalized rows
+    ROW_HANDLERS = {
+        "classify": classify_batch,
+        "enrich/lookup": enrich_lookup,
+        "enrich/store": enrich_store,
+        "score": score_rows,
+        "airtable/write": airtable_write,
+        "alerts/digest": alert_digest,
+        "decisions": record_decisions,
+        "runs/start": start_run,
+    }
+    # Row handlers taking the ?run= checkpoint
+    RUN_HANDLERS = ("enrich/lookup", "enrich/store", "score", "airtable/write")
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send(200, {"status": "ok"})
+        elif path == "/metrics":
+            body = metrics.METRICS.to_prometheus("formatter").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
         else:
-            active = False
-
-        # Award sub-object: unwrap safely with defaults
-        award_info = ev.get("award") or {}
-        award_date = award_info.get("date")
-        award_number = award_info.get("number")
-        award_amount = award_info.get("amount")
-        awardee = award_info.get("awardee") or {}
-        awardee_name = awardee.get("name")
-        awardee_uei = awardee.get("ueiSAM")
-        awardee_cage = awardee.get("cageCode")
-
-        # Active status again (kept as in the original code, not refactored)
-        active = ev.get("active") == "Yes"
-
-        # Idempotency checksum derived from (id|title)
-        chk_src = f"{opportunity_id or ''}|{title or ''}"
-        checksum = generate_hash(chk_src)
-
-        out.append({
-            "opportunity_id": opportunity_id,
-            "title": title,
-            "solicitation_number": solicitation_number,
-            "agency": agency,
-            "agency_code": agency_code,
-            "posted_date": posted_date,
-            "deadline": deadline,
-            "archive_date": archive_date,
-            "naics_code": naics_code,
-            "classification_code": classification_code,
-            "service_line": service_line,
-            "estimated_value": None,
-            "effort_hours": None,
-            "effort_bucket": None,
-            "type": type_f,
-            "active": active,
-            "decision": None,
-            "score": None,
-            "award_date": award_date,
-            "award_number": award_number,
-            "award_amount": award_amount,
-            "awardee_name": awardee_name,
-            "awardee_uei": awardee_uei,
-            "awardee_cage": awardee_cage,
-            "created_at": now,
-            "checksum": checksum,
-            "token_cost": None
-        })
-
-    return out
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = self.path.partition("?")[0].strip("/")
+        if path not in self.ROW_HANDLERS:
+            path = "format" if path.startswith("format/") else "unknown"
+        if path == "runs/start":  # close the last run if it never reached /airtable/write
+            metrics.flush("formatter")
+        with metrics.span("request", endpoint=path):
+            self._post()
+        if path == "airtable/write":  # end of a workflow run: one history line per run
+            metrics.flush("formatter")
+
+    def _post(self):
+        path, _, query = self.path.partition("?")
+        parts = path.strip("/").split("/")
+        run_id = parse_qs(query).get("run", [""])[-1]
+        handler = self.ROW_HANDLERS.get("/".join(parts))
+        if handler is not None:
+            try:
+                kwargs = {"run": get_run(run_id)} if "/".join(parts) in self.RUN_HANDLERS else {}
+                length = int(self.headers.get("Content-Length") or 0)
+                resp = handler(json.loads(self.rfile.read(length) or b"[]"), **kwargs)
+            except (ValueError, AttributeError) as exc:
+                self._send(400, {"error": str(exc)})
+                return
+            except HttpError as exc:
+                self._send(502, {"error": str(exc)})
+                return
+            self._send(200, resp, latency_ms=resp.get("latency_ms"))
+            return
+        if len(parts) != 2 or parts[0] != "format":
+            self._send(404, {"error": "not found"})
+            return
+        parse = parse_qs(query).get("parse", ["0"])[-1].lower() in ("1", "true", "yes")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            rows = json.loads(self.rfile.read(length) or b"[]")
+            resp = _batch_response(parts[1], rows, parse, run=get_run(run_id))
+        except (ValueError, AttributeError) as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        self._send(200, resp, latency_ms=resp["latency_ms"])
+
+    def _send(self, status, payload, latency_ms=None):
+        if status >= 400:
+            metrics.count("errors", stage=f"http_{status}")
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if latency_ms is not None:
+            self.send_header("X-Latency-Ms", str(latency_ms))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Route access logs to stderr in the same style as the rest of the module
+        print(f"[formatter] {self.address_string()} {format % args}", file=sys.stderr)
+
+
+def make_http_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Create (but do not start) the threaded HTTP server; port=0 picks a free port."""
+    return ThreadingHTTPServer((host, port), FormatterHandler)
+
+
+def serve_http(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the HTTP endpoint until interrupted."""
+    server = make_http_server(host, port)
+    print(f"[formatter] listening on http://{host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 # --- CLI entrypoint ----------------------------------------------------------
 
@@ -288,6 +1285,10 @@ def _main_cli() -> None:
 
     Usage:
       python normalize_opportunities.py <base64_json> <cal|laco|sam>
+      python formatter.py --serve              (stdin/stdout JSONL worker)
+      python formatter.py --http [port]        (HTTP endpoint, default 8765)
+      python formatter.py --stream <cal|laco|sam> [file|-]
+                                               (JSON array/JSONL in, JSONL out)
 
     Parameters:
       - base64_json: a base64-encoded JSON string representing a list of raw rows
@@ -302,6 +1303,23 @@ def _main_cli() -> None:
     null = None
     false = False
 
+    # Long-lived modes: keep the normalizers loaded across batches
+    if len(sys.argv) >= 2 and sys.argv[1] == "--serve":
+        serve_jsonl()
+        return
+    if len(sys.argv) >= 2 and sys.argv[1] == "--http":
+        port = int(sys.argv[2]) if len(sys.argv) >= 3 else DEFAULT_PORT
+        serve_http(port=port)
+        return
+    if len(sys.argv) >= 3 and sys.argv[1] == "--stream":
+        path = sys.argv[3] if len(sys.argv) >= 4 else "-"
+        if path == "-":
+            stream_jsonl(sys.argv[2], sys.stdin, sys.stdout, get_checksum_index())
+        else:
+            with open(path, encoding="utf-8") as fh:
+                stream_jsonl(sys.argv[2], fh, sys.stdout, get_checksum_index())
+        return
+
     if len(sys.argv) < 3:
         print("Uso: python normalize_opportunities.py <arquivo.json> <cal|laco|sam>", file=sys.stderr)
         sys.exit(2)
@@ -324,6 +1342,11 @@ def _main_cli() -> None:
         # (Original behavior preserved: print text to stdout without raising.)
         print("Nada")
 
+    # Keep only new or changed rows when the local checksum index is configured
+    index = get_checksum_index()
+    if index is not None:
+        oportunidades, _ = index.diff(oportunidades, record=False, stage=True)
+
     # Emit normalized rows as UTF-8 JSON (no ASCII escaping for readability)
     print(json.dumps(oportunidades, ensure_ascii=False))
 
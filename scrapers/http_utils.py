@@ -0,0 +1,178 @@
+"""
+Small HTTP toolkit shared by the API clients (SAM.gov, Airtable, Slack).
+
+  - TokenBucket: thread-safe rate limiter (N requests/sec with a burst size).
+  - HttpClient:  keep-alive connection pool (one connection per host per
+                 thread), retry with exponential backoff on 429/5xx and network
+                 errors, honoring Retry-After.
+
+Standard library only, so the scraper image needs no extra dependency.
+"""
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Classic token bucket: 'rate' tokens per second, at most 'capacity' banked.
+
+    acquire() blocks until a token is available, so callers sharing a bucket
+    (e.g. worker threads) never exceed the configured request rate together.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Take 'tokens' from the bucket, sleeping as long as needed; returns the wait."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class HttpError(Exception):
+    """Non-retryable HTTP status (or retries exhausted)."""
+
+    def __init__(self, status, body, url):
+        super().__init__(f"HTTP {status} for {url}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+        self.url = url
+
+
+class Response:
+    """Status, headers (lower-cased keys) and raw body of a completed request."""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8")) if self.body else None
+
+
+class HttpClient:
+    """
+    Pooled, retrying HTTP client.
+
+    Connections are kept alive and reused per (scheme, host, port) and per
+    thread, which avoids a TCP/TLS handshake on every call. When a bucket is
+    given, every attempt (retries included) takes a token first.
+    """
+
+    def __init__(self, bucket=None, retries=5, backoff=0.5, max_backoff=30.0, timeout=60,
+                 sleep=time.sleep):
+        self.bucket = bucket
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._sleep = sleep
+        self._local = threading.local()
+        self.requests = 0   # attempts sent on the wire
+        self.retried = 0    # attempts that were retried
+        self._count_lock = threading.Lock()
+
+    def _connection(self, scheme, netloc):
+        pool = self._local.__dict__.setdefault("pool", {})
+        conn = pool.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=self.timeout)
+            pool[(scheme, netloc)] = conn
+        return conn
+
+    def _drop_connection(self, scheme, netloc):
+        conn = self._local.__dict__.get("pool", {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+    def request(self, method, url, body=None, headers=None, ok=(200, 201, 202, 204, 304)):
+        """
+        Send a request and return a Response.
+
+        'body' may be bytes or a JSON-serializable object. Statuses in 'ok' are
+        returned as-is, RETRY_STATUSES are retried with backoff, anything else
+        raises HttpError.
+        """
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = dict(headers or {})
+        if body is not None and not isinstance(body, (bytes, bytearray)):
+            body = json.dumps(body).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with self._count_lock:
+                self.requests += 1
+            try:
+                conn = self._connection(parts.scheme, parts.netloc)
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                status = resp.status
+                resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            except (OSError, http.client.HTTPException) as exc:
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt >= self.retries:
+                    raise
+                print(f"[http] {method} {parts.netloc}{parts.path}: {exc}; retrying", file=sys.stderr)
+                self._retry_wait(attempt)
+                attempt += 1
+                continue
+
+            if status in ok:
+                return Response(status, resp_headers, data)
+            if status in RETRY_STATUSES and attempt < self.retries:
+                self._retry_wait(attempt, resp_headers.get("retry-after"))
+                attempt += 1
+                continue
+            raise HttpError(status, data, url)
+
+    def _retry_wait(self, attempt, retry_after=None):
+        with self._count_lock:
+            self.retried += 1
+        self._sleep(self._delay(attempt, retry_after))
+
+    def close(self):
+        """Close the connections opened by the calling thread."""
+        for conn in self._local.__dict__.pop("pool", {}).values():
+            conn.close()
@@ -0,0 +1,251 @@
+"""
+Unified ingestion runner: scrape every source concurrently and stream the rows
+through the normalizers into one merged JSONL output.
+
+Usage (from the repository root, e.g. /workspace in the scraper container):
+  python -m scrapers.ingest [cal,laco,sam]
+  python -m scrapers.ingest --resume [run_id]
+
+CAL and LACo share a single Chromium instance while SAM.gov is fetched at the
+same time in a worker thread. Each source pushes raw batches into a bounded
+queue (backpressure) and a single consumer normalizes them with the matching
+iter_opportunities_* mapper as they arrive, so wall-clock time is close to the
+slowest source rather than the sum of all of them.
+
+With CHECKPOINT_DIR set, every run gets an id and its raw and normalized
+rows are checkpointed per source (scrapers/checkpoints.py). --resume picks
+a run (by default the latest one) up where it stopped: sources whose
+normalized rows are complete are written from the checkpoint, sources whose
+raw rows are complete are re-normalized from it, and only the rest are
+scraped again.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+from playwright.async_api import async_playwright
+
+from scrapers import cal_eprocure_scraper, checkpoints, lacobids_scraper, metrics, sam_client
+from scrapers.formatter import STREAMERS, get_checksum_index, get_near_duplicate_index
+
+ALL_SOURCES = ("cal", "laco", "sam")
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+
+_DONE = object()
+
+
+async def run(producers, out, queue_size=QUEUE_SIZE, index=None, near_duplicates=None, checkpoint=None):
+    """
+    Run source producers concurrently and write normalized rows to 'out'.
+
+    producers: {source: async callable(emit)}; each producer awaits
+               emit(list_of_raw_rows) as often as it likes.
+    index:     optional ChecksumIndex; only new and changed rows are written,
+               staged until POST /airtable/write commits them.
+    near_duplicates: optional NearDuplicateIndex; copies of a row already
+               seen on another source are not written.
+    checkpoint: optional RunCheckpoint; raw batches (unless that stage is
+               already complete) and normalized rows are checkpointed, and
+               both stages are completed for the sources that did not fail.
+
+    Returns:
+      per-source stats {source: {"rows_in", "rows_out", "seconds", "error"}}.
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    stats = {s: {"rows_in": 0, "rows_out": 0, "seconds": None, "error": None} for s in producers}
+    started = time.perf_counter()
+
+    async def produce(source, producer):
+        record = checkpoint is not None and not checkpoint.completed("raw", source)
+
+        async def emit(rows):
+            stats[source]["rows_in"] += len(rows)
+            if record:
+                checkpoint.append("raw", source, rows)
+            await queue.put((source, rows))
+
+        try:
+            await producer(emit)
+            if record:
+                checkpoint.complete("raw", source)
+        except Exception as exc:  # one failing source must not sink the others
+            metrics.count("errors", source=source, stage="scrape")
+            stats[source]["error"] = f"{type(exc).__name__}: {exc}"
+            print(f"[ingest] {source} failed: {stats[source]['error']}", file=sys.stderr)
+        finally:
+            stats[source]["seconds"] = round(time.perf_counter() - started, 3)
+
+    async def produce_all():
+        await asyncio.gather(*(produce(s, p) for s, p in producers.items()))
+        await queue.put(_DONE)
+
+    producing = asyncio.create_task(produce_all())
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            source, rows = item
+            with metrics.span("normalization", source=source):
+                normalized = STREAMERS[source](rows)
+                if index is not None:
+                    normalized = index.diff(normalized, record=False, stage=True)[0]
+                    metrics.count("duplicates", len(rows) - len(normalized), source=source)
+                if near_duplicates is not None:
+                    normalized, near = near_duplicates.tag(normalized, source=source, record=False, stage=True)
+                    metrics.count("near_duplicates", len(near), source=source)
+                if checkpoint is not None:
+                    normalized = list(normalized)
+                    checkpoint.append("normalized", source, normalized)
+            for row in normalized:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                stats[source]["rows_out"] += 1
+            out.flush()
+    finally:
+        if not producing.done():  # the consumer failed: stop the producers blocked on the full queue
+            producing.cancel()
+        try:
+            await producing
+        except asyncio.CancelledError:
+            pass
+    if checkpoint is not None:
+        for source, entry in stats.items():
+            if entry["error"] is None:
+                checkpoint.complete("normalized", source)
+        checkpoint.close_if_empty()
+    return stats
+
+
+def browser_producers(browser, sources):
+    """Producers for the Playwright sources, all sharing one browser instance."""
+    producers = {}
+    if "cal" in sources:
+        async def cal(emit):
+            await emit(await cal_eprocure_scraper.scrape(browser))
+        producers["cal"] = cal
+    if "laco" in sources:
+        async def laco(emit):
+            await emit(await lacobids_scraper.scrape(browser))
+        producers["laco"] = laco
+    return producers
+
+
+async def sam_producer(emit):
+    """Fetch SAM.gov notices (every page) off the event loop and emit them as one batch."""
+    max_records = int(os.getenv("SAM_MAX_RECORDS", "0")) or None
+    body = await asyncio.to_thread(sam_client.fetch_notices, max_records=max_records)
+    await emit(body.get("opportunitiesData") or [])
+
+
+def replay_producer(checkpoint, source):
+    """Producer emitting the checkpointed raw batches of 'source' instead of scraping it."""
+    async def replay(emit):
+        for batch in checkpoint.batches("raw", source):
+            await emit(batch)
+    return replay
+
+
+def replay_normalized(checkpoint, sources, out, partial=False):
+    """
+    Write the checkpointed normalized rows of 'sources' to 'out'; returns their stats.
+
+    partial=True replays the batches of interrupted attempts and carries them
+    into the current one: the checksum index recorded those rows already, so
+    normalizing the raw rows again would drop them as duplicates.
+    """
+    stats = {}
+    for source in sources:
+        rows, seen = [], set()
+        for row in checkpoint.rows("normalized", source, partial=partial):
+            if partial and row.get("checksum") in seen:  # carried by more than one attempt
+                continue
+            seen.add(row.get("checksum"))
+            rows.append(row)
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        out.flush()
+        if partial:
+            checkpoint.append("normalized", source, rows)
+        stats[source] = {"rows_in": 0, "rows_out": len(rows), "seconds": 0.0, "error": None,
+                         "resumed": "raw" if partial else "normalized"}
+    return stats
+
+
+async def ingest(sources=ALL_SOURCES, out=None, checkpoint=None):
+    """
+    Launch the shared browser (only if needed), run every source, print stats.
+
+    checkpoint: RunCheckpoint to record (or resume) the run in; with None, a
+    new run is started when $CHECKPOINT_DIR is set.
+    """
+    out = out or sys.stdout
+    headless = os.getenv("HEADLESS", "true").lower() == "true"
+    if checkpoint is None and os.getenv("CHECKPOINT_DIR"):
+        checkpoint = checkpoints.RunCheckpoint.create(sources, os.getenv("CHECKPOINT_DIR"))
+    done, replayed, scraped = [], [], list(sources)
+    if checkpoint is not None:
+        print(f"[ingest] run {checkpoint.run_id}", file=sys.stderr)
+        done = [s for s in sources if checkpoint.completed("normalized", s)]
+        replayed = [s for s in sources if s not in done and checkpoint.completed("raw", s)]
+        scraped = [s for s in sources if s not in done and s not in replayed]
+
+    async with async_playwright() as p:
+        browser = None
+        producers = {s: replay_producer(checkpoint, s) for s in replayed}
+        if {"cal", "laco"} & set(scraped):
+            print("[ingest] Launching shared Chromium", file=sys.stderr)
+            with metrics.span("browser_launch", source="shared"):
+                browser = await p.chromium.launch(headless=headless)
+            producers.update(browser_producers(browser, scraped))
+        if "sam" in scraped:
+            producers["sam"] = sam_producer
+
+        stats = replay_normalized(checkpoint, done, out)
+        carried = replay_normalized(checkpoint, replayed, out, partial=True)
+        try:
+            stats.update(await run(producers, out, index=get_checksum_index(),
+                                   near_duplicates=get_near_duplicate_index(), checkpoint=checkpoint))
+        finally:
+            if browser is not None:
+                await browser.close()
+        for source, entry in carried.items():
+            stats[source]["rows_out"] += entry["rows_out"]
+            stats[source]["resumed"] = "raw"
+
+    for source, entry in stats.items():
+        metrics.observe("scrape", entry["seconds"] or 0.0, source=source)
+    metrics.flush("ingest")
+    print(f"[ingest] {json.dumps(stats)}", file=sys.stderr)
+    return stats
+
+
+def _main_cli() -> None:
+    if len(sys.argv) >= 2 and sys.argv[1] == "--resume":
+        root = os.getenv("CHECKPOINT_DIR")
+        if not root:
+            print("--resume needs CHECKPOINT_DIR", file=sys.stderr)
+            sys.exit(2)
+        checkpoint = (checkpoints.RunCheckpoint(sys.argv[2], root) if len(sys.argv) >= 3
+                      else checkpoints.latest(root))
+        if checkpoint is None or not checkpoint.exists:
+            print(f"no run to resume in {root}", file=sys.stderr)
+            sys.exit(1)
+        asyncio.run(ingest(checkpoint.sources, checkpoint=checkpoint))
+        return
+
+    sources = ALL_SOURCES
+    if len(sys.argv) >= 2:
+        sources = tuple(s.strip().lower() for s in sys.argv[1].split(",") if s.strip())
+        unknown = set(sources) - set(ALL_SOURCES)
+        if unknown:
+            print(f"Uso: python -m scrapers.ingest [cal,laco,sam] | --resume [run_id] (unknown: {sorted(unknown)})",
+                  file=sys.stderr)
+            sys.exit(2)
+    asyncio.run(ingest(sources))
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,142 @@
+"""
+Network-level helpers shared by the Playwright scrapers.
+
+Both portals render their tables on the client from JSON responses. Instead of
+reading text back out of the DOM, the scrapers can capture those responses
+(page.on("response")) and map the records directly, falling back to DOM
+extraction when nothing usable was captured. Heavy resources (images, fonts,
+stylesheets) are blocked, since the data does not depend on them.
+"""
+import asyncio
+import json
+import sys
+
+# Resource types that never carry table data
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "stylesheet", "media"})
+
+# Share of records that must carry every required field for a list to qualify
+_MIN_VALID_RATIO = 0.8
+
+
+def should_block(resource_type):
+    """True for requests the scrapers can abort without losing data."""
+    return resource_type in BLOCKED_RESOURCE_TYPES
+
+
+async def block_heavy_resources(target):
+    """Abort image/font/stylesheet/media requests on a page or browser context."""
+    async def _route(route):
+        if should_block(route.request.resource_type):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await target.route("**/*", _route)
+
+
+def _normalize_key(key):
+    return str(key).replace("_", "").replace("-", "").lower()
+
+
+def _decode_nested(value):
+    """ASP.NET-style endpoints wrap JSON in a string ({"d": "[...]"}); unwrap it."""
+    if isinstance(value, str) and value[:1] in ("[", "{"):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def iter_record_lists(payload):
+    """Yield every list of dicts found anywhere inside a JSON payload."""
+    stack = [_decode_nested(payload)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            if node and all(isinstance(x, dict) for x in node):
+                yield node
+            stack.extend(_decode_nested(x) for x in node if isinstance(x, (list, dict, str)))
+        elif isinstance(node, dict):
+            stack.extend(_decode_nested(v) for v in node.values() if isinstance(v, (list, dict, str)))
+
+
+def map_record(record, field_map):
+    """
+    Map one source record onto scraper fields.
+
+    field_map: {scraper_field: (candidate source keys...)}; keys are matched
+    ignoring case, '_' and '-'. Values are returned as stripped strings (the
+    same shape the DOM path produces) or None when no candidate is present.
+    """
+    lookup = {_normalize_key(k): v for k, v in record.items()}
+    out = {}
+    for field, candidates in field_map.items():
+        value = None
+        for key in candidates:
+            value = lookup.get(_normalize_key(key))
+            if value not in (None, ""):
+                break
+        out[field] = str(value).strip() if value not in (None, "") else None
+    return out
+
+
+def best_records(payloads, field_map, required):
+    """
+    Pick the captured list that best matches 'field_map' and return it mapped.
+
+    A list qualifies when at least 80% of its records carry every 'required'
+    field; among qualifying lists the longest wins. Returns [] when none does,
+    which tells the caller to fall back to DOM extraction.
+    """
+    best = []
+    for payload in payloads:
+        for records in iter_record_lists(payload):
+            if len(records) <= len(best):
+                continue
+            mapped = [map_record(r, field_map) for r in records]
+            valid = [m for m in mapped if all(m.get(f) for f in required)]
+            if len(valid) >= _MIN_VALID_RATIO * len(mapped):
+                best = valid
+    return best
+
+
+class ResponseCapture:
+    """
+    Collect JSON bodies of XHR/fetch responses seen by a page.
+
+    Attach before page.goto() so the initial data load is not missed; call
+    records() once the page has settled.
+    """
+
+    def __init__(self, page, url_hint=None):
+        self.url_hint = url_hint.lower() if url_hint else None
+        self.payloads = []
+        self._pending = []
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return
+        if self.url_hint and self.url_hint not in response.url.lower():
+            return
+        self._pending.append(asyncio.ensure_future(self._read(response)))
+
+    async def _read(self, response):
+        try:
+            if "json" in (response.headers.get("content-type") or ""):
+                self.payloads.append(await response.json())
+            else:
+                # Some endpoints send JSON as text/plain or text/html
+                self.payloads.append(json.loads(await response.text()))
+        except Exception:  # body gone, not JSON, navigation raced, ...
+            pass
+
+    async def records(self, field_map, required):
+        """Wait for in-flight bodies, then return the best mapped record list."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        rows = best_records(self.payloads, field_map, required)
+        print(f"[LOGS] Captured {len(self.payloads)} JSON responses, {len(rows)} records",
+              file=sys.stderr)
+        return rows
@@ -1,5 +1,4 @@
 import asyncio
-import re
 import sys
 import json
 import os
@@ -7,22 +6,86 @@ import os
 
 from playwright.async_api import async_playwright
 
-# Path to optionally save results
-OUTPUT_FILE = "./laco_latest.json"
+try:  # imported as part of the 'scrapers' package
+    from scrapers import checkpoints, detail_crawler, metrics, watermark
+    from scrapers.interception import ResponseCapture, block_heavy_resources
+except ImportError:  # executed as /app/lacobids_scraper.py inside the scraper container
+    import checkpoints
+    import detail_crawler
+    import metrics
+    import watermark
+    from interception import ResponseCapture, block_heavy_resources
+
+# Portal origin; override (e.g. LACO_BASE_URL=http://127.0.0.1:8800) to run the
+# scraper against the offline replay server in benchmarks/replay.py
+BASE_URL = os.getenv("LACO_BASE_URL", "https://camisvr.co.la.ca.us").rstrip("/")
+
+# Bid page opened by the table's selectBid('<bid_id>') handler
+DETAIL_PATH = os.getenv("LACO_DETAIL_PATH", "/LACoBids/BidLookUp/BidDetail?bidId={bid_id}")
+
+# Source keys tried, in order, when mapping captured JSON bid records
+LACO_FIELDS = {
+    "solicitation_number": ("BidNumber", "SolicitationNumber", "SolicitationNo"),
+    "bid_id": ("BidId", "BidID", "Id"),
+    "title": ("BidTitle", "Title"),
+    "commodity": ("CommodityDescription", "CommDesc", "Commodity"),
+    "type": ("BidType", "SolicitationType", "Type"),
+    "department": ("DepartmentName", "Department", "DeptName"),
+    "close_date": ("CloseDate", "BidCloseDate", "ClosingDate"),
+}
+
+# Pulls every rendered row of the bids table in one browser round trip.
+# Mirrors the per-cell locator logic: selectBid('<id>') in the first column's
+# link, title/commodity labels in the second column, then type/department/date.
+EXTRACT_ROWS_JS = r"""
+() => Array.from(document.querySelectorAll("#searchTbl1 > tr")).map((tr) => {
+  const cells = tr.querySelectorAll("td");
+  const text = (el) => (el ? el.innerText.trim() : null);
+  const link = cells[0] ? cells[0].querySelector("a[data-content='Select solicitation']") : null;
+  const match = ((link && link.getAttribute("href")) || "").match(/selectBid\('(\d+)'\)/);
+  const titleEl = cells[1] ? cells[1].querySelector("label[name='BidTitleEllipsis']") : null;
+  const commEl = cells[1] ? cells[1].querySelector("label[name='CommDescEllipsis']") : null;
+  return {
+    solicitation_number: text(link),
+    bid_id: match ? match[1] : null,
+    title: text(titleEl),
+    commodity: (text(commEl) || "").replace("Commodity:", "").trim(),
+    type: text(cells[2]) || "",
+    department: text(cells[3]) || "",
+    close_date: text(cells[4]) || "",
+  };
+})
+"""
+
+
+def detail_url(row):
+    """Detail page of a bid row (None without a bid_id)."""
+    return f"{BASE_URL}{DETAIL_PATH.format(bid_id=row['bid_id'])}" if row.get("bid_id") else None
+
+
+async def extract_rows(page):
+    """
+    Extract every row of '#searchTbl1' with a single page.evaluate call.
 
+    Returns a list of dicts with the same keys the per-row locator loop produced
+    (solicitation_number, bid_id, title, commodity, type, department, close_date).
+    """
+    return await page.evaluate(EXTRACT_ROWS_JS)
 
-async def main():
-    qtd = int(os.getenv("SCRAPE_LACO_QTY", "20"))        # <-- from env
-    headless = os.getenv("HEADLESS", "true").lower() == "true"
+
+async def scrape(browser, qtd=None, mode=None):
     """
-    Scraper for Los Angeles County (LACo) Bids portal.
+    Scrape the Los Angeles County (LACo) Bids portal with an already running browser.
 
     Flow:
-      1. Launch Playwright Chromium in headless mode.
-      2. Navigate to the LACoBids open solicitations page.
-      3. Configure table to show up to 100 rows per page.
-      4. Wait for the Angular-powered table to render.
-      5. For each of the first N rows, extract fields:
+      1. Open a new page on the given (possibly shared) Chromium instance.
+      2. Navigate to the LACoBids open solicitations page. In SCRAPE_MODE=xhr
+         (default) images/fonts/stylesheets are blocked and the JSON the Angular
+         table is built from is captured and mapped directly; steps 3-5 only run
+         when that capture yields no usable records.
+      3. Configure table to show up to 100 rows per page (once).
+      4. Wait for the Angular-powered table to render (once).
+      5. Pull every row's fields in one in-page evaluation, then keep the first N:
          - solicitation_number (displayed ID)
          - bid_id (parsed from JS onclick)
          - title
@@ -30,28 +93,49 @@ async def main():
          - type (solicitation type)
          - department (issuing agency)
          - close_date (submission deadline)
-      6. Store results in a normalized JSON list and print to stdout.
+         With SCRAPE_INCREMENTAL=1 the list is cut where a run of already-seen
+         bids starts (watermark), so only new or changed bids are processed.
+      6. With SCRAPE_DETAILS=1, fill posted_date/estimated_value/naics_code
+         from the bid pages (detail_crawler; cached by bid id + close date).
+
+    Returns:
+      list of raw bid dicts (input of formatter.format_opportunities_laco).
     """
+    qtd = qtd if qtd is not None else int(os.getenv("SCRAPE_LACO_QTY", "20"))
+    mode = (mode or os.getenv("SCRAPE_MODE", "xhr")).lower()     # xhr | dom
 
-    async with async_playwright() as p:
+    print("[LOGS] Opening a new page", file=sys.stderr)
+    page = await browser.new_page()
 
-        print("[LOGS] Launching Chromium", file=sys.stderr)
-        browser = await p.chromium.launch(headless=headless)
+    capture = None
+    if mode == "xhr":
+        await block_heavy_resources(page)
+        capture = ResponseCapture(page)
 
-        print("[LOGS] Opening a new page", file=sys.stderr)
-        page = await browser.new_page()
-
-        # Target: LA County Open Bids page
-        link = "https://camisvr.co.la.ca.us/LACoBids/BidLookUp/OpenBidList"
-        print(f"[LOGS] Navigating to: {link}", file=sys.stderr)
+    # Target: LA County Open Bids page
+    link = f"{BASE_URL}/LACoBids/BidLookUp/OpenBidList"
+    print(f"[LOGS] Navigating to: {link}", file=sys.stderr)
+    with metrics.span("goto", source="laco"):
         await page.goto(link, timeout=60000)
 
-        opportunities = []
-
-        for c in range(qtd):
-            # Always force table to display 100 rows for consistency
+    rows = []
+    if capture is not None:
+        # Let the table's data requests finish, then map their JSON
+        with metrics.span("table_wait", source="laco", mode="xhr"):
+            try:
+                await page.wait_for_load_state("networkidle", timeout=15000)
+            except Exception:
+                metrics.count("errors", source="laco", stage="networkidle")
+                print("[LOGS] Network did not settle; using responses seen so far", file=sys.stderr)
+        with metrics.span("extraction", source="laco", mode="xhr"):
+            rows = await capture.records(LACO_FIELDS, required=("bid_id", "title"))
+
+    if not rows:
+        print("[LOGS] Falling back to DOM extraction", file=sys.stderr)
+
+        with metrics.span("table_wait", source="laco", mode="dom"):
+            # Force table to display 100 rows, once per page load
             await page.select_option("select[ng-model='main.PageSizeSelect']", "100")
-
             print("[LOGS] Page loaded successfully", file=sys.stderr)
 
             # Wait for Angular to fully render the rows
@@ -59,58 +143,66 @@ async def main():
             await page.wait_for_selector("#searchTbl1 tr")
             print("[LOGS] Table found", file=sys.stderr)
 
-            # Grab all rows
-            linhas = page.locator("#searchTbl1 > tr")
-            total = await linhas.count()
-
-            print(f"[LOGS] Found {total} rows (processing {qtd})", file=sys.stderr)
-            print(f"[LOGS] Processing row {c+1}/{qtd}", file=sys.stderr)
-
-            linha = linhas.nth(c)
-            colunas = linha.locator("td")
+        # --- Field extraction: all rows in one round trip ------------------------
+        with metrics.span("extraction", source="laco", mode="dom"):
+            rows = await extract_rows(page)
 
-            # --- Field extraction -----------------------------------------------------
+    print(f"[LOGS] Found {len(rows)} rows (processing {qtd})", file=sys.stderr)
 
-            # 1) Solicitation number + bid_id (parsed from onclick link)
-            link_detalhes = colunas.nth(0).locator("a[data-content='Select solicitation']")
-            href_value = await link_detalhes.get_attribute("href")
-            m = re.search(r"selectBid\('(\d+)'\)", href_value or "")
-            bid_id = m.group(1) if m else None
-            solicitation_number = (await link_detalhes.inner_text()).strip()
+    seen = watermark.session("laco", key="bid_id", sort_key="close_date")
+    seen.feed(rows)
+    opportunities = seen.rows()[:qtd]
+    if seen.reached:
+        print(f"[watermark] laco: {len(seen.rows())} new or changed bids before known ones", file=sys.stderr)
+    metrics.count("rows_in", len(rows), source="laco")
+    metrics.count("rows_out", len(opportunities), source="laco")
+    for opportunity in opportunities:
+        print(f"[LOGS] → {opportunity['solicitation_number']} | {opportunity['title']} | "
+              f"{opportunity['commodity']} | {opportunity['type']} | "
+              f"{opportunity['department']} | {opportunity['close_date']}", file=sys.stderr)
 
-            # 2) Title
-            title_el = colunas.nth(1).locator("label[name='BidTitleEllipsis']")
-            title = (await title_el.inner_text()).strip() if await title_el.count() else None
+    await page.close()
+    opportunities = await detail_crawler.maybe_enrich(browser, opportunities, "laco", key="bid_id",
+                                                      status="close_date", url=detail_url)
+    seen.stage(opportunities)
+    return opportunities
 
-            # 3) Commodity description
-            comm_el = colunas.nth(1).locator("label[name='CommDescEllipsis']")
-            commodity_raw = (await comm_el.inner_text()).strip() if await comm_el.count() else ""
-            commodity = commodity_raw.replace("Commodity:", "").strip()
 
-            # 4) Type (e.g., IFB, RFP)
-            type_text = (await colunas.nth(2).inner_text()).strip()
-
-            # 5) Department (issuing entity)
-            department = (await colunas.nth(3).inner_text()).strip()
+async def main():
+    headless = os.getenv("HEADLESS", "true").lower() == "true"
+    """
+    Standalone entry point: launch Chromium, run scrape(), print the rows as JSON
+    to stdout (the contract expected by the n8n `lacobids1` node).
 
-            # 6) Close date (deadline)
-            close_date = (await colunas.nth(4).inner_text()).strip()
+    With RUN_ID and CHECKPOINT_DIR set (n8n passes the id of the current run),
+    the rows are checkpointed as the run's raw 'laco' stage, and a resumed
+    run prints that checkpoint instead of scraping again.
+    """
 
-            print(f"[LOGS] → {solicitation_number} | {title} | {commodity} | {type_text} | {department} | {close_date}", file=sys.stderr)
-            print(f"[LOGS] Extracted bid_id: {bid_id}", file=sys.stderr)
+    run = checkpoints.from_env()
+    if run is not None and run.completed("raw", "laco"):
+        print(f"[checkpoint] laco: raw rows of run {run.run_id}", file=sys.stderr)
+        print(json.dumps(list(run.rows("raw", "laco"))))
+        return
 
-            # --- Build normalized record ----------------------------------------------
+    async with async_playwright() as p:
 
-            opportunity = {
-                "solicitation_number": solicitation_number,
-                "bid_id": bid_id,
-                "title": title,
-                "commodity": commodity,
-                "type": type_text,
-                "department": department,
-                "close_date": close_date,
-            }
-            opportunities.append(opportunity)
+        print("[LOGS] Launching Chromium", file=sys.stderr)
+        with metrics.span("browser_launch", source="laco"):
+            browser = await p.chromium.launch(headless=headless)
+
+        try:
+            with metrics.span("scrape", source="laco"):
+                opportunities = await scrape(browser)
+        except Exception:
+            metrics.count("errors", source="laco", stage="scrape")
+            raise
+        finally:
+            metrics.flush("laco")
+
+        if run is not None:
+            run.append("raw", "laco", opportunities)
+            run.complete("raw", "laco")
 
         # Output the list as JSON (stdout contract for downstream pipeline)
         print(json.dumps(opportunities))
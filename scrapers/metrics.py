@@ -0,0 +1,193 @@
+"""
+Lightweight run metrics for the scrapers and the formatter.
+
+  - span(name, **labels):    context manager timing a stage (browser launch,
+                             page.goto, table wait, extraction, normalization);
+                             each (name, labels) keeps count, total and max seconds.
+  - count(name, n, **labels): counters such as rows_in, rows_out, duplicates
+                             and errors.
+  - flush(job):              writes the registry to $METRICS_DIR as
+                             <job>.prom (Prometheus text format, e.g. for the
+                             node-exporter textfile collector) and <job>.json,
+                             and appends what was recorded since the previous
+                             flush to <job>.history.jsonl, so slowdowns show
+                             up run over run. It does nothing when
+                             METRICS_DIR is unset.
+
+Every process (one per `docker exec` scraper run, one long-lived formatter)
+owns the module-level registry; spans work the same around awaits. The
+formatter flushes once per workflow run (after POST /airtable/write, or at
+the next POST /runs/start when a run never got there), so its history holds
+one line per run rather than one per request.
+
+Usage:
+  python -m scrapers.metrics [metrics_dir]     (summary of the last run of every job)
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PREFIX = "gov_"
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Registry:
+    """Thread-safe store of span timings and counters."""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._spans = {}      # (name, labels) -> [count, total, max]
+        self._counters = {}   # (name, labels) -> value
+        self._run_spans = {}     # same, since the last history line
+        self._run_counters = {}
+
+    def observe(self, name, seconds, **labels):
+        """Record one timing of 'name'."""
+        key = _key(name, labels)
+        with self._lock:
+            for spans in (self._spans, self._run_spans):
+                entry = spans.setdefault(key, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block, recorded even when it raises."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - started, **labels)
+
+    def count(self, name, value=1, **labels):
+        """Add 'value' to counter 'name'."""
+        key = _key(name, labels)
+        with self._lock:
+            for counters in (self._counters, self._run_counters):
+                counters[key] = counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            for table in (self._spans, self._counters, self._run_spans, self._run_counters):
+                table.clear()
+
+    def snapshot(self, job, run=False):
+        """JSON-ready view of the registry; with run=True, of what was recorded since the last history line."""
+        with self._lock:
+            spans = [
+                {"span": name, "labels": dict(labels), "count": count, "seconds": round(total, 6),
+                 "max": round(peak, 6)}
+                for (name, labels), (count, total, peak) in sorted(
+                    (self._run_spans if run else self._spans).items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted((self._run_counters if run else self._counters).items())
+            ]
+        return {"job": job, "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "spans": spans, "counters": counters}
+
+    def to_prometheus(self, job):
+        """Prometheus text exposition of the registry."""
+        snap = self.snapshot(job)
+        lines = []
+        if snap["spans"]:
+            lines.append(f"# TYPE {PREFIX}span_seconds summary")
+            for s in snap["spans"]:
+                labels = _prom_labels(sorted({"job": job, "span": s["span"], **s["labels"]}.items()))
+                lines.append(f"{PREFIX}span_seconds_sum{labels} {s['seconds']}")
+                lines.append(f"{PREFIX}span_seconds_count{labels} {s['count']}")
+            lines.append(f"# TYPE {PREFIX}span_seconds_max gauge")
+            for s in snap["spans"]:
+                labels = _prom_labels(sorted({"job": job, "span": s["span"], **s["labels"]}.items()))
+                lines.append(f"{PREFIX}span_seconds_max{labels} {s['max']}")
+        for name in sorted({c["name"] for c in snap["counters"]}):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            for c in snap["counters"]:
+                if c["name"] == name:
+                    labels = _prom_labels(sorted({"job": job, **c["labels"]}.items()))
+                    lines.append(f"{PREFIX}{name}_total{labels} {c['value']}")
+        lines.append(f"# TYPE {PREFIX}last_run_timestamp_seconds gauge")
+        lines.append(f"{PREFIX}last_run_timestamp_seconds{_prom_labels([('job', job)])} {int(time.time())}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, job, directory=None):
+        """
+        Write <job>.prom and <job>.json (totals of the process) and append
+        what was recorded since the previous flush to <job>.history.jsonl.
+
+        'directory' defaults to $METRICS_DIR; returns the .json path, or None
+        when no directory is configured.
+        """
+        directory = directory if directory is not None else os.getenv("METRICS_DIR", "")
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        snap = self.snapshot(job)
+        base = os.path.join(directory, job)
+        _atomic_write(f"{base}.prom", self.to_prometheus(job))
+        _atomic_write(f"{base}.json", json.dumps(snap, indent=2) + "\n")
+        delta = self.snapshot(job, run=True)
+        if delta["spans"] or delta["counters"]:
+            with self._lock, open(f"{base}.history.jsonl", "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(delta) + "\n")
+                self._run_spans.clear()
+                self._run_counters.clear()
+        return f"{base}.json"
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+# Process-wide registry and shortcuts
+METRICS = Registry()
+span = METRICS.span
+count = METRICS.count
+observe = METRICS.observe
+flush = METRICS.flush
+
+
+def _main_cli() -> None:
+    directory = sys.argv[1] if len(sys.argv) >= 2 else os.getenv("METRICS_DIR", "/data/metrics")
+    if not os.path.isdir(directory):
+        print(f"Uso: python -m scrapers.metrics [metrics_dir]  ({directory} not found)", file=sys.stderr)
+        sys.exit(2)
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as fh:
+            snap = json.load(fh)
+        print(f"{snap['job']} @ {snap['timestamp']}")
+        for s in sorted(snap["spans"], key=lambda s: -s["seconds"]):
+            labels = ",".join(f"{k}={v}" for k, v in s["labels"].items())
+            print(f"  {s['span']:<16} {labels:<24} {s['seconds']:>10.3f}s  x{s['count']}  max {s['max']:.3f}s")
+        for c in snap["counters"]:
+            labels = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+            print(f"  {c['name']:<16} {labels:<24} {c['value']:>10}")
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,327 @@
+"""
+Cross-source near-duplicate detection for normalized opportunities.
+
+The same contract is often posted on SAM.gov, Cal eProcure and LACo under
+different ids. The checksum covers id|title, so every copy used to get its
+own Airtable row, Slack alert and LLM call. This stage runs after the
+format_opportunities_* mappers:
+
+  - each row is reduced to a set of shingles: title words and word pairs,
+    agency words ('a:') and the solicitation number with punctuation removed
+    ('s:'). Generic procurement words (bid, rfp, services, ...) are dropped;
+  - a MinHash signature (NEAR_DUP_PERMUTATIONS seeded hash permutations,
+    computed with NumPy) estimates the Jaccard similarity of two rows;
+  - LSH splits the signature into bands. Only rows sharing a band bucket
+    are compared, so the cost grows with the number of rows and not with
+    the number of pairs;
+  - only rows of another source are candidates: two rows of the same portal
+    are different notices, however alike their titles;
+  - a candidate is a duplicate when its estimated similarity reaches
+    NEAR_DUP_THRESHOLD, the two deadlines (when both are ISO dates) are the
+    same day and the two solicitation numbers (when both are set) match.
+
+Signatures, buckets, the source and the canonical checksum of every row live
+in a SQLite file (NEAR_DUP_INDEX), so a SAM.gov copy is still caught when the
+Cal eProcure original came in an earlier batch or run. The first row seen is
+the canonical one, and later copies point at it.
+
+The formatter only stages the rows it tags (stage=True): staged rows are
+candidates for the other sources of the same run, and become permanent when
+POST /airtable/write commits their checksums. Staged rows not committed
+within NEAR_DUP_STAGE_HOURS (a run that failed before the write) are
+forgotten, so a copy is never dropped in favour of a row Airtable never got.
+
+Usage:
+  python -m scrapers.near_duplicates scan <rows.json|rows.jsonl|-> [db_path]   (dry run, no writes)
+  python -m scrapers.near_duplicates stats [db_path]
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.sqlite_store import SqliteStore
+except ImportError:  # executed from /app inside the scraper container
+    from sqlite_store import SqliteStore
+
+DEFAULT_PATH = os.getenv("NEAR_DUP_INDEX", "/data/near_duplicates.sqlite")
+THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", "64"))
+STAGE_HOURS = float(os.getenv("NEAR_DUP_STAGE_HOURS", "24"))
+BANDS = 16
+
+_PRIME = np.uint64((1 << 31) - 1)
+_SEED = 20250821  # fixed, so signatures stay comparable across runs
+_MAX_PARAMS = 900
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words every notice title carries, which would make unrelated rows look alike
+STOPWORDS = frozenset(
+    "a an and as at by for from in of on or the to with bid bids rfp rfq rfi ifb itb solicitation "
+    "services service request proposal proposals quote quotes notice county state department dept".split()
+)
+
+
+def shingles(row):
+    """Set of title/agency/solicitation shingles of a normalized row."""
+    words = [w for w in _WORD.findall(str(row.get("title") or "").lower()) if w not in STOPWORDS]
+    out = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    out.update(f"a:{w}" for w in _WORD.findall(str(row.get("agency") or "").lower()) if w not in STOPWORDS)
+    number = _number(row)
+    if number:
+        out.add(f"s:{number}")
+    return out
+
+
+def _number(row):
+    """Solicitation number without punctuation or case, or ''."""
+    return "".join(_WORD.findall(str(row.get("solicitation_number") or "").lower()))
+
+
+def _permutations(num_perm):
+    rng = np.random.default_rng(_SEED)
+    a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _deadline(row):
+    value = str(row.get("deadline") or "")
+    return value[:10] if _ISO_DATE.match(value) else None
+
+
+def _utc_stamp(now=None):
+    return (now or datetime.utcnow()).replace(microsecond=0).isoformat() + "Z"
+
+
+class NearDuplicateIndex(SqliteStore):
+    """
+    Persistent MinHash/LSH index of normalized rows, keyed by checksum.
+
+    stats counts rows tagged, duplicates found and candidate pairs compared.
+    Rows with 'staged_at' set wait for commit().
+    """
+
+    def __init__(self, path=DEFAULT_PATH, threshold=THRESHOLD, num_perm=PERMUTATIONS, bands=BANDS,
+                 stage_hours=STAGE_HOURS):
+        if num_perm % bands:
+            raise ValueError(f"{num_perm} permutations do not split into {bands} bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.stage_hours = stage_hours
+        self._a, self._b = _permutations(num_perm)
+        self.stats = {"rows": 0, "duplicates": 0, "compared": 0}
+        super().__init__(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " checksum TEXT PRIMARY KEY,"
+            " canonical TEXT NOT NULL,"
+            " similarity REAL,"
+            " deadline TEXT,"
+            " signature BLOB NOT NULL,"
+            " first_seen TEXT NOT NULL,"
+            " source TEXT,"
+            " number TEXT,"
+            " staged_at TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+        for column in ("source", "number", "staged_at"):  # files written before these columns
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE signatures ADD COLUMN {column} TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " bucket TEXT NOT NULL,"
+            " checksum TEXT NOT NULL,"
+            " PRIMARY KEY (bucket, checksum))"
+        )
+        layout = f"{num_perm}x{bands}"
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+        self._conn.commit()
+        stored = self._conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()[0]
+        if stored != layout:
+            self._conn.close()
+            raise ValueError(f"{path} holds {stored} signatures, not {layout}; delete it to rebuild")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def duplicate_count(self):
+        """Indexed rows that point at another canonical row."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures WHERE canonical != checksum").fetchone()[0]
+
+    def signature(self, row):
+        """MinHash signature (uint32 array) of a row, or None when it has no shingles."""
+        items = shingles(row)
+        if not items:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in items),
+            dtype=np.uint64, count=len(items)) % _PRIME
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _buckets(self, sig):
+        rows = self.num_perm // self.bands
+        return [f"{band}:{hashlib.blake2b(sig[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()}"
+                for band in range(self.bands)]
+
+    def _select(self, sql, values):
+        values = list(values)
+        found = []
+        with self._lock:
+            for i in range(0, len(values), _MAX_PARAMS):
+                chunk = values[i:i + _MAX_PARAMS]
+                found.extend(self._conn.execute(sql.format(marks=",".join("?" * len(chunk))), chunk))
+        return found
+
+    def _expire(self):
+        """Forget staged rows older than 'stage_hours'."""
+        cutoff = _utc_stamp(datetime.utcnow() - timedelta(hours=self.stage_hours))
+        with self._lock:
+            stale = [c for c, in self._conn.execute(
+                "SELECT checksum FROM signatures WHERE staged_at IS NOT NULL AND staged_at < ?", (cutoff,))]
+            self._conn.executemany("DELETE FROM signatures WHERE checksum = ?", ((c,) for c in stale))
+            self._conn.executemany("DELETE FROM buckets WHERE checksum = ?", ((c,) for c in stale))
+            self._conn.commit()
+
+    def commit(self, checksums):
+        """
+        Make staged rows permanent once they were written, together with the
+        copies that point at them. Returns how many rows were committed.
+        """
+        checksums = list(dict.fromkeys(c for c in checksums if c))
+        committed = 0
+        with self._lock:
+            for i in range(0, len(checksums), _MAX_PARAMS):
+                chunk = checksums[i:i + _MAX_PARAMS]
+                marks = ",".join("?" * len(chunk))
+                committed += self._conn.execute(
+                    f"UPDATE signatures SET staged_at = NULL WHERE staged_at IS NOT NULL"
+                    f" AND (checksum IN ({marks}) OR canonical IN ({marks}))", chunk + chunk).rowcount
+            self._conn.commit()
+        return committed
+
+    def tag(self, rows, source=None, record=True, stage=False):
+        """
+        Split 'rows' of 'source' into canonical rows and near-duplicates.
+
+        Returns (rows, duplicates): the rows to keep, in input order, and
+        [{"checksum", "opportunity_id", "canonical", "similarity"}, ...] for
+        the dropped ones. Rows without a checksum or shingles are kept as-is.
+        Rows of the same source are never candidates (a source of None is
+        compared with every row). With record=True the batch is added to the
+        index; with stage=True it is added as staged, until commit().
+        """
+        if stage:
+            self._expire()
+        rows = list(rows)
+        sigs = [self.signature(row) if row.get("checksum") else None for row in rows]
+        buckets = [self._buckets(sig) if sig is not None else [] for sig in sigs]
+
+        members = {}
+        for bucket, checksum in self._select(
+                "SELECT bucket, checksum FROM buckets WHERE bucket IN ({marks})",
+                {b for keys in buckets for b in keys}):
+            members.setdefault(bucket, []).append(checksum)
+        wanted = {c for group in members.values() for c in group}
+        wanted.update(row["checksum"] for row, sig in zip(rows, sigs) if sig is not None)
+        known = {
+            checksum: (np.frombuffer(blob, dtype=np.uint32), canonical, similarity, deadline, origin, number)
+            for checksum, canonical, similarity, deadline, blob, origin, number in self._select(
+                "SELECT checksum, canonical, similarity, deadline, signature, source, number FROM signatures"
+                " WHERE checksum IN ({marks})", wanted)
+        }
+
+        kept, duplicates, new = [], [], []
+        for row, sig, keys in zip(rows, sigs, buckets):
+            if sig is None:
+                kept.append(row)
+                continue
+            checksum, deadline, number = row["checksum"], _deadline(row), _number(row)
+            if checksum in known:  # seen before (re-sent or changed row): same verdict
+                _, canonical, similarity, *_ = known[checksum]
+            else:
+                canonical, similarity = checksum, None
+                candidates = {c for key in keys for c in members.get(key, ()) if c != checksum}
+                self.stats["compared"] += len(candidates)
+                for other in sorted(candidates):
+                    other_sig, other_canonical, _, other_deadline, other_source, other_number = known[other]
+                    if source and other_source == source:
+                        continue
+                    if deadline and other_deadline and deadline != other_deadline:
+                        continue
+                    if number and other_number and number != other_number:
+                        continue
+                    estimate = float(np.mean(sig == other_sig))
+                    if estimate >= self.threshold and (similarity is None or estimate > similarity):
+                        canonical, similarity = other_canonical, round(estimate, 3)
+                known[checksum] = (sig, canonical, similarity, deadline, source, number)
+                for key in keys:
+                    members.setdefault(key, []).append(checksum)
+                new.append((checksum, canonical, similarity, deadline, sig.tobytes(), number, keys))
+            self.stats["rows"] += 1
+            if canonical == checksum:
+                kept.append(row)
+            else:
+                self.stats["duplicates"] += 1
+                duplicates.append({"checksum": checksum, "opportunity_id": row.get("opportunity_id"),
+                                   "canonical": canonical, "similarity": similarity})
+
+        if (record or stage) and new:
+            now = _utc_stamp()
+            staged_at = now if stage else None
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO signatures (checksum, canonical, similarity, deadline, signature,"
+                    " first_seen, source, number, staged_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((c, canonical, sim, d, blob, now, source, number or None, staged_at)
+                     for c, canonical, sim, d, blob, number, _ in new))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO buckets (bucket, checksum) VALUES (?, ?)",
+                    ((key, c) for c, *_, keys in new for key in keys))
+                self._conn.commit()
+        return kept, duplicates
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("scan", "stats") or (sys.argv[1] == "scan" and len(sys.argv) < 3):
+        print("Uso: python -m scrapers.near_duplicates <scan <rows.json|rows.jsonl|-> | stats> [db_path]",
+              file=sys.stderr)
+        sys.exit(2)
+
+    if sys.argv[1] == "stats":
+        db_path = sys.argv[2] if len(sys.argv) >= 3 else DEFAULT_PATH
+        with NearDuplicateIndex(db_path) as index:
+            print(json.dumps({"path": db_path, "rows": len(index), "duplicates": index.duplicate_count()}))
+        return
+
+    try:
+        from scrapers.formatter import iter_json_rows
+    except ImportError:
+        from formatter import iter_json_rows
+    path = sys.argv[2]
+    db_path = sys.argv[3] if len(sys.argv) >= 4 else DEFAULT_PATH
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        rows = list(iter_json_rows(stream))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    with NearDuplicateIndex(db_path) as index:
+        _, duplicates = index.tag(rows, record=False)
+    for duplicate in duplicates:
+        sys.stdout.write(json.dumps(duplicate, ensure_ascii=False) + "\n")
+    print(f"[near-dup] {json.dumps(index.stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main_cli()
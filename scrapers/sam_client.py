@@ -0,0 +1,213 @@
+"""
+SAM.gov Get Opportunities API client.
+
+A single request returns one page (the n8n workflow used to ask for limit=20
+of a 3-day `postedFrom` window), so anything past the first page is silently
+missed. This client walks every offset instead:
+
+  - the window is split into one query per posting day; a day's pages become
+    immutable cache entries once they were fetched after that day ended (UTC),
+    so re-runs only hit the API for days that could still gain notices;
+  - pages are cached on disk (SAM_CACHE_DIR) with their ETag/Last-Modified and
+    fetch time, and revalidated with conditional requests (304 = reuse the
+    cached body);
+  - remaining offsets are fetched with bounded concurrency (SAM_CONCURRENCY)
+    through a shared token bucket (SAM_RATE_PER_SEC) with retry/backoff;
+  - notices can be handed straight to formatter.iter_opportunities_sam.
+
+Usage:
+  python -m scrapers.sam_client [days]           (normalized JSONL on stdout)
+  python -u /app/sam_client.py [days] --raw      (raw notices as one JSON array,
+                                                  the n8n `sam gov1` node contract)
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.formatter import iter_opportunities_sam
+    from scrapers.http_utils import HttpClient, TokenBucket
+except ImportError:  # executed as /app/sam_client.py inside the scraper container
+    from formatter import iter_opportunities_sam
+    from http_utils import HttpClient, TokenBucket
+
+SAM_URL = os.getenv("SAM_API_URL", "https://api.sam.gov/prod/opportunities/v2/search")
+DEFAULT_CACHE_DIR = os.getenv("SAM_CACHE_DIR", "/data/cache/sam")
+PAGE_SIZE = 1000  # API maximum for 'limit'
+
+
+def posted_window(days=3, today=None):
+    """(postedFrom, postedTo) as MM/dd/yyyy, the format the SAM API expects."""
+    today = today or datetime.utcnow().date()
+    return (today - timedelta(days=days)).strftime("%m/%d/%Y"), today.strftime("%m/%d/%Y")
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%m/%d/%Y").date()
+
+
+class SamClient:
+    """
+    Paginated, cached, rate-limited reader of /opportunities/v2/search.
+
+    stats counts pages served from cache without a request ('cache_hits'),
+    revalidated with a 304 ('not_modified') and downloaded ('fetched').
+    """
+
+    def __init__(self, api_key=None, url=SAM_URL, cache_dir=DEFAULT_CACHE_DIR, page_size=PAGE_SIZE,
+                 concurrency=None, rate=None, http=None, today=None, clock=None):
+        self.api_key = api_key if api_key is not None else os.getenv("SAM_API_KEY", "")
+        self.url = url
+        self.cache_dir = cache_dir
+        self.page_size = page_size
+        self.concurrency = concurrency or int(os.getenv("SAM_CONCURRENCY", "4"))
+        rate = rate or float(os.getenv("SAM_RATE_PER_SEC", "2"))
+        self.http = http or HttpClient(bucket=TokenBucket(rate, capacity=self.concurrency))
+        self.clock = clock or datetime.utcnow
+        self.today = today or self.clock().date()
+        self.stats = {"cache_hits": 0, "not_modified": 0, "fetched": 0}
+        self._lock = threading.Lock()
+
+    # --- cache ---------------------------------------------------------------
+
+    def _cache_path(self, params):
+        key = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, path, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(entry, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    # --- fetching ------------------------------------------------------------
+
+    def fetch_page(self, day, offset=0):
+        """
+        Return the decoded response for one posting day and offset.
+
+        A cached page fetched after its day ended (UTC) cannot gain new notices
+        and is returned without touching the network; a page cached while its
+        day was still open (or with no recorded fetch time) is revalidated.
+        """
+        day = _as_date(day)
+        stamp = day.strftime("%m/%d/%Y")
+        params = {"postedFrom": stamp, "postedTo": stamp, "limit": self.page_size, "offset": offset}
+        path = self._cache_path(params) if self.cache_dir else None
+        cached = self._load(path) if path else None
+
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time()).isoformat()
+        if cached is not None and (cached.get("fetched_at") or "") >= day_end:
+            self._count("cache_hits")
+            return cached["body"]
+
+        headers = {"Accept": "application/json"}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        query = urllib.parse.urlencode({"api_key": self.api_key, **params})
+        fetched_at = self.clock().isoformat()
+        resp = self.http.request("GET", f"{self.url}?{query}", headers=headers)
+        if resp.status == 304 and cached is not None:
+            self._count("not_modified")
+            if path:
+                self._save(path, {**cached, "fetched_at": fetched_at})
+            return cached["body"]
+
+        body = resp.json() or {}
+        self._count("fetched")
+        if path:
+            self._save(path, {
+                "etag": resp.headers.get("etag"),
+                "last_modified": resp.headers.get("last-modified"),
+                "fetched_at": fetched_at,
+                "body": body,
+            })
+        return body
+
+    def iter_notices(self, posted_from, posted_to, max_records=None):
+        """
+        Yield every notice posted between the two dates (inclusive), in
+        day/offset order. First pages of all days are fetched concurrently,
+        then all remaining offsets, both bounded by 'concurrency'.
+        """
+        start, end = _as_date(posted_from), _as_date(posted_to)
+        days = [start + timedelta(n) for n in range((end - start).days + 1)]
+        emitted = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            firsts = list(pool.map(self.fetch_page, days))
+            rest = [
+                (day, offset)
+                for day, first in zip(days, firsts)
+                for offset in range(self.page_size, int(first.get("totalRecords") or 0), self.page_size)
+            ]
+            later = pool.map(lambda job: self.fetch_page(*job), rest)
+
+            pages_by_day = {day: [first] for day, first in zip(days, firsts)}
+            for (day, _), page in zip(rest, later):
+                pages_by_day[day].append(page)
+
+        for day in days:
+            for page in pages_by_day[day]:
+                for notice in page.get("opportunitiesData") or []:
+                    if max_records is not None and emitted >= max_records:
+                        return
+                    emitted += 1
+                    yield notice
+
+    def iter_opportunities(self, posted_from, posted_to, max_records=None):
+        """Notices of the window, normalized by the SAM mapping as they are read."""
+        return iter_opportunities_sam(self.iter_notices(posted_from, posted_to, max_records))
+
+
+def fetch_notices(days=3, max_records=None, client=None):
+    """
+    Fetch every notice of the last 'days' days.
+
+    Returns:
+      {"totalRecords": N, "opportunitiesData": [...]} (the single-page API shape).
+    """
+    client = client or SamClient()
+    notices = list(client.iter_notices(*posted_window(days, client.today), max_records=max_records))
+    print(f"[sam] {len(notices)} notices {json.dumps(client.stats)}", file=sys.stderr)
+    return {"totalRecords": len(notices), "opportunitiesData": notices}
+
+
+def _main_cli() -> None:
+    args = [a for a in sys.argv[1:] if a != "--raw"]
+    days = int(args[0]) if args else 3
+    if "--raw" in sys.argv[1:]:
+        max_records = int(os.getenv("SAM_MAX_RECORDS", "0")) or None
+        print(json.dumps(fetch_notices(days, max_records)["opportunitiesData"]))
+        return
+    client = SamClient()
+    for row in client.iter_opportunities(*posted_window(days, client.today)):
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+    print(f"[sam] {json.dumps(client.stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main_cli()
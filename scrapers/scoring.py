@@ -0,0 +1,205 @@
+"""
+Batch scoring and capacity allocation.
+
+Replaces the per-item `Auto_decision` and `score1` Code nodes of workflow 01.
+Those compared every opportunity with the *whole* `hours_available` of its
+service line, so ten Janitorial rows could each claim the same 200 hours.
+Here capacity is loaded once from data/resource_capacity.csv and shared out:
+
+  1. base score (effort bucket + notice type + active) for the whole batch,
+     with NumPy arrays;
+  2. per service line, opportunities are ranked by base score (desc) and
+     deadline (asc) and take hours while they fit: a vectorized prefix via a
+     grouped cumulative sum, then a greedy pass over the remaining rows while
+     any hours are left;
+  3. auto_decision: "Go" for allocated rows; "Review" when effort is unknown or
+     the row would fit with SCORING_OVERBOOK (default 20%) overtime on the
+     line; "No Go" otherwise. The final score adds the decision weight, with
+     the same weights as `score1`.
+
+'decision' stays "Review" (the Slack reviewer decides), as before; upserts of
+rows that were already written leave it out (formatter.airtable_write).
+"""
+import csv
+import os
+
+import numpy as np
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.classifier import DEFAULT_CAPACITY_CSV
+except ImportError:  # executed from /app inside the scraper container
+    from classifier import DEFAULT_CAPACITY_CSV
+
+OVERBOOK = float(os.getenv("SCORING_OVERBOOK", "1.2"))
+
+DECISION_WEIGHTS = {"Go": 50, "Review": 25}
+EFFORT_WEIGHTS = {"Low": 30, "Medium": 15}
+ACTIVE_WEIGHT = 10
+
+_NO_DEADLINE = np.datetime64("9999-12-31")
+
+
+def load_capacity(path=DEFAULT_CAPACITY_CSV):
+    """{service_line: hours_available} from the capacity CSV."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        return {
+            row["service_line"].strip(): float(row.get("hours_available") or 0)
+            for row in csv.DictReader(fh) if (row.get("service_line") or "").strip()
+        }
+
+
+_capacity = None
+
+
+def get_capacity():
+    """Process-wide capacity table, read from the CSV on first use."""
+    global _capacity
+    if _capacity is None:
+        _capacity = load_capacity()
+    return _capacity
+
+
+def type_weight(notice_type):
+    """Weight of a notice type, same precedence as `score1`."""
+    text = (notice_type or "").lower()
+    if "award notice" in text or "combined synopsis" in text:
+        return 20
+    if "solicitation" in text:
+        return 10
+    if "sources sought" in text or "presolicitation" in text:
+        return 5
+    return 0
+
+
+def _number(value):
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if np.isfinite(number) else 0.0
+
+
+def _deadline(value):
+    text = str(value or "")[:10]
+    if not text:
+        return _NO_DEADLINE
+    try:
+        return np.datetime64(text, "D")
+    except ValueError:
+        return _NO_DEADLINE
+
+
+def _codes(values):
+    """(unique values, int code per row): lets per-category weights be looked up as arrays."""
+    uniques, inverse = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+    return uniques, inverse
+
+
+def allocate(lines, need, priority, deadlines, capacity):
+    """
+    Share each line's capacity among its rows.
+
+    lines:     int code of the service line per row
+    need:      hours needed per row (0 = unknown, never allocated)
+    priority:  higher first
+    deadlines: datetime64[D], earlier first among equal priority
+    capacity:  hours available per line code
+
+    Returns:
+      (allocated bool array, hours left per line code)
+    """
+    n = len(need)
+    allocated = np.zeros(n, dtype=bool)
+    left = capacity.astype(float).copy()
+    if n == 0:
+        return allocated, left
+
+    # Rank within line: priority desc, deadline asc, input order
+    order = np.lexsort((np.arange(n), deadlines, -priority, lines))
+    sorted_lines = lines[order]
+    sorted_need = need[order]
+
+    # Grouped running total: cumsum minus the total before each line starts
+    running = np.cumsum(sorted_need)
+    starts = np.flatnonzero(np.r_[True, sorted_lines[1:] != sorted_lines[:-1]])
+    before = np.repeat(running[starts] - sorted_need[starts], np.diff(np.r_[starts, n]))
+    running -= before
+
+    # Prefix phase: everything up to the first row that no longer fits
+    fits = running <= capacity[sorted_lines]
+    group_id = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    first_miss = np.full(len(starts), n)
+    misses = np.flatnonzero(~fits)
+    np.minimum.at(first_miss, group_id[misses], misses)
+    prefix = np.arange(n) < first_miss[group_id]
+    take = prefix & (sorted_need > 0)
+    allocated[order[take]] = True
+    np.subtract.at(left, sorted_lines[take], sorted_need[take])
+
+    # Greedy tail: later (lower-ranked) rows that still fit in what is left
+    for g, start in enumerate(starts):
+        line = sorted_lines[start]
+        end = starts[g + 1] if g + 1 < len(starts) else n
+        tail = sorted_need[first_miss[g]:end]
+        tail = tail[tail > 0]
+        if not len(tail):
+            continue
+        smallest = tail.min()
+        for pos in range(first_miss[g], end):
+            if left[line] < smallest:
+                break
+            hours = sorted_need[pos]
+            if 0 < hours <= left[line]:
+                allocated[order[pos]] = True
+                left[line] -= hours
+    return allocated, left
+
+
+def score_batch(rows, capacity=None, overbook=OVERBOOK):
+    """
+    Score and decide a whole batch in place.
+
+    Sets 'hours_available' (capacity of the row's line), 'auto_decision',
+    'decision' ("Review") and 'score' on every row.
+
+    Returns:
+      (rows, {service_line: {"hours_available": H, "allocated": A}})
+    """
+    rows = list(rows)
+    capacity = get_capacity() if capacity is None else capacity
+    if not rows:
+        return rows, {}
+
+    line_names, lines = _codes([r.get("service_line") or "" for r in rows])
+    line_capacity = np.array([capacity.get(name, 0.0) for name in line_names], dtype=float)
+    need = np.fromiter((_number(r.get("effort_hours")) for r in rows), dtype=float, count=len(rows))
+    deadlines = np.array([_deadline(r.get("deadline")) for r in rows], dtype="datetime64[D]")
+
+    type_names, types = _codes([r.get("type") or "" for r in rows])
+    bucket_names, buckets = _codes([r.get("effort_bucket") or "" for r in rows])
+    active = np.fromiter((r.get("active") is True for r in rows), dtype=bool, count=len(rows))
+    base = (
+        np.array([type_weight(t) for t in type_names])[types]
+        + np.array([EFFORT_WEIGHTS.get(b, 0) for b in bucket_names])[buckets]
+        + ACTIVE_WEIGHT * active
+    )
+
+    allocated, left = allocate(lines, need, base, deadlines, line_capacity)
+    slack = left[lines] + (overbook - 1.0) * line_capacity[lines]
+    review = ~allocated & ((need == 0) | (need <= slack))
+    decision_weight = np.where(allocated, DECISION_WEIGHTS["Go"], np.where(review, DECISION_WEIGHTS["Review"], 0))
+    scores = base + decision_weight
+
+    row_capacity = line_capacity[lines]
+    for i, row in enumerate(rows):
+        row["hours_available"] = int(row_capacity[i]) if row_capacity[i].is_integer() else float(row_capacity[i])
+        row["auto_decision"] = "Go" if allocated[i] else ("Review" if review[i] else "No Go")
+        row["decision"] = "Review"
+        row["score"] = int(scores[i])
+
+    summary = {
+        str(name): {"hours_available": float(line_capacity[code]),
+                    "allocated": float(line_capacity[code] - left[code])}
+        for code, name in enumerate(line_names)
+    }
+    return rows, summary
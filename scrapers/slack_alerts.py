@@ -0,0 +1,184 @@
+"""
+Batched Slack alerts for new opportunities.
+
+Workflow 02 posted one Slack message per opportunity inside `Loop Over Items`
+with a 3-second `Wait`, so 200 new rows took about ten minutes. This
+dispatcher instead:
+
+  - orders the opportunities of one `new-opportunity` payload by score
+    (highest first), then deadline (soonest first);
+  - groups them into Block Kit digests of ALERT_DIGEST_SIZE items (a message
+    holds at most 50 blocks; each item is a section plus a divider). Every
+    item keeps its Accept/Ignore decision links;
+  - posts the digests to chat.postMessage through the pooled HttpClient and a
+    token bucket (SLACK_RATE_PER_SEC, about one message per second per
+    channel). 429s are retried with Retry-After, and Slack's
+    {"ok": false} answers raise HttpError.
+
+Usage:
+  python -m scrapers.slack_alerts [records.json|records.jsonl|-]   (posted messages as JSONL on stdout)
+"""
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.http_utils import HttpClient, HttpError, TokenBucket
+except ImportError:  # executed from /app inside the scraper container
+    from http_utils import HttpClient, HttpError, TokenBucket
+
+API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api")
+CHANNEL = os.getenv("SLACK_CHANNEL", "#alerts")
+DIGEST_SIZE = int(os.getenv("ALERT_DIGEST_SIZE", "20"))
+MAX_BLOCKS = 50  # Block Kit limit per message
+ITEM_BLOCKS = 2  # section + divider
+
+
+def webhook_base():
+    """n8n base URL the decision links point to (the same one the `links` node used)."""
+    base = os.getenv("WEBHOOK_URL") or f"http://localhost:{os.getenv('N8N_PORT', '5678')}"
+    return base.rstrip("/")
+
+
+def decision_links(checksum, base=None):
+    """(accept_url, ignore_url) of one opportunity, handled by workflow 03."""
+    base = base or webhook_base()
+    cs = urllib.parse.quote(checksum or "", safe="")
+    return (f"{base}/webhook/decision?checksum={cs}&decision=Go",
+            f"{base}/webhook/decision?checksum={cs}&decision=No%20Go")
+
+
+def _fields(item):
+    """Airtable records carry the row under 'fields'; plain rows are used as-is."""
+    return (item.get("fields") or {}) if "fields" in item else item
+
+
+def _score(fields):
+    try:
+        return float(fields.get("score"))
+    except (TypeError, ValueError):
+        return float("-inf")
+
+
+def order(items):
+    """Highest score first, then soonest deadline; missing values sort last."""
+    return sorted(items, key=lambda item: (-_score(_fields(item)), _fields(item).get("deadline") or "\uffff"))
+
+
+def _escape(value):
+    """Slack mrkdwn control characters (&, <, >) in user text."""
+    text = "" if value is None else str(value)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def item_text(fields, base=None):
+    """mrkdwn of one opportunity (the former `Send alert` text)."""
+    accept, ignore = decision_links(fields.get("checksum"), base)
+    esc = {key: _escape(value) for key, value in fields.items()}
+    title = _escape(str(fields.get("title") or "")[:300])
+    return (
+        f"*{title}*\n"
+        f"📌 *Agency:* {esc.get('agency', '')}\n"
+        f"📅 *Deadline:* {esc.get('deadline', '')}\n"
+        f"⭐ *Score:* {esc.get('score', '')} • *Suggestion:* {esc.get('auto_decision', '')}\n"
+        f"🛠️ *Service:* {esc.get('service_line', '')} • *Effort:* {esc.get('effort_hours', '')}h "
+        f"({esc.get('effort_bucket', '')})\n"
+        f"✔️ <{accept}|Accept>   ❌ <{ignore}|Ignore>"
+    )
+
+
+def build_digests(items, size=DIGEST_SIZE, channel=CHANNEL, base=None):
+    """
+    chat.postMessage payloads for 'items' (Airtable records or rows), in
+    score/deadline order, at most 'size' opportunities each.
+    """
+    if not 0 < size <= (MAX_BLOCKS - 1) // ITEM_BLOCKS:
+        raise ValueError(f"digest size must be between 1 and {(MAX_BLOCKS - 1) // ITEM_BLOCKS}, got {size}")
+    ordered = [_fields(item) for item in order(i for i in items if isinstance(i, dict))]
+    chunks = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+    messages = []
+    for n, chunk in enumerate(chunks, 1):
+        title = f"🆕 {len(ordered)} new opportunities"
+        if len(chunks) > 1:
+            title += f" ({n}/{len(chunks)})"
+        blocks = [{"type": "header", "text": {"type": "plain_text", "text": title}}]
+        for fields in chunk:
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": item_text(fields, base)}})
+            blocks.append({"type": "divider"})
+        messages.append({"channel": channel, "text": title, "blocks": blocks, "unfurl_links": False})
+    return messages
+
+
+class AlertDispatcher:
+    """
+    Posts digests to one Slack channel.
+
+    stats counts messages and items sent and the seconds of the last
+    dispatch() call.
+    """
+
+    def __init__(self, token=None, channel=CHANNEL, url=API_URL, size=DIGEST_SIZE, rate=None, base=None,
+                 http=None):
+        self.token = token if token is not None else os.getenv("SLACK_BOT_TOKEN", "")
+        self.channel = channel
+        self.url = f"{url.rstrip('/')}/chat.postMessage"
+        self.size = size
+        self.base = base
+        rate = rate or float(os.getenv("SLACK_RATE_PER_SEC", "1"))
+        self.http = http or HttpClient(bucket=TokenBucket(rate, capacity=1))
+        self.stats = {"messages": 0, "items": 0, "seconds": 0.0}
+
+    def post(self, message):
+        """Send one chat.postMessage payload; returns Slack's response."""
+        headers = {"Authorization": f"Bearer {self.token}"}
+        resp = self.http.request("POST", self.url, body=message, headers=headers)
+        payload = resp.json() or {}
+        if not payload.get("ok"):
+            raise HttpError(resp.status, resp.body, self.url)
+        return payload
+
+    def dispatch(self, items):
+        """
+        Post every digest in order; returns [{"channel", "ts", "items"}, ...].
+        """
+        started = time.perf_counter()
+        sent = []
+        for message in build_digests(items, self.size, self.channel, self.base):
+            payload = self.post(message)
+            count = (len(message["blocks"]) - 1) // ITEM_BLOCKS
+            sent.append({"channel": payload.get("channel", self.channel), "ts": payload.get("ts"), "items": count})
+            self.stats["messages"] += 1
+            self.stats["items"] += count
+        self.stats["seconds"] = round(time.perf_counter() - started, 3)
+        return sent
+
+    def close(self):
+        self.http.close()
+
+
+def _main_cli() -> None:
+    try:
+        from scrapers.formatter import iter_json_rows
+    except ImportError:
+        from formatter import iter_json_rows
+
+    if len(sys.argv) > 2:
+        print("Uso: python -m scrapers.slack_alerts [records.json|records.jsonl|-]", file=sys.stderr)
+        sys.exit(2)
+    path = sys.argv[1] if len(sys.argv) == 2 else "-"
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        items = list(iter_json_rows(stream))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    dispatcher = AlertDispatcher()
+    for message in dispatcher.dispatch(items):
+        sys.stdout.write(json.dumps(message, ensure_ascii=False) + "\n")
+    print(f"[slack] {json.dumps(dispatcher.stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -0,0 +1,38 @@
+"""
+Connection setup shared by the SQLite-backed stores (checksum index,
+enrichment cache, detail cache, decision queue, near-duplicate index,
+watermarks).
+
+Each store keeps one file in WAL mode, so readers never block the writer, and
+one connection shared under a lock, so an instance can be used from the
+threads of the formatter HTTP server.
+"""
+import os
+import sqlite3
+import threading
+
+
+class SqliteStore:
+    """
+    Base class owning the connection (self._conn) and its lock (self._lock).
+
+    Subclasses call super().__init__(path) and then create their tables.
+    ':memory:' opens a private in-memory database (tests).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,274 @@
+"""
+Per-source watermarks for incremental scraping.
+
+Without them, the Cal eProcure and LACo scrapers read the first
+SCRAPE_*_QTY rows on every run, even when almost all of them were ingested
+the day before. With SCRAPE_INCREMENTAL=1:
+
+  - every row a scraper returns is staged in WATERMARK_DB by (source, id),
+    together with the list's sort key of that row (Cal 'end_date', LACo
+    'close_date'), and the run that scraped it ($RUN_ID). A row whose sort
+    key changed (an amended deadline moves in the list) counts as new again;
+  - staged rows are recorded as seen only when POST /airtable/write of the
+    same run succeeds (commit()). A run that fails between the scrape and
+    the write scrapes the same rows again next time;
+  - during extraction, rows are fed to a session in list order. After
+    WATERMARK_STOP_AFTER consecutive known rows the session has reached
+    known territory: the scraper stops paging, and that final run of known
+    rows is left out;
+  - known rows seen before that point are still returned, so the change-only
+    diff of the formatter keeps seeing them.
+
+The QTY variables then act as a ceiling for backfills, and daily runs only
+read what is new. Rows not seen for WATERMARK_MAX_AGE_DAYS are forgotten.
+
+Usage:
+  python -m scrapers.watermark stats [db_path]
+  python -m scrapers.watermark commit [run_id] [db_path]
+  python -m scrapers.watermark reset <source> [db_path]
+"""
+import json
+import os
+import sys
+import time
+
+try:  # imported as part of the 'scrapers' package
+    from scrapers.sqlite_store import SqliteStore
+except ImportError:  # executed from /app inside the scraper container
+    from sqlite_store import SqliteStore
+
+DEFAULT_PATH = os.getenv("WATERMARK_DB", "/data/watermarks.sqlite")
+STOP_AFTER = int(os.getenv("WATERMARK_STOP_AFTER", "5"))
+MAX_AGE_DAYS = float(os.getenv("WATERMARK_MAX_AGE_DAYS", "180"))
+
+_MISSING = object()
+
+
+def enabled():
+    return os.getenv("SCRAPE_INCREMENTAL", "").lower() in ("1", "true", "yes")
+
+
+class WatermarkStore(SqliteStore):
+    """
+    SQLite (source, id) -> (sort key, last seen), plus the top row of each
+    source's last run and the rows staged by runs not written yet.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, clock=time.time):
+        self._clock = clock
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " source TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " sort_key TEXT,"
+            " last_seen REAL NOT NULL,"
+            " PRIMARY KEY (source, id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS marks ("
+            " source TEXT PRIMARY KEY,"
+            " top_id TEXT,"
+            " top_sort_key TEXT,"
+            " rows INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " run_id TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " sort_key TEXT,"
+            " position INTEGER NOT NULL,"
+            " staged_at REAL NOT NULL,"
+            " PRIMARY KEY (run_id, source, id))"
+        )
+        self._conn.commit()
+
+    def known(self, source):
+        """{id: sort_key} of every row recorded for 'source'."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, sort_key FROM seen WHERE source = ?", (source,)))
+
+    def mark(self, source):
+        """Top row and size of the last recorded run, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT top_id, top_sort_key, rows, updated_at FROM marks WHERE source = ?", (source,)).fetchone()
+        return dict(zip(("top_id", "top_sort_key", "rows", "updated_at"), row)) if row else None
+
+    def record(self, source, entries, max_age_days=MAX_AGE_DAYS):
+        """
+        Record [(id, sort_key), ...] in list order as seen now, and forget
+        rows of 'source' not seen for 'max_age_days'.
+        """
+        entries = [(str(i), None if k is None else str(k)) for i, k in entries if i not in (None, "")]
+        now = self._clock()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO seen (source, id, sort_key, last_seen) VALUES (?, ?, ?, ?)",
+                ((source, i, k, now) for i, k in entries))
+            self._conn.execute("DELETE FROM seen WHERE source = ? AND last_seen < ?",
+                               (source, now - max_age_days * 86400))
+            if entries:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO marks (source, top_id, top_sort_key, rows, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)", (source, entries[0][0], entries[0][1], len(entries), now))
+            self._conn.commit()
+
+    def stage(self, source, entries, run_id=None):
+        """Park [(id, sort_key), ...] of a run until commit(run_id); replaces what the run staged before."""
+        entries = [(str(i), None if k is None else str(k)) for i, k in entries if i not in (None, "")]
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("DELETE FROM pending WHERE run_id = ? AND source = ?", (run_id or "", source))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pending (run_id, source, id, sort_key, position, staged_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                ((run_id or "", source, i, k, n, now) for n, (i, k) in enumerate(entries)))
+            self._conn.commit()
+
+    def commit(self, run_id=None):
+        """Record the rows staged by 'run_id' (or without a run id); returns {source: rows}."""
+        with self._lock:
+            staged = self._conn.execute(
+                "SELECT source, id, sort_key FROM pending WHERE run_id = ? ORDER BY source, position",
+                (run_id or "",)).fetchall()
+        by_source = {}
+        for source, ident, key in staged:
+            by_source.setdefault(source, []).append((ident, key))
+        for source, entries in by_source.items():
+            self.record(source, entries)
+        with self._lock:
+            self._conn.execute("DELETE FROM pending WHERE run_id = ?", (run_id or "",))
+            self._conn.commit()
+        return {source: len(entries) for source, entries in by_source.items()}
+
+    def reset(self, source):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM marks WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM pending WHERE source = ?", (source,))
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT source, COUNT(*) FROM seen GROUP BY source"))
+            pending = dict(self._conn.execute("SELECT source, COUNT(*) FROM pending GROUP BY source"))
+        return {source: {"rows": counts.get(source, 0), "pending": pending.get(source, 0), "mark": self.mark(source)}
+                for source in sorted(set(counts) | set(pending))}
+
+
+class Session:
+    """
+    Watermark of one scrape.
+
+    feed() takes rows in list order and returns True once known territory is
+    reached; rows() is what the scraper should keep; stage() parks the rows
+    it returned until the run is written. Without a store path
+    (SCRAPE_INCREMENTAL off) every row is kept and nothing is staged. The
+    store is only opened to load the known rows and to stage, so a session
+    needs no closing.
+    """
+
+    def __init__(self, source, key, sort_key=None, path=None, stop_after=STOP_AFTER, run_id=None):
+        self.source = source
+        self.key = key
+        self.sort_key = sort_key
+        self.path = path
+        self.run_id = run_id
+        self.stop_after = max(1, stop_after)
+        self.known = {}
+        if path is not None:
+            with WatermarkStore(path) as store:
+                self.known = store.known(source)
+        self.reached = False
+        self.skipped = 0
+        self._rows = []
+        self._run = []
+
+    @property
+    def incremental(self):
+        return self.path is not None
+
+    def _sort(self, row):
+        value = row.get(self.sort_key) if self.sort_key else None
+        return None if value in (None, "") else str(value)
+
+    def is_known(self, row):
+        ident = row.get(self.key)
+        return ident not in (None, "") and self.known.get(str(ident), _MISSING) == self._sort(row)
+
+    def feed(self, rows):
+        """Take the next rows of the list; True once known territory is reached."""
+        for row in rows:
+            if self.reached:
+                break
+            if self.is_known(row):
+                self._run.append(row)
+                if len(self._run) >= self.stop_after:
+                    self.reached = True
+                    self.skipped = len(self._run)
+            else:
+                self._rows.extend(self._run)
+                self._run = []
+                self._rows.append(row)
+        return self.reached
+
+    def rows(self):
+        """Rows to keep: everything fed, minus the known run that ended the scan."""
+        return list(self._rows) if self.reached else self._rows + self._run
+
+    def stage(self, rows):
+        """Stage the rows the scrape returned until the run is written (no-op when not incremental)."""
+        if self.path is None:
+            return
+        with WatermarkStore(self.path) as store:
+            store.stage(self.source, [(row.get(self.key), self._sort(row)) for row in rows], self.run_id)
+        print(f"[watermark] {self.source}: {len(rows)} rows staged"
+              f"{', stopped at known rows' if self.reached else ''}", file=sys.stderr)
+
+
+def session(source, key, sort_key=None):
+    """Session on WATERMARK_DB when SCRAPE_INCREMENTAL is on; a pass-through one otherwise."""
+    return Session(source, key, sort_key, DEFAULT_PATH if enabled() else None,
+                   run_id=os.getenv("RUN_ID", "").strip() or None)
+
+
+def commit(run_id=None, path=None):
+    """
+    Record what the scrapers of 'run_id' staged, once the run was written;
+    returns {source: rows} ({} when SCRAPE_INCREMENTAL is off).
+    """
+    if path is None and not enabled():
+        return {}
+    with WatermarkStore(path or DEFAULT_PATH) as store:
+        recorded = store.commit(run_id)
+    if recorded:
+        print(f"[watermark] recorded {json.dumps(recorded)}", file=sys.stderr)
+    return recorded
+
+
+def _main_cli() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "commit", "reset") or (
+            sys.argv[1] == "reset" and len(sys.argv) < 3):
+        print("Uso: python -m scrapers.watermark <stats | commit [run_id] | reset <source>> [db_path]",
+              file=sys.stderr)
+        sys.exit(2)
+    if sys.argv[1] == "commit":
+        run_id = sys.argv[2] if len(sys.argv) >= 3 and sys.argv[2] != "-" else None
+        db_path = sys.argv[3] if len(sys.argv) >= 4 else DEFAULT_PATH
+        print(json.dumps({"path": db_path, "recorded": commit(run_id, db_path)}))
+    elif sys.argv[1] == "reset":
+        db_path = sys.argv[3] if len(sys.argv) >= 4 else DEFAULT_PATH
+        with WatermarkStore(db_path) as store:
+            store.reset(sys.argv[2])
+            print(json.dumps({"path": db_path, "reset": sys.argv[2]}))
+    else:
+        db_path = sys.argv[2] if len(sys.argv) >= 3 else DEFAULT_PATH
+        with WatermarkStore(db_path) as store:
+            print(json.dumps({"path": db_path, "sources": store.stats()}))
+
+
+if __name__ == "__main__":
+    _main_cli()
@@ -1,2 +1,224 @@
 import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+import json
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def serve():
+    """
+    Start local HTTP servers for offline API tests.
+
+    serve(handler_cls) -> base URL ("http://127.0.0.1:<port>"); every server is
+    shut down when the test ends.
+    """
+    servers = []
+
+    def _serve(handler_cls):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield _serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def sam_stub(serve):
+    """
+    Stub of SAM.gov /opportunities/v2/search (same response shape).
+
+    state["notices"]: list of notices filtered by postedDate (MM/dd/yyyy window),
+    paginated with limit/offset; ETag support (304); state["fail_next"] 429s
+    before answering; state["requests"] logs every query.
+    """
+    state = {"notices": [], "fail_next": 0, "requests": []}
+
+    class Handler(_QuietHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path != "/opportunities/v2/search":
+                self._json(404, {"error": "not found"})
+                return
+            q = dict(urllib.parse.parse_qsl(url.query))
+            state["requests"].append(q)
+            if state["fail_next"]:
+                state["fail_next"] -= 1
+                self._json(429, {"error": "throttled"}, {"Retry-After": "0"})
+                return
+
+            def to_iso(stamp):
+                m, d, y = stamp.split("/")
+                return f"{y}-{m}-{d}"
+
+            lo, hi = to_iso(q["postedFrom"]), to_iso(q["postedTo"])
+            matching = [n for n in state["notices"] if lo <= n["postedDate"][:10] <= hi]
+            limit, offset = int(q.get("limit", 1)), int(q.get("offset", 0))
+            page = matching[offset:offset + limit]
+            etag = '"%d-%d-%d"' % (len(matching), offset, limit)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._json(200, {"totalRecords": len(matching), "limit": limit, "offset": offset,
+                             "opportunitiesData": page}, {"ETag": etag})
+
+    state["url"] = serve(Handler) + "/opportunities/v2/search"
+    return state
+
+
+@pytest.fixture
+def airtable_stub(serve):
+    """
+    Stub of the Airtable records API for one table (/v0/<base>/<table>).
+
+    POST creates, PATCH with performUpsert merges on the given fields and
+    PATCH with record ids updates those records. Writes reject more than 10
+    records (422) and every method a wrong bearer token (401). GET answers
+    filterByFormula queries of the form OR({field}='value',...).
+    state["records"]: stored records by id; state["fail_next"] 429s before
+    answering; state["requests"] logs (method, record count) per request.
+    """
+    state = {"records": {}, "fail_next": 0, "requests": [], "token": "key", "base": "appTest", "table": "tblTest"}
+    lock = threading.Lock()
+
+    class Handler(_QuietHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _authorized(self, path):
+            if path != f"/v0/{state['base']}/{state['table']}":
+                self._json(404, {"error": "NOT_FOUND"})
+                return False
+            if self.headers.get("Authorization") != f"Bearer {state['token']}":
+                self._json(401, {"error": "AUTHENTICATION_REQUIRED"})
+                return False
+            return True
+
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if not self._authorized(urllib.parse.unquote(url.path)):
+                return
+            formula = dict(urllib.parse.parse_qsl(url.query)).get("filterByFormula", "")
+            terms = re.findall(r"\{(\w+)\}='((?:[^'\\]|\\.)*)'", formula)
+            with lock:
+                state["requests"].append(("GET", len(terms)))
+                out = [r for r in state["records"].values()
+                       if any(str(r["fields"].get(f)) == v.replace("\\'", "'") for f, v in terms)]
+            self._json(200, {"records": out})
+
+        def _write(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if not self._authorized(urllib.parse.unquote(self.path)):
+                return
+            records = body.get("records") or []
+            with lock:
+                state["requests"].append((self.command, len(records)))
+                if state["fail_next"]:
+                    state["fail_next"] -= 1
+                    self._json(429, {"errors": [{"error": "RATE_LIMIT_REACHED"}]}, {"Retry-After": "0"})
+                    return
+                if not 0 < len(records) <= 10:
+                    self._json(422, {"error": {"type": "INVALID_RECORDS"}})
+                    return
+                merge = (body.get("performUpsert") or {}).get("fieldsToMergeOn")
+                if self.command == "PATCH" and not merge and all(r.get("id") for r in records):
+                    if any(r["id"] not in state["records"] for r in records):
+                        self._json(422, {"error": {"type": "ROW_DOES_NOT_EXIST"}})
+                        return
+                    for record in records:
+                        state["records"][record["id"]]["fields"].update(record["fields"])
+                    self._json(200, {"records": [state["records"][r["id"]] for r in records]})
+                    return
+                if self.command == "PATCH" and not merge:
+                    self._json(422, {"error": {"type": "INVALID_REQUEST_MISSING_FIELDS"}})
+                    return
+                out, created, updated = [], [], []
+                for record in records:
+                    fields = record["fields"]
+                    match = next((r for r in state["records"].values()
+                                  if merge and all(r["fields"].get(f) == fields.get(f) for f in merge)), None)
+                    if match is None:
+                        match = {"id": f"rec{len(state['records']):014d}", "createdTime": "2025-08-21T00:00:00.000Z",
+                                 "fields": {}}
+                        state["records"][match["id"]] = match
+                        created.append(match["id"])
+                    else:
+                        updated.append(match["id"])
+                    match["fields"].update({k: v for k, v in fields.items() if v is not None})
+                    out.append(match)
+            payload = {"records": out}
+            if merge:
+                payload.update(createdRecords=created, updatedRecords=updated)
+            self._json(200, payload)
+
+        do_POST = _write
+        do_PATCH = _write
+
+    state["url"] = serve(Handler) + "/v0"
+    return state
+
+
+@pytest.fixture
+def slack_stub(serve):
+    """
+    Stub of Slack's chat.postMessage (/api/chat.postMessage).
+
+    Answers {"ok": false, "error": ...} like Slack for a wrong bearer token
+    (invalid_auth) or more than 50 blocks (invalid_blocks).
+    state["messages"]: accepted payloads; state["fail_next"] 429s before
+    answering.
+    """
+    state = {"messages": [], "fail_next": 0, "token": "xoxb-test"}
+    lock = threading.Lock()
+
+    class Handler(_QuietHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path != "/api/chat.postMessage":
+                self._json(404, {"ok": False, "error": "unknown_method"})
+                return
+            with lock:
+                if state["fail_next"]:
+                    state["fail_next"] -= 1
+                    self._json(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": "0"})
+                    return
+                if self.headers.get("Authorization") != f"Bearer {state['token']}":
+                    self._json(200, {"ok": False, "error": "invalid_auth"})
+                    return
+                if len(body.get("blocks") or []) > 50:
+                    self._json(200, {"ok": False, "error": "invalid_blocks"})
+                    return
+                state["messages"].append(body)
+                ts = f"1724200000.{len(state['messages']):06d}"
+            self._json(200, {"ok": True, "channel": "C0ALERTS", "ts": ts, "message": {"text": body.get("text")}})
+
+    state["url"] = serve(Handler) + "/api"
+    return state
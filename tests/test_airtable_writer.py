@@ -0,0 +1,95 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scrapers import formatter
+from scrapers.airtable_writer import AirtableWriter, chunked
+from scrapers.formatter import FormatterHandler
+from scrapers.http_utils import HttpClient, HttpError, TokenBucket
+
+
+def _rows(n, start=0):
+    return [{"checksum": f"c{i}", "title": f"Opportunity {i}", "naics_code": None} for i in range(start, start + n)]
+
+
+def _writer(stub, **kw):
+    http = HttpClient(bucket=TokenBucket(1000), backoff=0, sleep=lambda s: None)
+    kw.setdefault("token", stub["token"])
+    return AirtableWriter(base_id=stub["base"], table=stub["table"], url=stub["url"], concurrency=4,
+                          http=http, **kw)
+
+
+def test_thousand_rows_take_a_hundred_requests(airtable_stub):
+    writer = _writer(airtable_stub)
+    records = writer.write(_rows(1000))
+    assert [r["fields"]["checksum"] for r in records] == [f"c{i}" for i in range(1000)]
+    assert len(airtable_stub["requests"]) == 100
+    assert {count for _, count in airtable_stub["requests"]} == {10}
+    assert writer.stats["created"] == 1000 and writer.stats["requests"] == 100
+    assert writer.stats["rows_per_sec"] > 0
+
+
+def test_upsert_on_checksum_updates_instead_of_duplicating(airtable_stub):
+    writer = _writer(airtable_stub)
+    writer.write(_rows(5))
+    changed = _rows(3, start=3)
+    changed[0]["title"] = "Renamed"
+    records = writer.write(changed)
+    assert len(airtable_stub["records"]) == 6
+    assert records[0]["fields"]["title"] == "Renamed"
+    assert writer.stats["updated"] == 2 and writer.stats["created"] == 6
+
+
+def test_plain_create_and_retry_on_429(airtable_stub):
+    airtable_stub["fail_next"] = 2
+    writer = _writer(airtable_stub, merge_fields=None)
+    assert len(writer.write(_rows(12))) == 12
+    assert writer.http.retried == 2
+    assert {method for method, _ in airtable_stub["requests"]} == {"POST"}
+
+
+def test_errors(airtable_stub):
+    with pytest.raises(HttpError) as exc:
+        _writer(airtable_stub, token="wrong").write(_rows(1))
+    assert exc.value.status == 401
+    with pytest.raises(ValueError):
+        _writer(airtable_stub).write_chunk(_rows(11))
+    assert chunked(list(range(25))) == [list(range(10)), list(range(10, 20)), list(range(20, 25))]
+
+
+def test_airtable_endpoint(airtable_stub, serve, monkeypatch):
+    monkeypatch.setattr(formatter, "_airtable_writer", _writer(airtable_stub))
+    base = serve(FormatterHandler)
+    req = urllib.request.Request(f"{base}/airtable/write", data=json.dumps(_rows(15)).encode("utf-8"))
+    with urllib.request.urlopen(req) as resp:
+        body = json.loads(resp.read())
+    assert len(body["records"]) == 15 and body["stats"]["requests"] == 2
+
+    monkeypatch.setattr(formatter, "_airtable_writer", _writer(airtable_stub, token="wrong"))
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        urllib.request.urlopen(urllib.request.Request(f"{base}/airtable/write", data=b"[{}]"))
+    assert exc.value.code == 502
+
+
+def test_changed_rows_keep_the_reviewers_decision(airtable_stub, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKSUM_INDEX", str(tmp_path / "checksums.sqlite"))
+    monkeypatch.delenv("NEAR_DUP_INDEX", raising=False)
+    monkeypatch.delenv("DECISION_STORE", raising=False)
+    monkeypatch.setattr(formatter, "_checksum_index", None)
+    monkeypatch.setattr(formatter, "_airtable_writer", _writer(airtable_stub))
+    scored = [dict(row, decision="Review", deadline="2025-09-30") for row in _rows(2)]
+    first = formatter.airtable_write(scored)
+    assert [r["status"] for r in first["records"]] == ["new", "new"]
+    record = next(r for r in airtable_stub["records"].values() if r["fields"]["checksum"] == "c0")
+    record["fields"]["decision"] = "Go"  # clicked in Slack
+
+    amended = [dict(scored[0], deadline="2025-10-15"), dict(scored[1], checksum="c9")]
+    records = formatter.airtable_write(amended)["records"]
+    assert [r["status"] for r in records] == ["changed", "new"]
+    assert record["fields"]["decision"] == "Go" and record["fields"]["deadline"] == "2025-10-15"
+    assert records[1]["fields"]["decision"] == "Review"
+
+    formatter.get_checksum_index().close()
+    monkeypatch.setattr(formatter, "_checksum_index", None)
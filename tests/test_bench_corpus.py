@@ -0,0 +1,32 @@
+from benchmarks.bench_normalizers import measure
+from benchmarks.corpus import SOURCES, make_rows
+from scrapers.formatter import CANONICAL_FIELDS, format_opportunities_cal, format_opportunities_laco, \
+    format_opportunities_sam
+
+NORMALIZERS = {"cal": format_opportunities_cal, "laco": format_opportunities_laco, "sam": format_opportunities_sam}
+
+
+def test_corpus_is_deterministic_and_messy():
+    assert make_rows("sam", 50) == make_rows("sam", 50)
+    assert make_rows("sam", 50, seed=1) != make_rows("sam", 50)
+
+    sam = make_rows("sam", 500)
+    awards = [r.get("award", "missing") for r in sam]
+    assert any(isinstance(a, dict) and a.get("awardee", {}).get("name") for a in awards)
+    assert None in awards and "missing" in awards
+    assert any(not title.isascii() for title in (r["title"] for r in sam))
+    assert any("close_date" not in r for r in make_rows("laco", 500))
+
+
+def test_every_synthetic_row_normalizes():
+    for source in SOURCES:
+        rows = make_rows(source, 300)
+        out = NORMALIZERS[source](rows)
+        assert len(out) == 300
+        assert all(tuple(row) == CANONICAL_FIELDS for row in out)
+
+
+def test_measure_reports_time_and_peak_memory():
+    entry = measure("laco", 200, "cli")
+    assert entry["rows"] == 200 and entry["seconds"] > 0 and entry["peak_bytes"] > 0
+    assert measure("cal", 10, "format", memory=False)["peak_bytes"] is None
@@ -0,0 +1,193 @@
+import asyncio
+import io
+import json
+import os
+import time
+import urllib.request
+
+import pytest
+
+from scrapers import cal_eprocure_scraper, checkpoints, formatter, ingest, watermark
+from scrapers.airtable_writer import AirtableWriter
+from scrapers.checkpoints import RunCheckpoint
+from scrapers.formatter import FormatterHandler
+from scrapers.http_utils import HttpClient, TokenBucket
+from scrapers.watermark import WatermarkStore
+
+LACO = [{"bid_id": str(i), "title": f"Bid {i}", "department": "Public Works", "close_date": "09/30/2025"}
+        for i in range(3)]
+
+
+def test_stages_are_append_only_batches_per_attempt(tmp_path):
+    run = RunCheckpoint.create(("cal", "laco"), str(tmp_path), run_id="20250901T060000Z-abc123")
+    run.append("raw", "cal", [{"event_id": "1"}])
+    run.append("raw", "cal", [{"event_id": "2"}, {"event_id": "3"}])
+    assert not run.completed("raw", "cal") and list(run.rows("raw", "cal")) == []
+    run.complete("raw", "cal")
+    assert [r["event_id"] for r in run.rows("raw", "cal")] == ["1", "2", "3"]
+    assert sorted(os.listdir(run.dir + "/raw")) == ["cal.1.00001.jsonl.gz", "cal.1.00002.jsonl.gz"]
+
+    # an interrupted attempt is kept on disk but not mixed into the completed one
+    run.append("normalized", "cal", [{"checksum": "a"}])
+    again = RunCheckpoint(run.run_id, str(tmp_path))  # e.g. after a crash
+    again.append("normalized", "cal", [{"checksum": "b"}])
+    again.complete("normalized", "cal")
+    assert list(again.rows("normalized", "cal")) == [{"checksum": "b"}]
+    assert len(list(again.rows("normalized", "cal", partial=True))) == 2
+
+    assert again.next_stage() == ("raw", ["laco"])
+    again.complete("raw", "laco")
+    again.complete("normalized", "laco")
+    assert again.next_stage() == ("enriched", [])
+    assert again.summary()["stages"]["raw"] == {"cal": 3, "laco": 0}
+    with pytest.raises(ValueError):
+        again.append("scored", "cal", [])
+    with pytest.raises(ValueError):
+        RunCheckpoint("../etc", str(tmp_path))
+
+
+def test_resume_or_start_picks_the_latest_incomplete_run(tmp_path):
+    root = str(tmp_path)
+    first, resumed = checkpoints.resume_or_start(("sam",), root)
+    assert not resumed
+    again, resumed = checkpoints.resume_or_start(("sam",), root)
+    assert resumed and again.run_id == first.run_id
+    for stage in ("raw", "normalized"):
+        first.complete(stage, "sam")
+    first.complete("enriched")
+    first.complete("written")
+    second, resumed = checkpoints.resume_or_start(("sam",), root)
+    assert not resumed and second.run_id != first.run_id
+    assert checkpoints.prune(root, keep_days=-1) == sorted([first.run_id, second.run_id])
+    assert checkpoints.list_runs(root) == []
+
+
+def test_a_run_without_new_rows_is_complete_after_format(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    for name in ("CHECKSUM_INDEX", "NEAR_DUP_INDEX", "EXPORT_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    first = formatter.start_run()
+    run = formatter.get_run(first["run_id"])
+    for source in ("cal", "laco", "sam"):
+        formatter._batch_response(source, [], run=run)
+    assert run.next_stage() is None and run.completed("written")
+
+    # the next day's run starts fresh and formats today's rows
+    second = formatter.start_run()
+    assert not second["resumed"] and second["run_id"] != first["run_id"]
+    assert formatter._batch_response("laco", LACO, run=formatter.get_run(second["run_id"]))["count"] == 3
+
+    # runs left open by an empty day before the fix are closed by /runs/start
+    stale = RunCheckpoint.create(("laco",), str(tmp_path / "old"))
+    stale.complete("raw", "laco")
+    stale.complete("normalized", "laco")
+    assert not checkpoints.resume_or_start(("laco",), str(tmp_path / "old"))[1]
+    assert checkpoints.RESUME_HOURS < 24
+
+
+def test_ingest_resumes_from_the_first_incomplete_stage(tmp_path):
+    run = RunCheckpoint.create(("laco", "sam"), str(tmp_path))
+
+    async def laco(emit):
+        await emit(LACO)
+
+    async def sam(emit):
+        raise TimeoutError("SAM.gov timed out")
+
+    stats = asyncio.run(ingest.run({"laco": laco, "sam": sam}, io.StringIO(), checkpoint=run))
+    assert stats["sam"]["error"] and run.next_stage() == ("raw", ["sam"])
+    assert run.completed("normalized", "laco") and len(list(run.rows("normalized", "laco"))) == 3
+
+    # Resume: laco comes from the checkpoint, only sam runs again
+    out = io.StringIO()
+    replayed = ingest.replay_normalized(run, ["laco"], out)
+
+    async def sam_ok(emit):
+        await emit([{"noticeId": "N1", "title": "Roofing", "solicitationNumber": "S1"}])
+
+    stats = asyncio.run(ingest.run({"sam": sam_ok}, out, checkpoint=run))
+    assert replayed["laco"]["rows_out"] == 3 and stats["sam"]["rows_out"] == 1
+    assert len(out.getvalue().splitlines()) == 4
+    assert run.next_stage() == ("enriched", [])
+
+    # raw complete but normalization interrupted: earlier batches are carried over
+    run2 = RunCheckpoint.create(("laco",), str(tmp_path))
+    run2.append("raw", "laco", LACO)
+    run2.complete("raw", "laco")
+    run2.append("normalized", "laco", [{"checksum": "kept", "title": "Bid 0"}])
+    resumed = RunCheckpoint(run2.run_id, str(tmp_path))
+    out = io.StringIO()
+    carried = ingest.replay_normalized(resumed, ["laco"], out, partial=True)
+    asyncio.run(ingest.run({"laco": ingest.replay_producer(resumed, "laco")}, out, checkpoint=resumed))
+    assert carried["laco"]["rows_out"] == 1 and len(out.getvalue().splitlines()) == 4
+    assert resumed.completed("normalized", "laco") and len(list(resumed.rows("normalized", "laco"))) == 4
+    assert len(list(resumed.rows("raw", "laco"))) == 3
+
+
+def test_formatter_checkpoints_and_skips_finished_work(airtable_stub, serve, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("CHECKSUM_INDEX", str(tmp_path / "checksums.sqlite"))
+    for name in ("NEAR_DUP_INDEX", "EXPORT_DIR", "ENRICH_CACHE", "DECISION_STORE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(formatter, "_checksum_index", None)
+    monkeypatch.setenv("SCRAPE_INCREMENTAL", "1")
+    monkeypatch.setattr(watermark, "DEFAULT_PATH", str(tmp_path / "watermarks.sqlite"))
+    http = HttpClient(bucket=TokenBucket(1000), backoff=0, sleep=lambda s: None, retries=1)
+    monkeypatch.setattr(formatter, "_airtable_writer", AirtableWriter(
+        token=airtable_stub["token"], base_id=airtable_stub["base"], table=airtable_stub["table"],
+        url=airtable_stub["url"], http=http))
+    base = serve(FormatterHandler)
+
+    def post(path, payload=None):
+        data = json.dumps(payload if payload is not None else []).encode("utf-8")
+        with urllib.request.urlopen(urllib.request.Request(f"{base}/{path}", data=data)) as resp:
+            return json.loads(resp.read())
+
+    started = post("runs/start")
+    run_id = started["run_id"]
+    assert not started["resumed"] and started["next"] == {"stage": "raw", "sources": ["cal", "laco", "sam"]}
+
+    first = post(f"format/laco?run={run_id}", LACO)
+    assert first["count"] == 3
+    # a retried workflow resumes the run and gets the same rows back
+    assert post("runs/start") == {"run_id": run_id, "resumed": True,
+                                  "next": {"stage": "raw", "sources": ["cal", "sam"]}}
+    again = post(f"format/laco?run={run_id}", LACO)
+    assert again["resumed"] and again["opportunities"] == first["opportunities"]
+    # nothing is written yet, so a new run would not drop them either
+    assert post("format/laco", LACO)["count"] == 3
+
+    with WatermarkStore(watermark.DEFAULT_PATH) as store:  # what the LACo scraper of the run staged
+        store.stage("laco", [(r["bid_id"], r["close_date"]) for r in LACO], run_id=run_id)
+
+    rows = first["opportunities"]
+    enriched = [dict(rows[0], naics_code="238160")]
+    post(f"enrich/store?run={run_id}", enriched)
+    lookup = post(f"enrich/lookup?run={run_id}", rows)
+    assert lookup["hits"] == enriched and lookup["misses"] == 2
+
+    assert len(post(f"airtable/write?run={run_id}", rows[:2])["records"]) == 2
+    with WatermarkStore(watermark.DEFAULT_PATH) as store:
+        assert sorted(store.known("laco")) == ["0", "1", "2"]
+    airtable_stub["requests"].clear()
+    retry = post(f"airtable/write?run={run_id}", rows)
+    assert retry["skipped"] == 2 and len(retry["records"]) == 1 and len(airtable_stub["requests"]) == 1
+    assert post("format/laco", LACO)["count"] == 0
+
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        post("score?run=missing-run", rows)
+    assert exc.value.code == 400
+    formatter.get_checksum_index().close()
+    monkeypatch.setattr(formatter, "_checksum_index", None)
+
+
+def test_scraper_prints_the_raw_checkpoint_of_a_resumed_run(tmp_path, monkeypatch, capsys):
+    run = RunCheckpoint.create(("cal",), str(tmp_path))
+    run.append("raw", "cal", [{"event_id": "1", "event_name": "Roofing"}])
+    run.complete("raw", "cal")
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("RUN_ID", run.run_id)
+    started = time.perf_counter()
+    asyncio.run(cal_eprocure_scraper.main())
+    assert json.loads(capsys.readouterr().out) == [{"event_id": "1", "event_name": "Roofing"}]
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,111 @@
+import io
+import json
+
+from scrapers import formatter
+from scrapers.checksum_index import ChecksumIndex, read_export_checksums
+
+
+def test_filter_new_drops_known_and_in_batch_duplicates(tmp_path):
+    path = str(tmp_path / "idx.sqlite")
+    with ChecksumIndex(path) as index:
+        index.add_many(["a"])
+        rows = [{"checksum": "a"}, {"checksum": "b"}, {"checksum": "b"}, {"checksum": "c"}]
+        assert [r["checksum"] for r in index.filter_new(rows)] == ["b", "c"]
+        assert index.filter_new(rows) == []
+        assert len(index) == 3
+
+    # Persisted across processes/runs
+    with ChecksumIndex(path) as index:
+        assert "b" in index and "z" not in index
+
+
+def test_filter_new_without_recording_and_streaming():
+    with ChecksumIndex(":memory:") as index:
+        rows = [{"checksum": str(i)} for i in range(2000)]
+        assert len(index.filter_new(rows, record=False)) == 2000
+        assert len(index) == 0
+        assert len(list(index.iter_new(iter(rows), chunk_size=300))) == 2000
+        assert index.known(r["checksum"] for r in rows) == {str(i) for i in range(2000)}
+
+
+def test_rebuild_from_airtable_exports(tmp_path):
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text("opportunity_id,checksum\n1,aaa\n2,\n3,bbb\n", encoding="utf-8")
+    json_path = tmp_path / "export.json"
+    json_path.write_text(json.dumps({"records": [{"id": "rec1", "fields": {"checksum": "ccc"}}]}))
+
+    assert list(read_export_checksums(str(csv_path))) == ["aaa", "bbb"]
+    with ChecksumIndex(":memory:") as index:
+        index.add_many(["stale"])
+        index.rebuild(read_export_checksums(str(json_path)))
+        assert index.known(["stale", "ccc"]) == {"ccc"}
+
+
+def test_formatter_consults_index_when_configured(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKSUM_INDEX", str(tmp_path / "idx.sqlite"))
+    monkeypatch.setattr(formatter, "_checksum_index", None)
+    rows = [{"event_id": "1", "event_name": "A"}, {"event_id": "2", "event_name": "B"}]
+
+    first = formatter._batch_response("cal", rows)
+    # not written to Airtable yet: the rows come back on the next run
+    assert formatter._batch_response("cal", rows)["count"] == 2
+    formatter.get_checksum_index().commit(r["checksum"] for r in first["opportunities"])
+    second = formatter._batch_response("cal", rows)
+    assert first["count"] == 2 and first["duplicates"] == 0
+    assert second["count"] == 0 and second["duplicates"] == 2
+
+    out = io.StringIO()
+    assert formatter.stream_jsonl("cal", io.StringIO(json.dumps(rows)), out, formatter.get_checksum_index()) == 0
+    formatter.get_checksum_index().close()
+    monkeypatch.setattr(formatter, "_checksum_index", None)
+
+
+def test_diff_emits_new_and_changed_rows_with_their_fields():
+    row = {"opportunity_id": "1", "title": "A", "deadline": "2025-09-01", "award_amount": None,
+           "active": True, "created_at": "2025-08-21T00:00:00.000Z", "checksum": "a"}
+    with ChecksumIndex(":memory:") as index:
+        rows, changes = index.diff([row, dict(row)])
+        assert rows == [row] and changes[0]["status"] == "new"
+        assert "created_at" not in changes[0]["fields"]
+
+        # Only the creation time moved: unchanged
+        assert index.diff([dict(row, created_at="2025-08-22T00:00:00.000Z")]) == ([], [])
+
+        amended = dict(row, deadline="2025-09-15", active=False)
+        rows, changes = index.diff([amended, {"checksum": "b", "title": "B"}])
+        assert rows == [amended, {"checksum": "b", "title": "B"}]
+        assert changes[0] == {"checksum": "a", "status": "changed", "fields": ["deadline", "active"]}
+        assert changes[1]["status"] == "new"
+        assert index.diff([amended], record=False) == ([], [])
+
+
+def test_seeded_checksums_take_their_first_fingerprint_as_baseline():
+    with ChecksumIndex(":memory:") as index:
+        index.rebuild(["a"])
+        row = {"checksum": "a", "title": "A", "deadline": "2025-09-01"}
+        assert index.diff([row]) == ([], [])
+        assert list(index.iter_changed(iter([dict(row, deadline="2025-09-02")]), chunk_size=1)) == [
+            dict(row, deadline="2025-09-02")]
+        assert list(index.fingerprints(["a", "x"])) == ["a"]
+
+
+def test_staged_rows_are_recorded_only_when_committed():
+    row = {"checksum": "a", "title": "A", "deadline": "2025-09-01"}
+    with ChecksumIndex(":memory:") as index:
+        index.rebuild(["seeded"])
+        seeded = {"checksum": "seeded", "title": "S"}
+        assert index.diff([row, seeded], record=False, stage=True) == (
+            [row], [{"checksum": "a", "status": "new", "fields": ["title", "deadline"]}])
+        # the baseline of a known checksum is stored; the new row only waits
+        assert list(index.fingerprints(["a", "seeded"])) == ["seeded"] and index.pending_count() == 1
+        assert index.diff([row], record=False, stage=True)[0] == [row]
+
+        assert index.commit(["a", "b"]) == 2
+        assert index.known(["a", "b"]) == {"a", "b"} and index.pending_count() == 0
+        assert index.diff([row], record=False, stage=True) == ([], [])
+        amended = dict(row, deadline="2025-09-15")
+        assert index.diff([amended], record=False, stage=True)[1][0]["fields"] == ["deadline"]
+        assert index.diff([amended], record=False, stage=True)[1][0]["status"] == "changed"
+
+        assert index.filter_new([{"checksum": "c"}], record=False, stage=True) == [{"checksum": "c"}]
+        assert "c" not in index and index.commit(["c"]) == 1 and "c" in index
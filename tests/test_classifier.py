@@ -0,0 +1,66 @@
+import json
+import urllib.request
+
+from scrapers.classifier import AhoCorasick, Classifier, PrefixTrie, effort_bucket, load_service_lines
+from scrapers.formatter import FormatterHandler
+
+
+def test_capacity_csv_defines_the_service_lines():
+    lines = load_service_lines()
+    assert lines[0] == "Janitorial" and "Other" in lines and len(lines) == 9
+
+
+def test_prefix_trie_prefers_the_longest_prefix():
+    trie = PrefixTrie({"56": "a", "5617": "b", "561720": "c"})
+    assert trie.longest_match("561720") == ("c", 6)
+    assert trie.longest_match("561790") == ("b", 4)
+    assert trie.longest_match(" 5699 ") == ("a", 2)
+    assert trie.longest_match(None) == (None, 0)
+
+
+def test_aho_corasick_matches_whole_words_in_one_pass():
+    ac = AhoCorasick({"he": 1, "she": 2, "hers": 3, "it": 4, "help desk": 5})
+    found = [(start, word) for start, word, _ in ac.iter_matches("She said: IT help desk, kitchen, hers")]
+    assert found == [(0, "she"), (10, "it"), (13, "help desk"), (33, "hers")]
+
+
+def test_codes_and_keywords_pick_the_service_line():
+    clf = Classifier(min_confidence=0.6)
+    strong = clf.classify({"title": "School Cleaning", "naics_code": "561720", "classification_code": "S201"})
+    assert strong.service_line == "Janitorial" and strong.confidence >= 0.8
+    assert clf.classify({"title": "Annual IT help desk services"}).service_line == "IT"
+    weak = clf.classify({"title": "Lab Coats - Embroidery"})
+    assert weak.confidence < 0.6
+    none = clf.classify({"title": "Miscellaneous"})
+    assert none.service_line == "Other" and none.confidence == 0.0
+
+
+def test_rules_outside_the_csv_are_ignored():
+    clf = Classifier(service_lines=["Construction", "Other"])
+    assert clf.classify({"title": "Janitorial services"}).service_line == "Other"
+
+
+def test_split_fills_only_empty_fields_and_defers_uncertain_rows():
+    clf = Classifier(min_confidence=0.6)
+    rows = [
+        {"title": "Roofing replacement", "service_line": None, "effort_hours": None, "effort_bucket": None},
+        {"title": "Aircraft parts supply", "classification_code": "1560", "effort_hours": 300},
+        {"title": "Lab Coats - Embroidery", "service_line": None},
+    ]
+    classified, uncertain = clf.split(rows)
+    assert [r["title"] for r in uncertain] == ["Lab Coats - Embroidery"]
+    assert uncertain[0]["service_line"] is None
+    assert classified[0]["service_line"] == "Construction" and classified[0]["effort_bucket"] == "High"
+    assert classified[1]["service_line"] == "Aviation"
+    assert classified[1]["effort_hours"] == 300 and classified[1]["effort_bucket"] == "High"
+    assert effort_bucket(50) == "Low" and effort_bucket(51) == "Medium" and effort_bucket(201) == "High"
+
+
+def test_classify_endpoint(serve):
+    base = serve(FormatterHandler)
+    rows = [{"title": "Custodial services"}, {"title": "Lab Coats"}]
+    req = urllib.request.Request(f"{base}/classify", data=json.dumps(rows).encode("utf-8"))
+    with urllib.request.urlopen(req) as resp:
+        body = json.loads(resp.read())
+    assert [r["service_line"] for r in body["classified"]] == ["Janitorial"]
+    assert [r["title"] for r in body["uncertain"]] == ["Lab Coats"]
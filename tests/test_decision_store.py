@@ -0,0 +1,128 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scrapers import decision_store, formatter
+from scrapers.airtable_writer import AirtableWriter
+from scrapers.decision_store import DecisionFlusher, DecisionStore, read_export_records
+from scrapers.formatter import FormatterHandler
+from scrapers.http_utils import HttpClient, TokenBucket
+
+
+def _writer(stub, **kw):
+    http = HttpClient(bucket=TokenBucket(1000), backoff=0, sleep=lambda s: None, retries=1)
+    kw.setdefault("token", stub["token"])
+    return AirtableWriter(base_id=stub["base"], table=stub["table"], url=stub["url"], concurrency=2, http=http, **kw)
+
+
+def _seed(stub, n):
+    return _writer(stub).write([{"checksum": f"c{i}", "title": f"Opportunity {i}"} for i in range(n)])
+
+
+def _decisions(stub):
+    return {r["fields"]["checksum"]: r["fields"].get("decision") for r in stub["records"].values()}
+
+
+def test_queue_keeps_last_decision_per_checksum(tmp_path):
+    with DecisionStore(str(tmp_path / "decisions.sqlite")) as store:
+        store.enqueue([{"checksum": "a", "decision": "Go"}, {"checksum": "b", "decision": "Go"}])
+        taken = store.pending()
+        store.enqueue([{"checksum": "a", "decision": "No Go"}])
+        assert [(c, d) for c, d, _ in store.pending()] == [("b", "Go"), ("a", "No Go")]
+        store.done(taken)
+        assert [(c, d) for c, d, _ in store.pending()] == [("a", "No Go")]
+        with pytest.raises(ValueError):
+            store.enqueue([{"checksum": "a", "decision": "Maybe"}])
+        with pytest.raises(ValueError):
+            store.enqueue([{"decision": "Go"}])
+
+
+def test_rebuild_from_exports(tmp_path):
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text("title,checksum,record_id\nA,c1,rec1\nB,,rec2\nC,c3,rec3\n", encoding="utf-8")
+    json_path = tmp_path / "export.json"
+    json_path.write_text(json.dumps({"records": [{"id": "rec9", "fields": {"checksum": "c9"}}]}), encoding="utf-8")
+    with DecisionStore(":memory:") as store:
+        store.rebuild(read_export_records(str(csv_path)))
+        assert store.record_ids(["c1", "c2", "c3"]) == {"c1": "rec1", "c3": "rec3"}
+        store.rebuild(read_export_records(str(json_path)))
+        assert len(store) == 1 and store.record_ids(["c9"]) == {"c9": "rec9"}
+
+
+def test_flush_coalesces_into_batched_updates(airtable_stub):
+    records = _seed(airtable_stub, 15)
+    with DecisionStore(":memory:") as store:
+        store.remember(records[:12])   # c12..c14 are only found through a lookup
+        for i in range(15):
+            store.enqueue([{"checksum": f"c{i}", "decision": "Go"}])
+        store.enqueue([{"checksum": "c0", "decision": "No Go"}, {"checksum": "gone", "decision": "Go"}])
+        airtable_stub["requests"].clear()
+
+        flusher = DecisionFlusher(store, _writer(airtable_stub), delay=0)
+        assert flusher.flush() == 15
+        assert sorted(airtable_stub["requests"]) == [("GET", 4), ("PATCH", 5), ("PATCH", 10)]
+        assert _decisions(airtable_stub)["c0"] == "No Go" and _decisions(airtable_stub)["c14"] == "Go"
+        assert flusher.stats == {"flushes": 1, "sent": 15, "looked_up": 3, "unknown": 1, "failures": 0}
+        assert store.pending() == [] and len(store) == 15
+
+        store.enqueue([{"checksum": "c1", "decision": "No Go"}])
+        flusher.writer = _writer(airtable_stub, token="wrong")
+        assert flusher.flush() == 0 and flusher.stats["failures"] == 1
+        assert store.pending_count() == 1
+
+
+class _Unreachable:
+    """Writer whose connection fails, like HttpClient once its retries are spent."""
+
+    def find(self, field, values):
+        raise ConnectionRefusedError("connection refused")
+
+    def update(self, records):
+        raise ConnectionRefusedError("connection refused")
+
+
+def test_flusher_survives_connection_errors_and_retries(monkeypatch):
+    monkeypatch.setattr(decision_store, "RETRY_SECONDS", 0.05)
+    with DecisionStore(":memory:") as store:
+        store.enqueue([{"checksum": "c1", "decision": "Go"}])
+        flusher = DecisionFlusher(store, _Unreachable(), delay=0).start()
+        deadline = time.time() + 5
+        while flusher.stats["failures"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert flusher.stats["failures"] >= 2 and flusher._thread.is_alive()
+        assert store.pending_count() == 1
+        flusher.stop()
+
+
+def test_decisions_endpoint_acknowledges_and_writes_behind(airtable_stub, serve, tmp_path, monkeypatch):
+    monkeypatch.setenv("DECISION_STORE", str(tmp_path / "decisions.sqlite"))
+    monkeypatch.setattr(formatter, "_decision_store", None)
+    monkeypatch.setattr(formatter, "_airtable_writer", _writer(airtable_stub))
+    base = serve(FormatterHandler)
+
+    def post(path, payload):
+        req = urllib.request.Request(f"{base}/{path}", data=json.dumps(payload).encode("utf-8"))
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+
+    post("airtable/write", [{"checksum": "c1", "title": "Roofing"}])
+    flusher = DecisionFlusher(formatter.get_decision_store(), formatter.get_airtable_writer(), delay=0.05)
+    monkeypatch.setattr(formatter, "_decision_flusher", flusher.start())
+    try:
+        body = post("decisions", [{"checksum": "c1", "decision": "Go"}])
+        assert body["queued"] == 1
+        for _ in range(100):
+            if _decisions(airtable_stub)["c1"] == "Go":
+                break
+            time.sleep(0.02)
+        assert _decisions(airtable_stub)["c1"] == "Go" and flusher.stats["looked_up"] == 0
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            post("decisions", [{"checksum": "c1", "decision": "Later"}])
+        assert exc.value.code == 400
+    finally:
+        flusher.stop()
+        formatter.get_decision_store().close()
+        monkeypatch.setattr(formatter, "_decision_store", None)
@@ -0,0 +1,131 @@
+import asyncio
+
+from scrapers import cal_eprocure_scraper, detail_crawler
+from scrapers.cal_eprocure_scraper import detail_url as cal_detail_url
+from scrapers.detail_crawler import DetailCache, DetailCrawler, parse_detail
+from scrapers.formatter import format_opportunities_cal, format_opportunities_laco
+from scrapers.lacobids_scraper import detail_url as laco_detail_url
+
+PAGES = {
+    "https://cal/event/1": {"Event Start Date": "08/01/2025", "Estimated Value": "$25,000",
+                            "NAICS Code": "561720 - Janitorial Services", "Description": "Clean offices"},
+    "https://cal/event/2": {"Published Date": "08/02/2025", "NAICS": "n/a"},
+}
+
+
+class _Browser:
+    def __init__(self, pages=PAGES, fail=()):
+        self.pages, self.fail = pages, set(fail)
+        self.visits, self.contexts = [], 0
+        self.in_flight, self.peak = 0, 0
+
+    async def new_context(self):
+        self.contexts += 1
+        return _Context(self)
+
+
+class _Context:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        return _Page(self.browser)
+
+    async def close(self):
+        pass
+
+
+class _Page:
+    def __init__(self, browser):
+        self.browser, self.url = browser, None
+
+    async def goto(self, url, timeout=None):
+        browser = self.browser
+        browser.visits.append(url)
+        browser.in_flight += 1
+        browser.peak = max(browser.peak, browser.in_flight)
+        await asyncio.sleep(0.01)
+        browser.in_flight -= 1
+        if url in browser.fail:
+            raise TimeoutError("detail page timed out")
+        self.url = url
+
+    async def evaluate(self, script):
+        return self.browser.pages.get(self.url, {})
+
+    async def close(self):
+        pass
+
+
+def _rows():
+    return [
+        {"event_id": "1", "event_name": "Janitorial", "status": "Posted", "link": "https://cal/event/1"},
+        {"event_id": "2", "event_name": "IT", "status": "Posted", "link": "https://cal/event/2",
+         "posted_date": "07/30/2025"},
+    ]
+
+
+def _enrich(browser, cache, rows, **kw):
+    crawler = DetailCrawler(browser, cache, **kw)
+    asyncio.run(crawler.enrich(rows, "cal", key="event_id", status="status", url=lambda r: r["link"]))
+    return crawler
+
+
+def test_parse_detail_maps_labels_and_naics():
+    assert parse_detail(PAGES["https://cal/event/1"]) == {
+        "estimated_value": "$25,000", "posted_date": "08/01/2025", "naics_code": "561720",
+        "description": "Clean offices"}
+    assert parse_detail(PAGES["https://cal/event/2"]) == {"posted_date": "08/02/2025"}
+
+
+def test_enrich_fills_empty_fields_and_caches_by_status():
+    with DetailCache(":memory:") as cache:
+        browser = _Browser()
+        rows = _rows()
+        crawler = _enrich(browser, cache, rows)
+        assert rows[0]["naics_code"] == "561720" and rows[0]["estimated_value"] == "$25,000"
+        assert rows[1]["posted_date"] == "07/30/2025"   # the list page wins
+        assert crawler.stats == {"cached": 0, "fetched": 2, "errors": 0, "filled": 4}
+
+        normalized = format_opportunities_cal(rows)[0]
+        assert normalized["posted_date"] == "08/01/2025" and normalized["naics_code"] == "561720"
+
+        # Same status: served from cache; changed status: fetched again
+        rows = _rows()
+        rows[1]["status"] = "Closed"
+        crawler = _enrich(browser, cache, rows)
+        assert crawler.stats["cached"] == 1 and crawler.stats["fetched"] == 1
+        assert browser.visits == ["https://cal/event/1", "https://cal/event/2", "https://cal/event/2"]
+        assert rows[0]["description"] == "Clean offices" and len(cache) == 2
+
+
+def test_per_host_limit_and_failures():
+    pages = {f"https://cal/event/{i}": {"Posted Date": "08/01/2025"} for i in range(10)}
+    browser = _Browser(pages, fail={"https://cal/event/3"})
+    rows = [{"event_id": str(i), "status": "Posted", "link": f"https://cal/event/{i}"} for i in range(10)]
+    with DetailCache(":memory:") as cache:
+        crawler = _enrich(browser, cache, rows, contexts=4, per_host=2)
+        assert browser.peak == 2 and browser.contexts == 4
+        assert crawler.stats["errors"] == 1 and crawler.stats["fetched"] == 9
+        assert "posted_date" not in rows[3] and len(cache) == 9
+
+
+def test_scrapers_wire_detail_urls(tmp_path, monkeypatch):
+    assert cal_detail_url({"link": "https://caleprocure.ca.gov/event/undefined/1"}) is None
+    monkeypatch.setattr(cal_eprocure_scraper, "BASE_URL", "http://127.0.0.1:8800")
+    assert cal_eprocure_scraper.with_link({"event_id": "1"})["link"] == "http://127.0.0.1:8800/event/undefined/1"
+    assert laco_detail_url({"bid_id": "42"}).endswith("bidId=42") and laco_detail_url({}) is None
+    assert format_opportunities_laco([{"bid_id": "42", "title": "Roofing", "close_date": "Continuous",
+                                       "naics_code": "238160"}])[0]["naics_code"] == "238160"
+
+    rows = _rows()
+    monkeypatch.delenv("SCRAPE_DETAILS", raising=False)
+    assert asyncio.run(detail_crawler.maybe_enrich(_Browser(), rows, "cal", "event_id", "status",
+                                                   cal_detail_url)) == _rows()
+    monkeypatch.setenv("SCRAPE_DETAILS", "1")
+    monkeypatch.setattr(detail_crawler, "DEFAULT_CACHE", str(tmp_path / "details.sqlite"))
+    asyncio.run(detail_crawler.maybe_enrich(_Browser(), rows, "cal", "event_id", "status", cal_detail_url))
+    assert rows[0]["naics_code"] == "561720"
@@ -0,0 +1,87 @@
+import json
+import urllib.request
+
+from scrapers import formatter
+from scrapers.enrichment_cache import EnrichmentCache, estimate_tokens, fingerprint, pack_batches
+
+ROW = {"checksum": "c1", "title": "Roof repair", "agency": "DPW", "deadline": "2025-08-25",
+       "naics_code": None, "service_line": None, "effort_hours": None, "effort_bucket": None}
+
+
+def _enriched(row, **fields):
+    return {**row, "naics_code": "238160", "service_line": "Construction", "effort_hours": 120,
+            "effort_bucket": "Medium", "token_cost": 0.0004, **fields}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hits_restore_fields_and_content_changes_miss(tmp_path):
+    path = str(tmp_path / "enrich.sqlite")
+    with EnrichmentCache(path) as cache:
+        assert cache.store([_enriched(ROW)]) == 1
+    # The model's own fields are not part of the fingerprint
+    assert fingerprint(ROW) == fingerprint(_enriched(ROW))
+
+    with EnrichmentCache(path) as cache:
+        changed = {**ROW, "checksum": "c1", "deadline": "2025-09-30"}
+        hits, misses = cache.lookup([dict(ROW), changed, {"title": "no checksum"}])
+        assert [h["service_line"] for h in hits] == ["Construction"]
+        assert hits[0]["effort_bucket"] == "Medium" and hits[0]["naics_code"] == "238160"
+        assert misses[0] is changed and len(misses) == 2
+        assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2
+
+
+def test_age_and_size_eviction():
+    clock = _Clock()
+    with EnrichmentCache(":memory:", max_entries=3, max_age_days=1, clock=clock) as cache:
+        cache.store([_enriched({**ROW, "checksum": f"c{i}"}) for i in range(3)])
+        clock.now += 10
+        cache.lookup([{**ROW, "checksum": "c0"}])       # c0 becomes most recently used
+        cache.store([_enriched({**ROW, "checksum": "c3"})])
+        assert len(cache) == 3
+        hits, _ = cache.lookup([{**ROW, "checksum": c} for c in ("c0", "c1", "c2", "c3")])
+        assert {h["checksum"] for h in hits} == {"c0", "c2", "c3"}
+
+        clock.now += 2 * 86400                           # everything is now stale
+        assert cache.lookup([{**ROW, "checksum": "c3"}])[0] == []
+        assert cache.evict() == 3 and len(cache) == 0
+        assert cache.stats["evicted"] == 4
+
+
+def test_pack_batches_fills_the_token_budget():
+    rows = [{"title": "x" * 396} for _ in range(10)]        # ~100 tokens each
+    assert estimate_tokens(rows[0]) > 100
+    assert [len(b) for b in pack_batches(rows, max_tokens=350)] == [3, 3, 3, 1]
+    assert [len(b) for b in pack_batches(rows, max_tokens=10_000, max_items=4)] == [4, 4, 2]
+    assert pack_batches([{"title": "y" * 5000}], max_tokens=10) == [[{"title": "y" * 5000}]]
+
+
+def test_enrich_endpoints(serve, tmp_path, monkeypatch):
+    monkeypatch.setenv("ENRICH_CACHE", str(tmp_path / "e.sqlite"))
+    monkeypatch.setattr(formatter, "_enrichment_cache", None)
+    base = serve(formatter.FormatterHandler)
+
+    def post(path, rows):
+        req = urllib.request.Request(base + path, data=json.dumps(rows).encode("utf-8"))
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+
+    first = post("/enrich/lookup", [ROW])
+    assert first["hits"] == [] and first["batches"] == [{"data": [ROW]}]
+    assert post("/enrich/store", [_enriched(ROW)]) == {"stored": 1}
+    second = post("/enrich/lookup", [ROW])
+    assert second["hits"][0]["service_line"] == "Construction" and second["batches"] == []
+    formatter.get_enrichment_cache().close()
+
+
+def test_enrich_lookup_without_cache_sends_everything(monkeypatch):
+    monkeypatch.delenv("ENRICH_CACHE", raising=False)
+    resp = formatter.enrich_lookup([ROW, ROW])
+    assert resp["misses"] == 2 and resp["batches"] == [{"data": [ROW, ROW]}]
+    assert formatter.enrich_store([ROW]) == {"stored": 0}
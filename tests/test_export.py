@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from scrapers import formatter
+from scrapers.export import OpportunityStore, zone_map
+from scrapers.formatter import CANONICAL_FIELDS, Opportunity, compile_mapping, iter_records, LACO_SPEC
+
+
+def _row(i, deadline, line, agency="LA County", **extra):
+    return dict(Opportunity(opportunity_id=str(i), title=f"Bid {i}", deadline=deadline, service_line=line,
+                            agency=agency, active=True, score=50, award_amount=1234.5, checksum=f"c{i}").to_dict(),
+                **extra)
+
+
+def test_opportunity_record_round_trips_and_uses_slots():
+    raw = [{"bid_id": "1", "title": "Janitorial", "close_date": "Continuous"}]
+    record = next(iter_records("laco", raw))
+    assert record.to_dict() == formatter.format_opportunities_laco(raw)[0]
+    assert tuple(record.to_dict()) == CANONICAL_FIELDS
+    assert Opportunity.from_dict(record.to_dict()) == record
+    assert not hasattr(record, "__dict__")
+    assert "_new_record()" in compile_mapping(LACO_SPEC, record=True).__source__
+    with pytest.raises(TypeError):
+        Opportunity(bogus=1)
+    with pytest.raises(ValueError):
+        iter_records("nope", [])
+
+
+def test_write_and_scan_with_partition_and_zone_map_pruning(tmp_path):
+    store = OpportunityStore(str(tmp_path))
+    store.write("laco", [_row(1, "2025-09-01", "Janitorial"), _row(2, "2025-09-20", "IT", extra=None)],
+                ingest_date="2025-08-20")
+    store.write("sam", [_row(3, "2025-12-01", "IT", agency="GSA")], ingest_date="2025-08-21")
+    part = store.write("sam", [_row(4, None, "Janitorial", agency="GSA")], ingest_date="2025-08-21")
+    assert part.endswith(".csv.gz") and "source=sam" in part and "ingest_date=2025-08-21" in part
+    assert store.write("sam", []) is None
+
+    everything = list(store.scan())
+    assert [r.opportunity_id for r in everything] == ["1", "2", "3", "4"]
+    first = everything[0]
+    assert first.active is True and first.score == 50 and first.award_amount == 1234.5
+    assert first.naics_code is None and first == Opportunity.from_dict(_row(1, "2025-09-01", "Janitorial"))
+
+    reader = OpportunityStore(str(tmp_path))
+    found = list(reader.scan(deadline_from="2025-09-10", deadline_to="2025-10-31"))
+    assert [r.opportunity_id for r in found] == ["2"]
+    assert reader.stats["parts_skipped"] == 2 and reader.stats["parts_scanned"] == 1
+
+    assert [r.opportunity_id for r in store.scan(service_line="IT", agency=["GSA"])] == ["3"]
+    assert [r.opportunity_id for r in store.scan(source="laco", ingest_to="2025-08-20")] == ["1", "2"]
+    assert list(store.scan(source="cal")) == []
+
+
+def test_zone_map_and_compact_encoding(tmp_path):
+    rows = [_row(i, f"2025-09-{1 + i % 28:02d}", "IT") for i in range(200)]
+    zone = zone_map([Opportunity.from_dict(r) for r in rows])
+    assert zone == {"rows": 200, "deadline": ["2025-09-01", "2025-09-28"], "service_line": ["IT"],
+                    "agency": ["LA County"]}
+
+    path = OpportunityStore(str(tmp_path)).write("cal", rows)
+    assert os.path.getsize(path) * 10 < len(json.dumps(rows))
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        assert fh.readline().strip().split(",") == list(CANONICAL_FIELDS)
+
+
+def test_formatter_exports_batches_when_configured(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXPORT_DIR", str(tmp_path))
+    monkeypatch.delenv("CHECKSUM_INDEX", raising=False)
+    monkeypatch.setattr(formatter, "_opportunity_store", None)
+    formatter._batch_response("laco", [{"bid_id": "7", "title": "Roofing", "close_date": "2025-09-30"}])
+    assert [r.title for r in formatter.get_opportunity_store().scan(source="laco")] == ["Roofing"]
+    monkeypatch.setattr(formatter, "_opportunity_store", None)
@@ -1,4 +1,6 @@
 from scrapers.formatter import format_opportunities_laco
+from scrapers.interception import map_record
+from scrapers.lacobids_scraper import LACO_FIELDS
 
 def test_format_laco_minimal():
     raw = [{
@@ -15,3 +17,10 @@ def test_format_laco_minimal():
     assert row["opportunity_id"] == "2581315240139"
     assert row["type"] == "Solicitation"
     assert row["active"] is True
+
+
+def test_format_laco_xhr_bid_without_close_date():
+    raw = map_record({"BidNumber": "RFB-1", "BidId": "77", "BidTitle": "Fencing"}, LACO_FIELDS)
+    assert raw["close_date"] is None
+    row = format_opportunities_laco([raw])[0]
+    assert row["opportunity_id"] == "77" and row["deadline"] == ""
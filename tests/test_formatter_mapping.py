@@ -0,0 +1,81 @@
+import pytest
+
+from scrapers.formatter import (
+    CANONICAL_FIELDS,
+    compile_mapping,
+    const,
+    derived,
+    format_opportunities_cal,
+    format_opportunities_laco,
+    format_opportunities_sam,
+    generate_hash,
+    source,
+    utc_now,
+)
+
+
+def test_all_normalizers_emit_canonical_key_order():
+    rows = (
+        format_opportunities_cal([{"event_id": "1"}])
+        + format_opportunities_laco([{"bid_id": "2"}])
+        + format_opportunities_sam([{"noticeId": "3"}])
+    )
+    for row in rows:
+        assert tuple(row) == CANONICAL_FIELDS
+
+
+def test_cal_fallback_keys_and_falsy_values():
+    row = format_opportunities_cal([{
+        "opportunity_id": "X1", "title": "Roofing", "department": "CAL FIRE",
+        "active": False, "score": 0, "end_date": "",
+    }])[0]
+    assert row["opportunity_id"] == "X1"
+    assert row["agency"] == "CAL FIRE"
+    assert row["active"] is False          # kept as-is when present
+    assert row["score"] is None            # `or None` coercion
+    assert row["deadline"] is None
+    assert row["checksum"] == generate_hash("X1|Roofing")
+
+
+def test_laco_deadline_and_service_line():
+    rows = format_opportunities_laco([
+        {"bid_id": "1", "title": "A", "close_date": " Continuous ", "type": ""},
+        {"bid_id": "2", "title": "B", "type": "Construction"},
+    ])
+    assert rows[0]["deadline"] == "" and rows[0]["service_line"] is None
+    assert rows[1]["deadline"] == "" and rows[1]["service_line"] == "Construction"
+    assert rows[0]["created_at"].endswith("Z")
+
+
+def test_sam_award_unwrapping():
+    rows = format_opportunities_sam([
+        {"noticeId": "A", "active": "No", "award": None},
+        {"noticeId": "B", "award": {"amount": 10, "awardee": {"name": "ACME", "cageCode": "C1"}}},
+    ])
+    assert rows[0]["active"] is False and rows[0]["award_amount"] is None
+    assert rows[1]["award_amount"] == 10
+    assert rows[1]["awardee_name"] == "ACME" and rows[1]["awardee_uei"] is None
+
+
+def test_compile_mapping_for_a_new_source():
+    mapper = compile_mapping({
+        "opportunity_id": source("ref"),
+        "title": source("name", "label", coalesce=True, transform=str.upper),
+        "agency": source("org.unit.name"),
+        "type": const("Grant"),
+        "created_at": utc_now(),
+        "checksum": derived(lambda i, t: f"{i}:{t}", "opportunity_id", "title"),
+    }, "iter_grants")
+
+    row = next(mapper([{"ref": "G1", "label": "trees", "org": {"unit": {"name": "Parks"}}}]))
+    assert row["title"] == "TREES"
+    assert row["agency"] == "Parks"
+    assert row["type"] == "Grant"
+    assert row["checksum"] == "G1:TREES"
+    assert row["token_cost"] is None
+    assert "def iter_grants" in mapper.__source__
+
+
+def test_compile_mapping_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        compile_mapping({"nope": const(1)})
@@ -0,0 +1,74 @@
+import io
+import json
+
+from scrapers.formatter import (
+    _parse_date_string,
+    parse_cache_info,
+    parse_dates_and_money,
+    run_batch,
+    serve_jsonl,
+    to_iso_date,
+    to_iso_datetime,
+    to_money,
+)
+
+PACIFIC = "America/Los_Angeles"
+
+
+def test_source_formats_are_timezone_correct():
+    # CAL: explicit abbreviation, DST-aware
+    assert to_iso_datetime("08/21/2025 1:00PM PDT") == "2025-08-21T20:00:00.000Z"
+    assert to_iso_datetime("01/15/2025 9:00AM PST") == "2025-01-15T17:00:00.000Z"
+    # A late deadline keeps its own calendar day
+    assert to_iso_date("08/21/2025 11:30PM PDT") == "2025-08-21"
+    # LACo: naive wall time in the portal's zone
+    assert to_iso_datetime("8/25/2025 12:00 PM", PACIFIC) == "2025-08-25T19:00:00.000Z"
+    assert to_iso_datetime("1/2/2025 12:00 AM", PACIFIC) == "2025-01-02T08:00:00.000Z"
+    # SAM: ISO strings with offsets or plain dates
+    assert to_iso_date("2025-08-25T17:00:00-04:00") == "2025-08-25"
+    assert to_iso_datetime("2025-08-25T17:00:00-04:00") == "2025-08-25T21:00:00.000Z"
+    assert to_iso_date("2025-08-20") == "2025-08-20"
+    assert to_iso_datetime("2025-08-21T12:00:00Z") == "2025-08-21T12:00:00.000Z"
+    # Day-first only when the first part cannot be a month
+    assert to_iso_date("25/08/2025") == "2025-08-25"
+    assert to_iso_date(1724544000) == "2024-08-25"
+
+
+def test_unparseable_values_pass_through():
+    for value in ("Continuous", "", None, "TBD", "08/21/2025 1:00PM XYZ"):
+        assert to_iso_date(value) == value
+        assert to_iso_datetime(value) == value
+
+
+def test_money_parsing_matches_the_js_node():
+    assert to_money("$1,234.50") == 1234.5
+    assert to_money("$2,000") == 2000 and isinstance(to_money("$2,000"), int)
+    assert to_money("1.2.3") == 1.2
+    assert to_money(1000.5) == 1000.5
+    assert to_money("n/a") == "n/a" and to_money("") == "" and to_money(None) is None
+
+
+def test_repeated_strings_hit_the_cache():
+    _parse_date_string.cache_clear()
+    rows = [{"deadline": "08/21/2025 1:00PM PDT", "created_at": "2025-08-21T12:00:00Z",
+             "award_amount": "$10"} for _ in range(50)]
+    out = parse_dates_and_money("cal", rows)
+    assert out[0]["deadline"] == "2025-08-21"
+    assert out[-1]["created_at"] == "2025-08-21T12:00:00.000Z"
+    assert out[0]["award_amount"] == 10
+    info = parse_cache_info()["dates"]
+    assert info["misses"] == 2 and info["hits"] == 98
+
+
+def test_parse_is_opt_in_for_batches():
+    row = {"bid_id": "9", "title": "T", "close_date": " 8/25/2025 12:00 PM "}
+    plain, _ = run_batch("laco", [row])
+    parsed, _ = run_batch("laco", [row], parse=True)
+    assert plain[0]["deadline"] == "8/25/2025 12:00 PM"
+    assert parsed[0]["deadline"] == "2025-08-25"
+    assert parsed[0]["created_at"].endswith(".000Z")
+
+    instream = io.StringIO(json.dumps({"id": 1, "source": "laco", "rows": [row], "parse": True}) + "\n")
+    outstream = io.StringIO()
+    serve_jsonl(instream, outstream)
+    assert json.loads(outstream.getvalue())["opportunities"][0]["deadline"] == "2025-08-25"
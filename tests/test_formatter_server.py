@@ -0,0 +1,63 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from scrapers.formatter import make_http_server, run_batch, serve_jsonl
+
+CAL_ROW = {"event_id": "0001", "event_name": "Janitorial Services", "end_date": "08/21/2025 1:00PM PDT"}
+
+
+def test_run_batch_reports_latency():
+    out, latency_ms = run_batch("CAL", [CAL_ROW])
+    assert out[0]["opportunity_id"] == "0001"
+    assert latency_ms >= 0
+
+
+def test_serve_jsonl_handles_many_batches_and_errors():
+    requests = [
+        {"id": 1, "source": "cal", "rows": [CAL_ROW]},
+        {"id": 2, "source": "nope", "rows": []},
+        {"id": 3, "source": "laco", "rows": [{"bid_id": "9", "title": "T", "close_date": "Continuous"}]},
+    ]
+    instream = io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n\n")
+    outstream = io.StringIO()
+    serve_jsonl(instream, outstream)
+
+    responses = [json.loads(line) for line in outstream.getvalue().splitlines()]
+    assert [r["id"] for r in responses] == [1, 2, 3]
+    assert responses[0]["count"] == 1 and "latency_ms" in responses[0]
+    assert "unknown source" in responses[1]["error"]
+    assert responses[2]["opportunities"][0]["deadline"] == ""
+
+
+def test_http_server_formats_batches():
+    server = make_http_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        req = urllib.request.Request(
+            f"{base}/format/cal",
+            data=json.dumps([CAL_ROW] * 3).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req) as resp:
+            assert resp.headers["X-Latency-Ms"]
+            body = json.loads(resp.read())
+        assert body["count"] == 3
+        assert body["opportunities"][0]["title"] == "Janitorial Services"
+
+        with urllib.request.urlopen(f"{base}/health") as resp:
+            assert json.loads(resp.read()) == {"status": "ok"}
+
+        bad = urllib.request.Request(f"{base}/format/xyz", data=b"[]")
+        try:
+            urllib.request.urlopen(bad)
+            assert False, "expected HTTP 400"
+        except urllib.error.HTTPError as exc:
+            assert exc.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,60 @@
+import io
+import json
+
+import pytest
+
+from scrapers.formatter import (
+    format_opportunities_sam,
+    iter_json_rows,
+    iter_opportunities_laco,
+    stream_jsonl,
+)
+
+ROWS = [{"noticeId": f"N{i}", "title": f"Título {i}", "active": "Yes", "award": {"amount": i}} for i in range(50)]
+
+
+def test_iter_json_rows_reads_array_across_chunk_boundaries():
+    text = "  \n" + json.dumps(ROWS, ensure_ascii=False, indent=1)
+    rows = list(iter_json_rows(io.StringIO(text), chunk_size=7))
+    assert rows == ROWS
+
+
+def test_iter_json_rows_reads_jsonl_across_chunk_boundaries():
+    text = "\n".join(json.dumps(r, ensure_ascii=False) for r in ROWS) + "\n\n"
+    rows = list(iter_json_rows(io.StringIO(text), chunk_size=11))
+    assert rows == ROWS
+
+
+def test_iter_json_rows_empty_and_broken_input():
+    assert list(iter_json_rows(io.StringIO("   "))) == []
+    assert list(iter_json_rows(io.StringIO("[]"))) == []
+    with pytest.raises(ValueError):
+        list(iter_json_rows(io.StringIO('[{"a": 1},'), chunk_size=4))
+
+
+def test_iter_opportunities_is_lazy():
+    consumed = []
+
+    def source():
+        for i in range(3):
+            consumed.append(i)
+            yield {"bid_id": str(i), "title": "T", "close_date": "8/25/2025 12:00 PM"}
+
+    gen = iter_opportunities_laco(source())
+    first = next(gen)
+    assert first["opportunity_id"] == "0"
+    assert consumed == [0]
+
+
+def test_stream_jsonl_matches_batch_normalizer():
+    out = io.StringIO()
+    count = stream_jsonl("sam", io.StringIO(json.dumps(ROWS)), out)
+    streamed = [json.loads(line) for line in out.getvalue().splitlines()]
+    batch = format_opportunities_sam(ROWS)
+    assert count == len(ROWS)
+    for a, b in zip(streamed, batch):
+        a.pop("created_at"), b.pop("created_at")
+        assert a == b
+
+    with pytest.raises(ValueError):
+        stream_jsonl("xyz", io.StringIO("[]"), io.StringIO())
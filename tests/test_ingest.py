@@ -0,0 +1,93 @@
+import asyncio
+import io
+import json
+import time
+
+import pytest
+
+from scrapers import ingest
+from scrapers.checksum_index import ChecksumIndex
+
+
+def _delayed(rows, delay, batches=1):
+    async def producer(emit):
+        for _ in range(batches):
+            await asyncio.sleep(delay)
+            await emit(rows)
+    return producer
+
+
+def test_run_merges_sources_concurrently():
+    producers = {
+        "cal": _delayed([{"event_id": "1", "event_name": "A"}], 0.2),
+        "laco": _delayed([{"bid_id": "2", "title": "B", "close_date": "Continuous"}], 0.2, batches=2),
+        "sam": _delayed([{"noticeId": "3", "title": "C", "active": "Yes"}], 0.2),
+    }
+    out = io.StringIO()
+    started = time.perf_counter()
+    stats = asyncio.run(ingest.run(producers, out, queue_size=1))
+    elapsed = time.perf_counter() - started
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(r["opportunity_id"] for r in rows) == ["1", "2", "2", "3"]
+    assert stats["laco"] == {"rows_in": 2, "rows_out": 2, "seconds": stats["laco"]["seconds"], "error": None}
+    assert elapsed < 0.55  # ~ slowest source (0.4s), not the sum (0.8s)
+
+
+def test_run_isolates_failing_source_and_dedups():
+    async def broken(emit):
+        raise RuntimeError("portal down")
+
+    rows = [{"event_id": "1", "event_name": "A"}, {"event_id": "1", "event_name": "A"}]
+    out = io.StringIO()
+    with ChecksumIndex(":memory:") as index:
+        stats = asyncio.run(ingest.run({"cal": _delayed(rows, 0), "laco": broken}, out, index=index))
+    assert stats["cal"]["rows_in"] == 2 and stats["cal"]["rows_out"] == 1
+    assert stats["laco"]["error"] == "RuntimeError: portal down"
+
+
+def test_producers_wrap_scrapers_and_sam(monkeypatch):
+    async def fake_scrape(browser):
+        return [{"browser": browser}]
+
+    monkeypatch.setattr(ingest.cal_eprocure_scraper, "scrape", fake_scrape)
+    monkeypatch.setattr(ingest.lacobids_scraper, "scrape", fake_scrape)
+    monkeypatch.setattr(ingest.sam_client, "fetch_notices", lambda **kw: {"opportunitiesData": [{"noticeId": "9"}]})
+
+    producers = ingest.browser_producers("shared", ("cal", "laco"))
+    emitted = []
+
+    async def emit(rows):
+        emitted.append(rows)
+
+    async def scenario():
+        await producers["cal"](emit)
+        await producers["laco"](emit)
+        await ingest.sam_producer(emit)
+
+    asyncio.run(scenario())
+    assert emitted == [[{"browser": "shared"}], [{"browser": "shared"}], [{"noticeId": "9"}]]
+
+
+def test_consumer_failure_cancels_the_producers(monkeypatch):
+    def broken(rows):
+        raise ValueError("bad row")
+
+    monkeypatch.setitem(ingest.STREAMERS, "cal", broken)
+    cancelled = []
+
+    async def cal(emit):
+        try:
+            while True:  # blocks on the full queue once the consumer is gone
+                await emit([{"event_id": "1"}])
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        with pytest.raises(ValueError):
+            await ingest.run({"cal": cal}, io.StringIO(), queue_size=1)
+        assert cancelled == [True]
+        assert [t for t in asyncio.all_tasks() if t is not asyncio.current_task()] == []
+
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+from scrapers.interception import (
+    ResponseCapture,
+    best_records,
+    block_heavy_resources,
+    iter_record_lists,
+    map_record,
+    should_block,
+)
+from scrapers.lacobids_scraper import LACO_FIELDS
+
+BIDS = [
+    {"BidId": 2581315240139, "BidNumber": "RFB-IS-26200090", "BidTitle": " Lab Coats ",
+     "BidType": "Commodity / Service", "DepartmentName": "Internal Services",
+     "CloseDate": "8/25/2025 12:00 PM"},
+    {"bid_id": "42", "bid_title": "Roofing", "close_date": "Continuous"},
+]
+
+
+def test_should_block_only_heavy_resources():
+    assert should_block("image") and should_block("font") and should_block("stylesheet")
+    assert not should_block("xhr") and not should_block("document")
+
+
+def test_map_record_matches_keys_loosely():
+    row = map_record(BIDS[0], LACO_FIELDS)
+    assert row["bid_id"] == "2581315240139"
+    assert row["title"] == "Lab Coats"
+    assert row["commodity"] is None
+    assert list(row) == list(LACO_FIELDS)
+    assert map_record(BIDS[1], LACO_FIELDS)["title"] == "Roofing"
+
+
+def test_best_records_finds_nested_and_string_wrapped_lists():
+    payloads = [
+        {"departments": [{"Id": 1, "Name": "ISD"}]},           # lookup list, no titles
+        {"d": json.dumps({"Result": {"Bids": BIDS}})},         # ASP.NET string wrapper
+    ]
+    assert len(list(iter_record_lists(payloads[1]))) == 1
+    rows = best_records(payloads, LACO_FIELDS, required=("bid_id", "title"))
+    assert [r["bid_id"] for r in rows] == ["2581315240139", "42"]
+    assert best_records([{"x": [{"a": 1}]}], LACO_FIELDS, ("bid_id",)) == []
+
+
+class _FakeRequest:
+    def __init__(self, resource_type):
+        self.resource_type = resource_type
+
+
+class _FakeResponse:
+    def __init__(self, url, body, resource_type="xhr", ctype="application/json"):
+        self.url, self._body = url, body
+        self.request = _FakeRequest(resource_type)
+        self.headers = {"content-type": ctype}
+
+    async def json(self):
+        return json.loads(self._body)
+
+    async def text(self):
+        return self._body
+
+
+class _FakeRoute:
+    def __init__(self, resource_type):
+        self.request = _FakeRequest(resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class _FakePage:
+    def __init__(self):
+        self.handlers = {}
+        self.routes = []
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+
+def test_response_capture_collects_json_xhr_only():
+    async def scenario():
+        page = _FakePage()
+        capture = ResponseCapture(page, url_hint="BidLookUp")
+        emit = page.handlers["response"]
+        emit(_FakeResponse("https://x/BidLookUp/GetBids", json.dumps(BIDS)))
+        emit(_FakeResponse("https://x/bidlookup/raw", json.dumps({"rows": BIDS}), ctype="text/plain"))
+        emit(_FakeResponse("https://x/BidLookUp/broken", "<html>", ctype="text/html"))
+        emit(_FakeResponse("https://x/other", json.dumps(BIDS)))
+        emit(_FakeResponse("https://x/BidLookUp/logo.png", "", resource_type="image"))
+        rows = await capture.records(LACO_FIELDS, required=("bid_id", "title"))
+        return capture, rows
+
+    capture, rows = asyncio.run(scenario())
+    assert len(capture.payloads) == 2
+    assert len(rows) == 2
+
+
+def test_block_heavy_resources_routes_requests():
+    async def scenario():
+        page = _FakePage()
+        await block_heavy_resources(page)
+        _, handler = page.routes[0]
+        img, xhr = _FakeRoute("image"), _FakeRoute("xhr")
+        await handler(img)
+        await handler(xhr)
+        return img.outcome, xhr.outcome
+
+    assert asyncio.run(scenario()) == ("abort", "continue")
@@ -0,0 +1,97 @@
+import json
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from scrapers import metrics
+from scrapers.formatter import FormatterHandler
+from scrapers.metrics import Registry
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_spans_and_counters():
+    clock = _Clock()
+    registry = Registry(clock=clock)
+    with registry.span("goto", source="laco"):
+        clock.now += 2.0
+    with pytest.raises(RuntimeError):
+        with registry.span("goto", source="laco"):
+            clock.now += 3.0
+            raise RuntimeError("timeout")
+    registry.count("rows_in", 20, source="laco")
+    registry.count("rows_in", 5, source="laco")
+    registry.count("errors", source="laco", stage="scrape")
+
+    snap = registry.snapshot("laco")
+    assert snap["spans"] == [{"span": "goto", "labels": {"source": "laco"}, "count": 2, "seconds": 5.0, "max": 3.0}]
+    assert {c["name"]: c["value"] for c in snap["counters"]} == {"errors": 1, "rows_in": 25}
+
+    text = registry.to_prometheus("laco")
+    assert 'gov_span_seconds_sum{job="laco",source="laco",span="goto"} 5.0' in text
+    assert 'gov_span_seconds_max{job="laco",source="laco",span="goto"} 3.0' in text
+    assert 'gov_rows_in_total{job="laco",source="laco"} 25' in text
+    assert "# TYPE gov_errors_total counter" in text
+    registry.reset()
+    assert registry.snapshot("laco")["spans"] == []
+
+
+def test_flush_writes_prom_json_and_history(tmp_path, monkeypatch, capsys):
+    registry = Registry()
+    registry.count("rows_out", 3, source='we"ird')
+    monkeypatch.delenv("METRICS_DIR", raising=False)
+    assert registry.flush("cal") is None
+
+    path = registry.flush("cal", str(tmp_path))
+    registry.flush("cal", str(tmp_path))  # nothing new: no history line
+    registry.count("rows_out", 2, source='we"ird')
+    registry.flush("cal", str(tmp_path))
+    assert json.loads(open(path).read())["counters"][0]["value"] == 5
+    assert 'source="we\\"ird"' in (tmp_path / "cal.prom").read_text()
+    history = [json.loads(line) for line in (tmp_path / "cal.history.jsonl").read_text().splitlines()]
+    assert [h["counters"][0]["value"] for h in history] == [3, 2]
+
+    monkeypatch.setattr(sys, "argv", ["metrics", str(tmp_path)])
+    metrics._main_cli()
+    assert "cal @" in capsys.readouterr().out
+
+
+def test_formatter_counts_rows_and_serves_metrics(serve):
+    metrics.METRICS.reset()
+    base = serve(FormatterHandler)
+    rows = [{"bid_id": "1", "title": "A", "close_date": "Continuous"}]
+    req = urllib.request.Request(f"{base}/format/laco", data=json.dumps(rows).encode("utf-8"))
+    urllib.request.urlopen(req).read()
+    # The request span closes after the response is written; give it a moment
+    for _ in range(50):
+        with urllib.request.urlopen(f"{base}/metrics") as resp:
+            text = resp.read().decode("utf-8")
+        if 'endpoint="format"' in text:
+            break
+        time.sleep(0.02)
+    assert 'gov_rows_in_total{job="formatter",source="laco"} 1' in text
+    assert 'span="normalization"' in text and 'endpoint="format"' in text
+
+
+def test_formatter_writes_one_history_line_per_run(serve, tmp_path, monkeypatch):
+    metrics.METRICS.reset()
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+    base = serve(FormatterHandler)
+    rows = json.dumps([{"bid_id": "1", "title": "A", "close_date": "Continuous"}]).encode("utf-8")
+    for _ in range(3):
+        urllib.request.urlopen(urllib.request.Request(f"{base}/format/laco", data=rows)).read()
+    assert not (tmp_path / "formatter.history.jsonl").exists()
+
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "runs"))
+    urllib.request.urlopen(urllib.request.Request(f"{base}/runs/start", data=b"{}")).read()
+    history = [json.loads(line) for line in (tmp_path / "formatter.history.jsonl").read_text().splitlines()]
+    assert len(history) == 1
+    assert {c["name"]: c["value"] for c in history[0]["counters"]}["rows_in"] == 3
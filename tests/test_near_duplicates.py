@@ -0,0 +1,124 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from scrapers import formatter, ingest
+from scrapers.near_duplicates import NearDuplicateIndex, shingles
+
+
+def _row(checksum, title, agency="Department of Transportation", number="07A1234", deadline="2025-09-30", **extra):
+    return {"checksum": checksum, "opportunity_id": checksum.upper(), "title": title, "agency": agency,
+            "solicitation_number": number, "deadline": deadline, **extra}
+
+
+CAL = _row("cal1", "Janitorial Services for Caltrans District 7 Maintenance Yards")
+SAM = _row("sam1", "JANITORIAL SERVICES - CALTRANS DISTRICT 7 MAINTENANCE YARDS", agency="Caltrans",
+           number="07-A1234", deadline="2025-09-30T17:00:00")
+OTHER_DISTRICT = _row("cal2", "Janitorial services for Caltrans District 4 Maintenance Yards", number="04A9999")
+
+
+def test_shingles_drop_generic_words_and_punctuation():
+    assert shingles({"title": "RFP: Roof Repair Services", "agency": "County of LA", "solicitation_number": "A-1"}) \
+        == {"roof", "repair", "roof repair", "a:la", "s:a1"}
+    assert shingles({"title": "", "agency": None}) == set()
+
+
+def test_cross_source_copies_point_at_the_first_row(tmp_path):
+    path = str(tmp_path / "near.sqlite")
+    with NearDuplicateIndex(path) as index:
+        assert index.tag([CAL, OTHER_DISTRICT], source="cal") == ([CAL, OTHER_DISTRICT], [])
+
+    with NearDuplicateIndex(path) as index:  # a later run on other sources
+        late = _row("laco1", "Janitorial Caltrans District 7 maintenance yards", agency="Caltrans",
+                    number="07A1234")
+        kept, duplicates = index.tag([SAM], source="sam")
+        assert kept == [] and [(d["checksum"], d["canonical"]) for d in duplicates] == [("sam1", "cal1")]
+        assert duplicates[0]["opportunity_id"] == "SAM1" and duplicates[0]["similarity"] >= 0.7
+        assert index.tag([late], source="laco")[1][0]["canonical"] == "cal1"
+
+        # Re-sent (e.g. changed) rows keep their verdict
+        assert index.tag([dict(SAM, deadline="2025-10-15")], source="sam")[1][0]["canonical"] == "cal1"
+        assert len(index) == 4 and index.duplicate_count() == 2
+
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, num_perm=32)
+
+
+def test_different_deadlines_are_not_merged_and_dry_runs_do_not_record():
+    with NearDuplicateIndex(":memory:") as index:
+        index.tag([CAL], source="cal")
+        moved = dict(SAM, checksum="sam2", deadline="2025-12-01")
+        assert index.tag([moved], source="sam")[1] == []
+        assert index.tag([SAM], source="sam", record=False)[1][0]["canonical"] == "cal1"
+        assert len(index) == 2
+        assert index.tag([{"checksum": "x", "title": "The RFP"}, {"title": "No checksum"}])[1] == []
+
+
+def test_same_source_rows_and_other_solicitations_are_distinct():
+    with NearDuplicateIndex(":memory:") as index:
+        reposted = dict(CAL, checksum="cal3", opportunity_id="CAL3")
+        assert index.tag([CAL, reposted], source="cal")[1] == []
+        assert index.tag([dict(SAM, solicitation_number="07A5678")], source="sam")[1] == []
+        assert index.tag([dict(SAM, checksum="sam3", solicitation_number="")], source="sam")[1][0]["canonical"] \
+            == "cal1"
+
+
+def test_staged_rows_wait_for_commit(tmp_path):
+    path = str(tmp_path / "near.sqlite")
+    with NearDuplicateIndex(path) as index:
+        assert index.tag([CAL], source="cal", record=False, stage=True) == ([CAL], [])
+        # staged rows are candidates for the other sources of the run
+        assert index.tag([SAM], source="sam", record=False, stage=True)[1][0]["canonical"] == "cal1"
+        assert index.commit(["cal1"]) == 2 and index.commit(["cal1"]) == 0
+
+        late = _row("laco1", "Janitorial Caltrans District 7 maintenance yards", agency="Caltrans")
+        index.tag([late], source="laco", record=False, stage=True)
+    # a run that never wrote: its staged rows are forgotten
+    with NearDuplicateIndex(path, stage_hours=-1) as index:
+        assert len(index) == 3
+        assert index.tag([OTHER_DISTRICT], source="cal", record=False, stage=True)[1] == []
+        assert len(index) == 3  # laco1 expired, cal2 staged
+
+
+def test_lsh_compares_only_bucket_neighbours():
+    words = ["roofing", "paving", "hvac", "audit", "elevator", "plumbing", "fencing", "lighting", "bridge",
+             "network", "software", "security", "landscaping", "printing", "towing", "catering"]
+    rows = [_row(f"c{i}", f"{words[i % 16]} {words[i // 16 % 16]} {words[i // 256 % 16]} contract {i}",
+                 agency=f"Agency {i % 97}", number=f"N{i}") for i in range(1000)]
+    with NearDuplicateIndex(":memory:") as index:
+        kept, duplicates = index.tag(rows)
+    assert len(kept) == 1000 and duplicates == []
+    assert index.stats["compared"] < 1000 * 999 / 2 / 20
+
+
+def test_formatter_drops_near_duplicates(tmp_path, monkeypatch):
+    monkeypatch.delenv("CHECKSUM_INDEX", raising=False)
+    monkeypatch.delenv("EXPORT_DIR", raising=False)
+    monkeypatch.setenv("NEAR_DUP_INDEX", str(tmp_path / "near.sqlite"))
+    monkeypatch.setattr(formatter, "_near_duplicate_index", None)
+    raw = {"bid_id": "9", "title": "Janitorial Services for Caltrans District 7 Maintenance Yards",
+           "department": "Department of Transportation", "close_date": "09/30/2025"}
+    first = formatter._batch_response("laco", [raw, dict(raw, bid_id="10")], parse=True)
+    copy = formatter._batch_response("cal", [{"event_id": "3", "event_name": raw["title"],
+                                              "department": raw["department"]}])
+    assert first["count"] == 2 and first["near_duplicates"] == []
+    assert copy["count"] == 0 and copy["duplicates"] == 0
+    assert copy["near_duplicates"][0]["canonical"] in {r["checksum"] for r in first["opportunities"]}
+
+    out = io.StringIO()
+
+    async def cal(emit):
+        await emit([{"event_id": "1", "event_name": "Roof repair at Folsom Prison", "department": "CDCR"}])
+
+    async def laco(emit):
+        await asyncio.sleep(0.05)
+        await emit([{"bid_id": "2", "title": "Roof Repair - Folsom Prison", "department": "CDCR"}])
+
+    stats = asyncio.run(ingest.run({"cal": cal, "laco": laco}, out,
+                                   near_duplicates=formatter.get_near_duplicate_index()))
+    assert stats["cal"]["rows_out"] == 1 and stats["laco"]["rows_out"] == 0
+    assert json.loads(out.getvalue())["opportunity_id"] == "1"
+    formatter.get_near_duplicate_index().close()
+    monkeypatch.setattr(formatter, "_near_duplicate_index", None)
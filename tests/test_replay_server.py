@@ -0,0 +1,104 @@
+import asyncio
+import json
+import urllib.request
+
+from benchmarks.bench_scrapers import _Counter, _Counting, check
+from benchmarks.replay import CAL_DATA, CAL_PAGE, LACO_DATA, LACO_PAGE, ReplayServer
+from scrapers.cal_eprocure_scraper import CAL_FIELDS
+from scrapers.interception import best_records
+from scrapers.lacobids_scraper import LACO_FIELDS
+
+
+def _get(url):
+    with urllib.request.urlopen(url) as resp:
+        return resp.read().decode("utf-8")
+
+
+def test_replay_server_renders_requested_row_count():
+    with ReplayServer(rows=25) as server:
+        laco = _get(server.base_url + LACO_PAGE)
+        cal = _get(server.base_url + CAL_PAGE)
+        server.rows = 3
+        smaller = _get(server.base_url + LACO_PAGE)
+
+    assert laco.count("selectBid(") == 25
+    assert "<!--ROW-->" not in laco and "{title}" not in laco
+    assert cal.count('data-if-label="tdEventId"') == 25
+    assert "Corrections &amp; Rehab" in cal
+    assert smaller.count("selectBid(") == 3
+    assert server.hits[LACO_PAGE] == 2
+
+
+def test_replay_json_maps_through_interception():
+    with ReplayServer(rows=10) as server:
+        laco = json.loads(_get(server.base_url + LACO_DATA))
+        cal = json.loads(_get(server.base_url + CAL_DATA))
+
+    laco_rows = best_records([laco], LACO_FIELDS, required=("bid_id", "title"))
+    cal_rows = best_records([cal], CAL_FIELDS, required=("event_id", "event_name"))
+    assert len(laco_rows) == len(cal_rows) == 10
+    assert laco_rows[0]["solicitation_number"] == "RFB-IS-26200000"
+    assert cal_rows[9]["event_id"] == "0000000009"
+
+
+class _FakeContext:
+    def __init__(self):
+        self.listeners = []
+
+    def on(self, event, handler):
+        self.listeners.append(event)
+
+    async def new_page(self):
+        return _FakePage(self)
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def close(self):
+        pass
+
+
+class _FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    def on(self, event, handler):
+        pass
+
+    async def goto(self, url):
+        pass
+
+    async def evaluate(self, script):
+        return [{"row": 1}, {"row": 2}]
+
+
+class _FakeBrowser:
+    async def new_context(self):
+        return _FakeContext()
+
+    async def new_page(self):
+        return _FakePage(_FakeContext())
+
+
+def test_counting_proxy_counts_awaited_calls_and_checks_the_budget():
+    counter = _Counter()
+
+    async def scrape(browser):
+        context = await browser.new_context()
+        await context.route("**/*", None)
+        page = await context.new_page()
+        page.on("response", None)          # sync: not a round trip
+        await page.goto("http://replay")
+        rows = await page.evaluate("rows")
+        await context.close()
+        other = await browser.new_page()
+        assert other.context.listeners == ["request"] and context.listeners == ["request"]
+        return rows
+
+    assert len(asyncio.run(scrape(_Counting(_FakeBrowser(), counter)))) == 2
+    assert counter.round_trips == 7
+
+    result = {"source": "laco", "mode": "dom", "rows": 20, "rows_out": 20, "round_trips": counter.round_trips}
+    assert check([result]) == []
+    assert check([dict(result, round_trips=40, rows_out=19)]) == [
+        "laco dom 20 rows: 19 rows out", "laco dom 20 rows: 40 round trips (budget 12)"]
@@ -0,0 +1,102 @@
+import json
+import sys
+from datetime import date, datetime
+
+import pytest
+
+from scrapers import sam_client
+from scrapers.formatter import CANONICAL_FIELDS
+from scrapers.http_utils import HttpClient, HttpError, TokenBucket
+from scrapers.sam_client import SamClient, fetch_notices, posted_window
+
+TODAY = date(2025, 8, 21)
+
+
+def _notices(day, n):
+    return [{"noticeId": f"{day}-{i}", "title": f"Notice {i}", "postedDate": day, "active": "Yes"} for i in range(n)]
+
+
+def _client(sam_stub, tmp_path, **kw):
+    http = HttpClient(bucket=TokenBucket(1000), backoff=0, sleep=lambda s: None)
+    kw.setdefault("today", TODAY)
+    return SamClient(api_key="k", url=sam_stub["url"], cache_dir=str(tmp_path), page_size=10,
+                     concurrency=3, http=http, **kw)
+
+
+def test_walks_every_offset_of_every_day(sam_stub, tmp_path):
+    sam_stub["notices"] = _notices("2025-08-19", 25) + _notices("2025-08-20", 3) + _notices("2025-08-21", 12)
+    client = _client(sam_stub, tmp_path)
+    ids = [n["noticeId"] for n in client.iter_notices("08/19/2025", "08/21/2025")]
+    assert ids == [n["noticeId"] for n in sam_stub["notices"]]
+    assert len(sam_stub["requests"]) == 3 + 2 + 1   # first pages + extra offsets
+    assert client.stats["fetched"] == 6
+
+
+def test_rerun_only_revalidates_days_that_were_still_open(sam_stub, tmp_path):
+    sam_stub["notices"] = _notices("2025-08-20", 15) + _notices("2025-08-21", 5)
+    morning = lambda: datetime(2025, 8, 21, 6, 0)
+    list(_client(sam_stub, tmp_path, clock=morning).iter_notices("08/20/2025", "08/21/2025"))
+    sam_stub["requests"].clear()
+
+    client = _client(sam_stub, tmp_path, clock=morning)
+    rows = list(client.iter_opportunities("08/20/2025", "08/21/2025"))
+    assert len(rows) == 20 and tuple(rows[0]) == CANONICAL_FIELDS
+    assert [q["postedFrom"] for q in sam_stub["requests"]] == ["08/21/2025"]
+    assert client.stats == {"cache_hits": 2, "not_modified": 1, "fetched": 0}
+
+    # 08/21 was cached while it was still open: the next day must revalidate it
+    sam_stub["notices"] += _notices("2025-08-21", 7)[5:]
+    sam_stub["requests"].clear()
+    next_day = lambda: datetime(2025, 8, 22, 6, 0)
+    client = _client(sam_stub, tmp_path, clock=next_day, today=None)
+    assert len(list(client.iter_notices("08/20/2025", "08/21/2025"))) == 22
+    assert [q["postedFrom"] for q in sam_stub["requests"]] == ["08/21/2025"]
+    assert client.stats == {"cache_hits": 2, "not_modified": 0, "fetched": 1}
+
+    # now fetched after it ended, 08/21 is immutable too
+    sam_stub["requests"].clear()
+    client = _client(sam_stub, tmp_path, clock=next_day, today=None)
+    list(client.iter_notices("08/20/2025", "08/21/2025"))
+    assert sam_stub["requests"] == []
+    assert client.stats == {"cache_hits": 3, "not_modified": 0, "fetched": 0}
+
+
+def test_retries_on_429_and_respects_max_records(sam_stub, tmp_path):
+    sam_stub["notices"] = _notices("2025-08-21", 30)
+    sam_stub["fail_next"] = 2
+    client = _client(sam_stub, tmp_path)
+    body = fetch_notices(days=0, max_records=12, client=client)
+    assert body["totalRecords"] == 12
+    assert client.http.retried == 2
+
+
+def test_http_error_when_not_retryable(sam_stub, tmp_path):
+    client = _client(sam_stub, tmp_path)
+    client.url = sam_stub["url"].replace("/opportunities/v2/search", "/missing")
+    with pytest.raises(HttpError) as exc:
+        client.fetch_page("08/21/2025")
+    assert exc.value.status == 404
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]  # fake clock: only sleeps advance time
+    bucket = TokenBucket(rate=5, capacity=2, clock=lambda: now[0],
+                         sleep=lambda s: now.__setitem__(0, now[0] + s))
+    waits = [bucket.acquire() for _ in range(6)]
+    assert waits[:2] == [0.0, 0.0]
+    assert now[0] == pytest.approx(0.8)   # 4 extra tokens at 5/sec
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_sam_posted_window_format():
+    assert posted_window(3, today=TODAY) == ("08/18/2025", "08/21/2025")
+
+
+def test_raw_cli_prints_every_notice_for_the_workflow(sam_stub, tmp_path, monkeypatch, capsys):
+    sam_stub["notices"] = _notices("2025-08-21", 25)
+    monkeypatch.setattr(sam_client, "SamClient", lambda: _client(sam_stub, tmp_path))
+    monkeypatch.setattr(sys, "argv", ["sam_client.py", "0", "--raw"])
+    monkeypatch.setenv("SAM_MAX_RECORDS", "0")
+    sam_client._main_cli()
+    assert [n["noticeId"] for n in json.loads(capsys.readouterr().out)] == [n["noticeId"] for n in sam_stub["notices"]]
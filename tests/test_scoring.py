@@ -0,0 +1,69 @@
+import json
+import urllib.request
+
+import numpy as np
+
+from scrapers.formatter import FormatterHandler
+from scrapers.scoring import allocate, load_capacity, score_batch, type_weight
+
+CAPACITY = {"Janitorial": 200.0, "IT": 80.0}
+
+
+def _row(line, hours, bucket="Medium", deadline="2025-09-01", **extra):
+    return {"service_line": line, "effort_hours": hours, "effort_bucket": bucket, "type": "Solicitation",
+            "active": True, "deadline": deadline, **extra}
+
+
+def test_capacity_is_shared_instead_of_claimed_by_every_row():
+    rows = [_row("Janitorial", 50, deadline=f"2025-09-{10 + i:02d}") for i in range(10)]
+    scored, summary = score_batch(rows, CAPACITY)
+    assert [r["auto_decision"] for r in scored].count("Go") == 4
+    assert summary["Janitorial"] == {"hours_available": 200.0, "allocated": 200.0}
+    # Earlier deadlines win among equal scores
+    assert [r["auto_decision"] for r in scored[:4]] == ["Go"] * 4
+    assert all(r["decision"] == "Review" and r["hours_available"] == 200 for r in scored)
+
+
+def test_single_rows_keep_the_auto_decision_thresholds():
+    cases = [(_row("IT", 80), "Go"), (_row("IT", 96), "Review"), (_row("IT", 97), "No Go"),
+             (_row("IT", None), "Review"), (_row("Unknown", 5), "No Go")]
+    for row, expected in cases:
+        assert score_batch([row], CAPACITY)[0][0]["auto_decision"] == expected
+
+
+def test_higher_scores_go_first_and_smaller_rows_fill_the_gap():
+    rows = [
+        _row("IT", 60, bucket="Medium", active=False),     # base 25
+        _row("IT", 70, bucket="Low"),                      # base 50 -> first
+        _row("IT", 10, bucket="Medium", active=False),     # fits in the 10 h left
+    ]
+    scored, summary = score_batch(rows, CAPACITY)
+    assert [r["auto_decision"] for r in scored] == ["No Go", "Go", "Go"]
+    assert summary["IT"]["allocated"] == 80.0
+
+
+def test_score_matches_score1_weights():
+    row = _row("Janitorial", 10, bucket="Low", type="Combined Synopsis/Solicitation")
+    assert score_batch([row], CAPACITY)[0][0]["score"] == 50 + 30 + 20 + 10
+    assert type_weight("Presolicitation") == 10 and type_weight("Sources Sought") == 5
+    assert type_weight(None) == 0
+
+
+def test_allocate_is_per_line():
+    lines = np.array([0, 1, 0, 1])
+    need = np.array([5.0, 5.0, 5.0, 5.0])
+    allocated, left = allocate(lines, need, np.zeros(4), np.full(4, np.datetime64("2025-01-01")),
+                               np.array([5.0, 10.0]))
+    assert allocated.tolist() == [True, True, False, True]
+    assert left.tolist() == [0.0, 0.0]
+
+
+def test_load_capacity_and_score_endpoint(serve):
+    assert load_capacity()["Janitorial"] == 200.0
+    base = serve(FormatterHandler)
+    req = urllib.request.Request(f"{base}/score", data=json.dumps([_row("Janitorial", 20)]).encode("utf-8"))
+    with urllib.request.urlopen(req) as resp:
+        body = json.loads(resp.read())
+    assert body["scored"][0]["auto_decision"] == "Go"
+    assert body["capacity"]["Janitorial"]["allocated"] == 20.0
+    assert score_batch([]) == ([], {})
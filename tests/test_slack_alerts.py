@@ -0,0 +1,77 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scrapers import formatter
+from scrapers.formatter import FormatterHandler
+from scrapers.http_utils import HttpClient, HttpError, TokenBucket
+from scrapers.slack_alerts import AlertDispatcher, build_digests, decision_links, order
+
+BASE = "http://localhost:5678"
+
+
+def _records(n):
+    return [{"id": f"rec{i}", "fields": {"checksum": f"c/{i}", "title": f"Opportunity {i}", "agency": "GSA",
+                                        "score": i % 7 * 10, "deadline": f"2025-09-{1 + i % 28:02d}"}}
+            for i in range(n)]
+
+
+def _dispatcher(stub, **kw):
+    http = HttpClient(bucket=TokenBucket(1000), backoff=0, sleep=lambda s: None)
+    kw.setdefault("token", stub["token"])
+    return AlertDispatcher(url=stub["url"], base=BASE, http=http, **kw)
+
+
+def test_digests_are_ordered_and_keep_decision_links():
+    rows = [{"checksum": "a", "title": "Low", "score": 10, "deadline": "2025-09-01"},
+            {"checksum": "b", "title": "Late", "score": 90, "deadline": "2025-10-01"},
+            {"checksum": "c", "title": "Soon <&>", "score": "90", "deadline": "2025-09-05"},
+            {"checksum": "d", "title": "Unscored"}]
+    assert [r["checksum"] for r in order(rows)] == ["c", "b", "a", "d"]
+
+    messages = build_digests(rows, size=3, channel="#alerts", base=BASE)
+    assert [len(m["blocks"]) for m in messages] == [7, 3]
+    assert messages[0]["blocks"][0]["text"]["text"] == "🆕 4 new opportunities (1/2)"
+    first = messages[0]["blocks"][1]["text"]["text"]
+    assert first.startswith("*Soon &lt;&amp;&gt;*")
+    accept, ignore = decision_links("c", BASE)
+    assert f"<{accept}|Accept>" in first and f"<{ignore}|Ignore>" in first
+    assert decision_links("a/b", BASE)[1] == f"{BASE}/webhook/decision?checksum=a%2Fb&decision=No%20Go"
+    with pytest.raises(ValueError):
+        build_digests(rows, size=25)
+
+
+def test_two_hundred_opportunities_take_ten_messages(slack_stub):
+    slack_stub["fail_next"] = 1
+    dispatcher = _dispatcher(slack_stub)
+    sent = dispatcher.dispatch(_records(200))
+    assert [m["items"] for m in sent] == [20] * 10 and sent[0]["ts"] and sent[0]["channel"] == "C0ALERTS"
+    assert len(slack_stub["messages"]) == 10 and dispatcher.http.retried == 1
+    assert dispatcher.stats["items"] == 200
+
+    scores = [json.dumps(b) for m in slack_stub["messages"] for b in m["blocks"] if b["type"] == "section"]
+    assert "*Score:* 60" in scores[0] and "*Score:* 0" in scores[-1]
+
+
+def test_slack_errors_surface(slack_stub, serve, monkeypatch):
+    with pytest.raises(HttpError) as exc:
+        _dispatcher(slack_stub, token="wrong").dispatch(_records(1))
+    assert b"invalid_auth" in exc.value.body
+
+    monkeypatch.setattr(formatter, "_alert_dispatcher", _dispatcher(slack_stub))
+    base = serve(FormatterHandler)
+    req = urllib.request.Request(f"{base}/alerts/digest", data=json.dumps(_records(25)).encode("utf-8"))
+    with urllib.request.urlopen(req) as resp:
+        body = json.loads(resp.read())
+    assert body["items"] == 25 and len(body["messages"]) == 2 and body["changed"] == 0
+
+    amended = [dict(r, status="changed") for r in _records(3)] + [dict(_records(1)[0], status="new")]
+    body = formatter.alert_digest(amended)
+    assert body["items"] == 1 and body["changed"] == 3
+
+    monkeypatch.setattr(formatter, "_alert_dispatcher", _dispatcher(slack_stub, token="wrong"))
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        urllib.request.urlopen(urllib.request.Request(f"{base}/alerts/digest", data=b"[{}]"))
+    assert exc.value.code == 502
@@ -0,0 +1,131 @@
+import asyncio
+
+from scrapers import cal_eprocure_scraper as cal
+from scrapers import watermark
+from scrapers.watermark import Session, WatermarkStore
+
+
+def _events(ids, end_date="09/30/2025"):
+    return [{"event_id": str(i), "event_name": f"Event {i}", "department": "CAL FIRE", "end_date": end_date,
+             "status": "Posted"} for i in ids]
+
+
+class _Browser:
+    """DataTable of 'rows' in pages of 'per_page', drawn through the Cal scraper's page scripts."""
+
+    def __init__(self, rows, per_page=10):
+        self.rows, self.per_page = rows, per_page
+        self.drawn = []
+
+    async def new_context(self):
+        return _Context(self)
+
+
+class _Context:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        return _Page(self.browser)
+
+    async def close(self):
+        pass
+
+
+class _Page:
+    def __init__(self, browser):
+        self.browser, self.index = browser, 0
+
+    async def goto(self, url, timeout=None):
+        pass
+
+    async def wait_for_selector(self, selector):
+        pass
+
+    async def wait_for_function(self, script, arg=None):
+        pass
+
+    async def evaluate(self, script, arg=None):
+        browser = self.browser
+        if script == cal.PAGE_INFO_JS:
+            return {"pages": -(-len(browser.rows) // browser.per_page), "length": browser.per_page}
+        if script == cal.GOTO_PAGE_JS:
+            self.index = arg
+            return None
+        browser.drawn.append(self.index)
+        start = self.index * browser.per_page
+        return [dict(row) for row in browser.rows[start:start + browser.per_page]]
+
+    async def close(self):
+        pass
+
+
+def test_session_stops_after_a_run_of_known_rows():
+    with WatermarkStore(":memory:") as store:
+        assert store.known("cal") == {} and store.mark("cal") is None
+
+    s = Session("cal", "event_id", "end_date", stop_after=3)
+    s.known = {"1": "09/30/2025", "2": "09/30/2025", "3": "09/30/2025", "4": "09/30/2025"}
+    rows = _events(["9", "1", "2", "8"]) + _events(["3"], end_date="10/15/2025") + _events(["4", "1", "2", "7"])
+    assert s.feed(rows[:5]) is False
+    assert s.feed(rows[5:]) is True and s.skipped == 3
+    # known rows inside the new ones are kept; the run that ended the scan is not
+    assert [r["event_id"] for r in s.rows()] == ["9", "1", "2", "8", "3"]
+
+    passthrough = Session("cal", "event_id", "end_date")
+    assert not passthrough.incremental and passthrough.feed(rows) is False and passthrough.rows() == rows
+    passthrough.stage(rows)
+
+
+def test_store_records_marks_and_forgets_old_rows(tmp_path):
+    path = str(tmp_path / "watermarks.sqlite")
+    now = [1_000_000.0]
+    with WatermarkStore(path, clock=lambda: now[0]) as store:
+        store.record("laco", [("b1", "09/30/2025"), ("b2", None), (None, "x")])
+        now[0] += 10 * 86400
+        store.record("laco", [("b3", "10/01/2025")], max_age_days=5)
+        store.record("cal", [("e1", "09/30/2025")])
+        assert store.known("laco") == {"b3": "10/01/2025"}
+        assert store.mark("laco")["top_id"] == "b3" and store.mark("laco")["rows"] == 1
+        assert sorted(store.stats()) == ["cal", "laco"]
+        store.reset("laco")
+        assert store.known("laco") == {} and store.known("cal") == {"e1": "09/30/2025"}
+
+
+def test_staged_rows_are_recorded_when_their_run_is_written(tmp_path):
+    with WatermarkStore(str(tmp_path / "watermarks.sqlite")) as store:
+        store.stage("cal", [("e2", "10/01/2025"), ("e1", "09/30/2025")], run_id="run-1")
+        store.stage("laco", [("b1", "09/30/2025")])
+        assert store.known("cal") == {} and store.stats()["cal"]["pending"] == 2
+        assert store.commit("run-2") == {}
+        assert store.commit("run-1") == {"cal": 2}
+        assert store.known("cal") == {"e2": "10/01/2025", "e1": "09/30/2025"} and store.mark("cal")["top_id"] == "e2"
+        assert store.known("laco") == {} and store.commit() == {"laco": 1}
+
+
+def test_incremental_cal_scrape_stops_paging_at_known_events(tmp_path, monkeypatch):
+    monkeypatch.setenv("SCRAPE_INCREMENTAL", "1")
+    monkeypatch.delenv("SCRAPE_DETAILS", raising=False)
+    monkeypatch.setattr(watermark, "DEFAULT_PATH", str(tmp_path / "watermarks.sqlite"))
+    browser = _Browser(_events(range(100, 200)))
+
+    first = asyncio.run(cal.scrape(browser, qtd=100, mode="dom", concurrency=2))
+    assert len(first) == 100 and sorted(browser.drawn) == list(range(10))
+    # not written yet: the next run reads the whole list again
+    browser.drawn = []
+    asyncio.run(cal.scrape(browser, qtd=100, mode="dom", concurrency=2))
+    assert sorted(browser.drawn) == list(range(10))
+    assert watermark.commit() == {"cal": 100}
+
+    # Three new events and one amended deadline on top of yesterday's list
+    browser.rows = _events([300, 301, 302]) + _events([100], end_date="10/31/2025") + browser.rows[1:]
+    browser.drawn = []
+    second = asyncio.run(cal.scrape(browser, qtd=100, mode="dom", concurrency=2))
+    assert [e["event_id"] for e in second] == ["300", "301", "302", "100"]
+    assert second[0]["link"] == "https://caleprocure.ca.gov/event/3540/300"
+    assert sorted(browser.drawn) == [0]
+
+    monkeypatch.delenv("SCRAPE_INCREMENTAL")
+    browser.drawn = []
+    assert len(asyncio.run(cal.scrape(browser, qtd=100, mode="dom", concurrency=2))) == 100
+    assert sorted(browser.drawn) == list(range(10))